@@ -0,0 +1,148 @@
+import glob
+import os
+import subprocess
+import threading
+import numpy as np
+
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".mov", ".mp4")
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode the uploaded bytes."""
+
+
+def _ffmpeg_command(input_path, sr):
+    # decode straight to raw mono float32 at `sr` on stdout: no wav container and no resample afterwards
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if input_path != "pipe:0":
+        command.append("-nostdin")
+    return command + [
+        "-i", input_path, "-vn",
+        "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(sr), "-ac", "1", "pipe:1",
+    ]
+
+
+def _is_iso_media(data):
+    # .mov/.mp4/.m4a recordings may keep their index at the end of the file, which ffmpeg
+    # can only reach on a seekable input
+    return len(data) >= 8 and bytes(data[4:8]) == b"ftyp"
+
+
+def decode_audio_bytes(data, sr=SAMPLE_RATE):
+    """Decodes an encoded recording (mov, m4a, mp3, wav, ...) held in memory into a
+    mono float32 NumPy array at `sr`, in a single ffmpeg pass with no temp files.
+
+    The returned array is a read-only view over ffmpeg's output buffer.
+    """
+    if _is_iso_media(data) and hasattr(os, "memfd_create"):
+        # seekable in-memory file that ffmpeg can open by descriptor
+        fd = os.memfd_create("recording")
+        try:
+            os.write(fd, data)
+            os.lseek(fd, 0, os.SEEK_SET)
+            result = subprocess.run(
+                _ffmpeg_command(f"/dev/fd/{fd}", sr),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(fd,),
+            )
+        finally:
+            os.close(fd)
+    else:
+        result = subprocess.run(
+            _ffmpeg_command("pipe:0", sr),
+            input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    if result.returncode != 0:
+        raise AudioDecodeError(result.stderr.decode(errors="replace").strip())
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def decode_audio_stream(chunks, sr=SAMPLE_RATE):
+    """Decodes a recording that arrives as an iterable of byte chunks (a download or an
+    upload in progress), without first joining it into one bytes object.
+
+    Chunks are written into ffmpeg's stdin as they arrive, so decoding overlaps the
+    transfer. ISO media (mov/mp4/m4a) needs a seekable input, so those chunks go into a
+    memfd instead and ffmpeg runs once the last one has landed. An exception raised by
+    the iterable (a size cap, a dropped connection) stops ffmpeg and propagates.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 8:
+            break
+    if not head:
+        raise AudioDecodeError("Empty recording")
+
+    if _is_iso_media(head) and hasattr(os, "memfd_create"):
+        fd = os.memfd_create("recording")
+        try:
+            os.write(fd, head)
+            for chunk in chunks:
+                os.write(fd, chunk)
+            os.lseek(fd, 0, os.SEEK_SET)
+            result = subprocess.run(
+                _ffmpeg_command(f"/dev/fd/{fd}", sr),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=(fd,),
+            )
+        finally:
+            os.close(fd)
+        if result.returncode != 0:
+            raise AudioDecodeError(result.stderr.decode(errors="replace").strip())
+        return np.frombuffer(result.stdout, dtype=np.float32)
+
+    process = subprocess.Popen(
+        _ffmpeg_command("pipe:0", sr), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    feed_error = []
+
+    def feed():
+        try:
+            process.stdin.write(head)
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            # ffmpeg gave up early; its exit status says why
+            pass
+        except Exception as e:
+            feed_error.append(e)
+            process.kill()
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    # stdin is fed and stderr drained from their own threads, so ffmpeg never blocks on
+    # a full pipe while this one waits on another
+    feeder = threading.Thread(target=feed, name="ffmpeg-feed", daemon=True)
+    feeder.start()
+    stderr = []
+    drainer = threading.Thread(target=lambda: stderr.append(process.stderr.read()), name="ffmpeg-stderr", daemon=True)
+    drainer.start()
+    output = process.stdout.read()
+    drainer.join()
+    feeder.join()
+    process.wait()
+    if feed_error:
+        raise feed_error[0]
+    if process.returncode != 0:
+        raise AudioDecodeError(b"".join(stderr).decode(errors="replace").strip())
+    return np.frombuffer(output, dtype=np.float32)
+
+
+def decode_audio_file(audiofile, sr=SAMPLE_RATE):
+    """Decodes a path or an open binary file object."""
+    if isinstance(audiofile, (str, os.PathLike)):
+        with open(audiofile, "rb") as f:
+            return decode_audio_bytes(f.read(), sr)
+    return decode_audio_bytes(audiofile.read(), sr)
+
+
+def iter_recordings(data_dir):
+    """Paths of the audio files under data_dir, recursively and in sorted order."""
+    for path in sorted(glob.glob(os.path.join(data_dir, "**", "*"), recursive=True)):
+        if path.lower().endswith(AUDIO_EXTENSIONS):
+            yield path
@@ -1,121 +1,215 @@
-import Levenshtein
+from array import array
+from collections import namedtuple
 import numpy as np
-from difflib import SequenceMatcher
-from .phonemes import phoneme_bank_split
-from .phoneme_similarity import PHONEME_SIMILARITY
+from .bank_store import current_bank
+from .phoneme_alignment import align_phonemes
 
-def find_most_similar_word(prediction): # eventually, should not have to use this function. When that happens, calculate Lev. dist. in adjusted_lev function
+# the word bank (entries, split forms and BK-tree) comes from bank_store, which picks up
+# newly published versions; each call below reads it once so it sees a single version
+
+def encode_prediction(prediction_phonemes, bank=None):
+    """Interned ids of a predicted phoneme list, as the array('H') the bank's index compares against."""
+    bank = bank or current_bank()
+    return array("H", bank.inventory.encode(prediction_phonemes).tobytes())
+
+def find_most_similar_word(prediction, bank=None): # eventually, should not have to use this function. When that happens, calculate Lev. dist. in adjusted_lev function
+    bank = bank or current_bank()
     prediction_phonemes = prediction.split()
-    most_similar_word = None
-    min_distance = float('inf')  
-
-    for word, phonemes in phoneme_bank_split.items():
-        distance = Levenshtein.distance(prediction_phonemes, phonemes)
-        if distance < min_distance:
-            min_distance = distance
-            most_similar_word = word
+    most_similar_word, min_distance = bank.index.nearest(encode_prediction(prediction_phonemes, bank))
     # most_similar_word = "berry"
     return most_similar_word, min_distance, prediction_phonemes
 
-def align_and_compare(prediction, correct):
-    matcher = SequenceMatcher(None, prediction, correct)
-    extra_phonemes = []
-    missing_phonemes = []
-    aligned_prediction = []
-    aligned_correct = []
-
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == "equal":
-            aligned_prediction.extend(prediction[i1:i2])
-            aligned_correct.extend(correct[j1:j2])
-        elif tag == "replace":
-            # substitution mismatch does not relate to length
-            aligned_prediction.extend(prediction[i1:i2])
-            aligned_correct.extend(correct[j1:j2])
-            extra_phonemes.extend(prediction[i1:i2])
-            missing_phonemes.extend(correct[j1:j2])
-        elif tag == "delete":
-            # extra phonemes
-            aligned_prediction.extend(prediction[i1:i2])
-            aligned_correct.extend(["-"] * (i2 - i1))  
-            extra_phonemes.extend(prediction[i1:i2])
-        elif tag == "insert":
-            # missing phonemes (ineherently occurs for any mismatch)
-            aligned_prediction.extend(["-"] * (j2 - j1))  
-            aligned_correct.extend(correct[j1:j2])
-            missing_phonemes.extend(correct[j1:j2])
-
-    print("Aligned Prediction: ", " ".join(aligned_prediction))
-    print("Aligned Correct:    ", " ".join(aligned_correct))
-    print("Extra Phonemes:     ", " ".join(extra_phonemes))
-    print("Missing Phonemes:   ", " ".join(missing_phonemes))
-
-    return extra_phonemes, missing_phonemes
-
-def adjusted_levenshtein(raw_lev, extra_phonemes, missing_phonemes):
-    '''Returns an adjusted Levenshtein distance that accounts for similar-sounding phonemes, especially vowels, 
-       that don't necessarily mean a pronunciation is incorrect. This is especially applciable for vowels that, 
-       when interchanged, don't make much of a difference on the word's pronunciation and meaning. See phoneme similarity
-       dictionary in phoneme_similarity.py.
-    '''
-    # if there is a phoneme pairing that exists in the phoneme similarity matrix, reduce Lev. distance penalty
-    final_lev = raw_lev
-
-    for extra, missing in zip(extra_phonemes, missing_phonemes):
-        phoneme_pair = (extra, missing)
-        reverse_pair = (missing, extra)
+def find_most_similar_words(prediction, k=3, bank=None):
+    """The k closest words in the bank as (word, distance) pairs, nearest first."""
+    bank = bank or current_bank()
+    return bank.index.top_k(encode_prediction(prediction.split(), bank), k)
 
-        if phoneme_pair in PHONEME_SIMILARITY:
-            penalty_reduction = PHONEME_SIMILARITY[phoneme_pair]
-            final_lev -= (1 - penalty_reduction)
-            print("replaced phonemes: " + str(phoneme_pair))
+def align_and_compare(prediction, correct, prediction_ids=None, correct_ids=None, bank=None):
+    bank = bank or current_bank()
+    alignment = align_phonemes(prediction, correct, prediction_ids, correct_ids, bank.inventory)
 
-        elif reverse_pair in PHONEME_SIMILARITY:
-            penalty_reduction = PHONEME_SIMILARITY[reverse_pair]
-            final_lev -= (1 - penalty_reduction)
-            print("replaced phonemes: " + str(reverse_pair))
+    print("Aligned Prediction: ", " ".join(alignment.aligned_prediction))
+    print("Aligned Correct:    ", " ".join(alignment.aligned_correct))
+    print("Extra Phonemes:     ", " ".join(alignment.extra_phonemes))
+    print("Missing Phonemes:   ", " ".join(alignment.missing_phonemes))
 
-    return max(0, final_lev)
+    return alignment
 
 
 def get_score(prediction):
-    '''Calculates the performance score based on Levenshtein distance,
+    '''Calculates the performance score based on a similarity-weighted edit distance,
        normalizing based on word & prediction lengths. Penalties are made for
-       missing phonemes, extra phonemes, and substitutions. This calculated
+       missing phonemes, extra phonemes, and substitutions; substitutions between
+       similar-sounding phonemes (see phoneme_similarity.py) cost less. This calculated
        score determines how feedback is given and how to proceed in the exercise
        workflow.
     '''
     # find the closest matching word + phonemes from the word bank
     # TODO: EVENTUALLY REPLACE THIS WITH "CURRENT EXERCISE WORD" rather than looking for what possible word it is
     # or, add an if statement to check if the detected word is similar to the actual assigned word
-    correct_word, lev_distance, prediction_phonemes = find_most_similar_word(prediction)   
+    bank = current_bank()
+    correct_word, lev_distance, prediction_phonemes = find_most_similar_word(prediction, bank)   
 
     if correct_word is None:
         return 0  # no valid match found
-    correct_phonemes = phoneme_bank_split[correct_word]
+    correct_phonemes = bank.split[correct_word]
     print("original lev: " + str(lev_distance))
 
-    # align and analyze phonemes
-    extra_phonemes, missing_phonemes = align_and_compare(prediction_phonemes, correct_phonemes)
+    # one weighted alignment gives the distance and the extra/missing phonemes
+    alignment = align_and_compare(prediction_phonemes, correct_phonemes,
+                                  bank.inventory.encode(prediction_phonemes), bank.compiled.ids_for(correct_word), bank)
     
-    # create a score based on adjusted Levenshtein distance
+    # create a score based on the weighted distance
     max_length = max(len(prediction_phonemes), len(correct_phonemes))
     if max_length == 0:
         return 0 
     
-    adj_lev_distance = adjusted_levenshtein(lev_distance, extra_phonemes, missing_phonemes)
+    adj_lev_distance = alignment.distance
     print("adj lev: " + str(adj_lev_distance))
 
+    final_score = normalized_score(adj_lev_distance, max_length)
+    print("FINAL SCORE: " + str(final_score))
+    return final_score, alignment.extra_phonemes, alignment.missing_phonemes
+
+
+def normalized_score(distance, max_length):
     # normalized score (1 - distance ratio)
-    raw_score = 1 - (adj_lev_distance / max_length) 
+    raw_score = 1 - (distance / max_length) 
     # if the score is less than 0.5, completely wrong and try again w feedback; if between certain ranges, almost there, give feedback and try again to improve; if close to 1, can move on
     # need to test score sensitivity
 
     final_score = max(0, raw_score)  # ensure score is not negative
     final_score = final_score * 100
     final_score = round(final_score, 1)
-    print("FINAL SCORE: " + str(final_score))
-    return final_score, extra_phonemes, missing_phonemes
+    return final_score
+
+
+ScoreResult = namedtuple("ScoreResult", [
+    "prediction",        # the prediction string as given
+    "word",              # closest target word (None if there were no targets)
+    "score",             # what get_score returns as final_score
+    "extra_phonemes",
+    "missing_phonemes",
+    "distance",          # weighted distance to word
+    "lev_distance",      # plain Levenshtein distance to word, used to pick it
+])
+
+BatchScores = namedtuple("BatchScores", [
+    "words",             # the target words, in column order
+    "lev_distances",     # [predictions, words] plain Levenshtein distances
+    "distances",         # [predictions, words] weighted distances
+    "scores",            # [predictions, words] score of each prediction against each word
+    "results",           # one ScoreResult per prediction, scored against its closest word
+])
+
+
+def _gather_last(row, target_lengths):
+    """D[i, len(target)] for every (prediction, target) pair from a [columns, P, M] DP row."""
+    p, m = row.shape[1:]
+    return row[target_lengths[None, :], np.arange(p)[:, None], np.arange(m)[None, :]]
+
+
+def _distance_matrices(prediction_ids, target_ids, costs):
+    """Plain and weighted edit distances between every prediction and every target.
+
+    The dynamic program is the one align_ids runs, evaluated for all pairs at once:
+    each table cell is a [P, M] array, so the Python-level loop is over the
+    (longest prediction x longest target) cells only. Predictions finish at their
+    own row and targets at their own column, so padding never reaches a result.
+    """
+    p, m = len(prediction_ids), len(target_ids)
+    prediction_lengths = np.array([len(ids) for ids in prediction_ids], dtype=np.intp)
+    target_lengths = np.array([len(ids) for ids in target_ids], dtype=np.intp)
+    rows, width = int(prediction_lengths.max(initial=0)), int(target_lengths.max(initial=0)) + 1
+    predictions = np.zeros((p, rows), dtype=np.intp)
+    for i, ids in enumerate(prediction_ids):
+        predictions[i, :len(ids)] = ids
+    targets = np.zeros((width - 1, m), dtype=np.intp)
+    for j, ids in enumerate(target_ids):
+        targets[:len(ids), j] = ids
+
+    lev = np.empty((p, m), dtype=np.int64)
+    weighted = np.empty((p, m), dtype=np.float64)
+    prev_lev = np.broadcast_to(np.arange(width)[:, None, None], (width, p, m)).copy()
+    prev_weighted = prev_lev.astype(np.float64)
+    done = prediction_lengths == 0
+    lev[done] = _gather_last(prev_lev, target_lengths)[done]
+    weighted[done] = _gather_last(prev_weighted, target_lengths)[done]
+    for i in range(1, rows + 1):
+        symbols = predictions[:, i - 1]
+        # [targets' columns, P, M] substitution costs for this prediction row
+        unit = (symbols[None, :, None] != targets[:, None, :]).astype(np.int64)
+        substitution = costs[symbols[None, :, None], targets[:, None, :]]
+        cur_lev = np.empty_like(prev_lev)
+        cur_weighted = np.empty_like(prev_weighted)
+        cur_lev[0] = i
+        cur_weighted[0] = i
+        for j in range(1, width):
+            cur_lev[j] = np.minimum(np.minimum(prev_lev[j - 1] + unit[j - 1], prev_lev[j] + 1), cur_lev[j - 1] + 1)
+            cur_weighted[j] = np.minimum(np.minimum(prev_weighted[j - 1] + substitution[j - 1], prev_weighted[j] + 1),
+                                         cur_weighted[j - 1] + 1)
+        prev_lev, prev_weighted = cur_lev, cur_weighted
+        done = prediction_lengths == i
+        lev[done] = _gather_last(prev_lev, target_lengths)[done]
+        weighted[done] = _gather_last(prev_weighted, target_lengths)[done]
+    return lev, weighted
+
+
+# upper bound on predictions x targets x (longest target + 1) cells per DP block; each of the
+# handful of [width, P, M] arrays the block allocates is 8 bytes per cell (about 16 MB here)
+MAX_DP_CELLS = 1 << 21
+
+
+def score_batch(predictions, targets=None, max_cells=MAX_DP_CELLS):
+    """Scores many predictions against many target words without printing anything.
+
+    predictions are phoneme strings as passed to get_score; targets are bank words
+    (the whole bank, in bank order, by default). Returns a BatchScores with the full
+    distance and score matrices, plus, for each prediction, the result get_score
+    would give when the closest target is the word it picks: the word with the
+    smallest Levenshtein distance, ties going to the earlier target. The distance
+    matrices are filled in blocks of predictions x targets sized so that no block's DP
+    arrays exceed max_cells cells, whatever the size of the bank.
+    """
+    bank = current_bank()
+    words = list(bank.words if targets is None else targets)
+    target_ids = [bank.compiled.ids_for(word) for word in words]
+    split = [prediction.split() for prediction in predictions]
+    prediction_ids = [bank.inventory.encode(phonemes) for phonemes in split]
+    costs = bank.inventory.cost_matrix
+
+    lev = np.zeros((len(split), len(words)), dtype=np.int64)
+    distances = np.zeros((len(split), len(words)), dtype=np.float64)
+    if words and split:
+        width = max(len(ids) for ids in target_ids) + 1
+        target_block = max(1, min(len(words), max_cells // width))
+        prediction_block = max(1, max_cells // (width * target_block))
+        for t in range(0, len(words), target_block):
+            columns = slice(t, t + target_block)
+            for start in range(0, len(split), prediction_block):
+                rows = slice(start, start + prediction_block)
+                lev[rows, columns], distances[rows, columns] = _distance_matrices(
+                    prediction_ids[rows], target_ids[columns], costs)
+
+    max_lengths = np.maximum(np.array([len(phonemes) for phonemes in split], dtype=np.int64)[:, None],
+                             np.array([len(ids) for ids in target_ids], dtype=np.int64)[None, :])
+    # same arithmetic as normalized_score, rounded with Python's round so the values match it exactly
+    raw = np.maximum(0, 1 - distances / np.maximum(max_lengths, 1)) * 100
+    scores = np.array([round(value, 1) for value in raw.ravel().tolist()]).reshape(raw.shape)
+
+    results = []
+    for i, (prediction, phonemes) in enumerate(zip(predictions, split)):
+        if not words:
+            results.append(ScoreResult(prediction, None, 0, [], [], None, None))
+            continue
+        best = int(np.argmin(lev[i]))
+        word = words[best]
+        alignment = align_phonemes(phonemes, bank.split[word], prediction_ids[i], target_ids[best], bank.inventory)
+        max_length = max(len(phonemes), len(target_ids[best]))
+        score = normalized_score(alignment.distance, max_length) if max_length else 0
+        results.append(ScoreResult(prediction, word, score, alignment.extra_phonemes, alignment.missing_phonemes,
+                                   alignment.distance, int(lev[i, best])))
+    return BatchScores(words, lev, distances, scores, results)
 
 
 def get_session_score(all_scores): # where all_scores is an array of all the scores in the session
@@ -0,0 +1,59 @@
+"""Compares the argmax phonemes of two inference backends over a corpus of recordings.
+
+    python -m audio.backend_parity [--data-dir data] [--backends torch onnx] [--max-mismatches 0]
+
+Exits non-zero when more recordings than --max-mismatches decode to different phonemes.
+"""
+import argparse
+import sys
+from .audio_ingest import decode_audio_file, iter_recordings
+from .model_registry import DEFAULT_CHECKPOINT, get_model
+from .phoneme_extraction import predict_logits
+
+def compare_backends(paths, checkpoint=DEFAULT_CHECKPOINT, reference="torch", candidate="onnx"):
+    """Runs every recording through both backends and returns one result dict per file."""
+    decoder = get_model(checkpoint, reference).decoder
+    sr = get_model(checkpoint, reference).sampling_rate
+    results = []
+    for path in paths:
+        audio_array = decode_audio_file(path, sr)
+        ref_ids = predict_logits([audio_array], checkpoint, backend=reference)[0].argmax(dim=-1)
+        cand_ids = predict_logits([audio_array], checkpoint, backend=candidate)[0].argmax(dim=-1)
+        frames = min(len(ref_ids), len(cand_ids))
+        ref_prediction, cand_prediction = decoder.decode_ids(
+            [ref_ids[:frames].tolist(), cand_ids[:frames].tolist()]
+        )
+        results.append({
+            "path": path,
+            "frame_agreement": (ref_ids[:frames] == cand_ids[:frames]).float().mean().item() if frames else 1.0,
+            "frame_count_match": len(ref_ids) == len(cand_ids),
+            reference: ref_prediction,
+            candidate: cand_prediction,
+            "match": ref_prediction == cand_prediction,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--backends", nargs=2, default=["torch", "onnx"], metavar=("REFERENCE", "CANDIDATE"))
+    parser.add_argument("--max-mismatches", type=int, default=0)
+    args = parser.parse_args()
+    reference, candidate = args.backends
+
+    results = compare_backends(list(iter_recordings(args.data_dir)), args.checkpoint, reference, candidate)
+    mismatches = [r for r in results if not r["match"]]
+    for r in results:
+        status = "ok  " if r["match"] else "DIFF"
+        print(f"{status} {r['frame_agreement']:.3f} {r['path']}")
+        if not r["match"]:
+            print(f"     {reference}: {r[reference]}")
+            print(f"     {candidate}: {r[candidate]}")
+    print(f"{len(results) - len(mismatches)}/{len(results)} recordings decode identically")
+    sys.exit(1 if len(mismatches) > args.max_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
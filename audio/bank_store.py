@@ -0,0 +1,247 @@
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from .phoneme_index import PhonemeIndex
+from .phoneme_inventory import COMPILED_BANK, INVENTORY, CompiledBank, PhonemeInventory
+from .phonemes import phoneme_bank_split
+
+logger = logging.getLogger(__name__)
+
+# directory holding the compiled snapshots and the CURRENT pointer; unset keeps the built-in WORD_BANK
+BANK_DIR = os.environ.get("AUDIO_WORD_BANK_DIR")
+MAGIC = b"PHBANK01"
+POINTER_NAME = "CURRENT"
+# arrays stored after the header, in this order: (name, dtype)
+_ARRAYS = [
+    ("offsets", np.int64),
+    ("flat", np.uint16),
+    ("node_parent", np.int32),
+    ("node_edge", np.int32),
+    ("entry_node", np.int32),
+]
+
+
+class _SplitView:
+    """word -> list of phoneme symbols, decoded from the bank's ids on lookup
+    (the same mapping as phonemes.phoneme_bank_split, without building it up front)."""
+    def __init__(self, compiled):
+        self._compiled = compiled
+
+    def __getitem__(self, word):
+        return self._compiled.inventory.decode(self._compiled.ids_for(word).tolist())
+
+    def __contains__(self, word):
+        return word in self._compiled.word_ids
+
+    def __iter__(self):
+        return iter(self._compiled.words)
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def get(self, word, default=None):
+        return self[word] if word in self else default
+
+    def items(self):
+        return ((word, self[word]) for word in self._compiled.words)
+
+
+class WordBank:
+    """One version of the word bank: the interned entries, their split forms and
+    the nearest-word index, plus the mapped snapshot they were read from (if any)."""
+    def __init__(self, compiled, index, version=0, path=None, buffer=None):
+        self.compiled = compiled
+        self.index = index
+        self.version = version
+        self.path = path
+        self.split = _SplitView(compiled)
+        # keeps the memory map open for as long as the arrays above are in use
+        self._buffer = buffer
+
+    @property
+    def inventory(self):
+        return self.compiled.inventory
+
+    @property
+    def words(self):
+        return self.compiled.words
+
+    def __len__(self):
+        return len(self.compiled)
+
+    def status(self):
+        return {"version": self.version, "words": len(self), "snapshot": self.path}
+
+
+def compile_bank(bank):
+    """Compiles a {word: "space separated ipa"} dict into a WordBank (not persisted)."""
+    inventory = PhonemeInventory()
+    compiled = CompiledBank.from_split({word: ipa.split() for word, ipa in bank.items()}, inventory)
+    # the similarity symbols and costs go in before anything can score against the bank
+    inventory.freeze()
+    return WordBank(compiled, PhonemeIndex.from_compiled(compiled))
+
+
+def write_snapshot(path, bank, version):
+    """Writes the compiled form of a {word: ipa} dict to path, atomically.
+
+    Layout: MAGIC, the header length (uint64), a JSON header (version, symbols, words
+    and where each array starts), then the arrays of _ARRAYS, each 8-byte aligned.
+    Everything a worker needs is precomputed, including the BK-tree, so loading is a
+    memory map plus object construction with no distance computations.
+    """
+    word_bank = compile_bank(bank)
+    compiled = word_bank.compiled
+    node_parent, node_edge, entry_node = word_bank.index.to_arrays()
+    arrays = {
+        "offsets": compiled.offsets, "flat": compiled.flat,
+        "node_parent": node_parent, "node_edge": node_edge, "entry_node": entry_node,
+    }
+    header = {
+        "version": version,
+        "symbols": compiled.inventory.symbols,
+        "words": compiled.words,
+        "created": time.time(),
+    }
+    # array offsets are relative to the end of the header, which keeps the header length fixed
+    position, layout = 0, {}
+    for name, dtype in _ARRAYS:
+        data = np.ascontiguousarray(arrays[name], dtype=dtype)
+        layout[name] = (position, len(data))
+        position += -(-data.nbytes // 8) * 8
+    header["arrays"] = layout
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for name, dtype in _ARRAYS:
+                data = np.ascontiguousarray(arrays[name], dtype=dtype).tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def load_snapshot(path):
+    """Memory-maps a snapshot written by write_snapshot and returns its WordBank.
+
+    The id arrays are read-only views into the map, so the pages are shared by
+    every worker that loads the same file.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        buffer.close()
+        raise ValueError(f"{path} is not a word bank snapshot")
+    header_length = int(np.frombuffer(buffer, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[start:start + header_length]).decode("utf-8"))
+    start += header_length
+    arrays = {}
+    for name, dtype in _ARRAYS:
+        offset, count = header["arrays"][name]
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + offset)
+
+    # ids are only meaningful against the snapshot's own symbol table
+    inventory = PhonemeInventory(header["symbols"][1:]).freeze()
+    compiled = CompiledBank(header["words"], arrays["flat"], arrays["offsets"], inventory)
+    index = PhonemeIndex.from_arrays(compiled.words, compiled.entries,
+                                     arrays["node_parent"], arrays["node_edge"], arrays["entry_node"])
+    return WordBank(compiled, index, header["version"], path, buffer)
+
+
+class BankStore:
+    """The current word bank for this process, following the snapshots in a directory.
+
+    Publishing writes a new snapshot and then atomically repoints the CURRENT file
+    at it. Every process checks CURRENT at most once per check_interval_s and swaps
+    to the new snapshot when it changed, so new words reach running workers without
+    a restart. Without a directory the built-in WORD_BANK is used.
+    """
+    def __init__(self, directory=None, check_interval_s=2.0):
+        self.directory = directory
+        self.check_interval_s = check_interval_s
+        self._default = WordBank(COMPILED_BANK, PhonemeIndex.from_compiled(COMPILED_BANK))
+        self._bank = self._default
+        self._pointer = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, directory, check_interval_s=None):
+        with self._lock:
+            self.directory = os.fspath(directory) if directory else None
+            if check_interval_s is not None:
+                self.check_interval_s = check_interval_s
+            self._checked_at = 0.0
+
+    def current(self):
+        if self.directory and time.monotonic() - self._checked_at >= self.check_interval_s:
+            self.refresh()
+        return self._bank
+
+    def refresh(self):
+        """Loads the snapshot CURRENT points at, if it is not the one already loaded."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                with open(os.path.join(self.directory, POINTER_NAME)) as f:
+                    pointer = f.read().strip()
+            except (OSError, TypeError):
+                # nothing published yet
+                return self._bank
+            if pointer and pointer != self._pointer:
+                try:
+                    self._bank = load_snapshot(os.path.join(self.directory, pointer))
+                    self._pointer = pointer
+                    logger.info(f"Loaded word bank v{self._bank.version} ({len(self._bank)} words)")
+                except (OSError, ValueError) as e:
+                    # keep serving the bank we have
+                    logger.warning(f"Could not load word bank snapshot {pointer}: {e}")
+            return self._bank
+
+    def publish(self, bank, version, keep=3):
+        """Compiles bank ({word: ipa}) as the given version and makes it current everywhere,
+        then deletes all but the newest `keep` snapshots (see prune)."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"bank-{version:06d}.bin"
+        write_snapshot(os.path.join(self.directory, name), bank, version)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(name + "\n")
+        os.replace(tmp_path, os.path.join(self.directory, POINTER_NAME))
+        self.refresh()
+        self.prune(keep)
+        return name
+
+    def prune(self, keep=3):
+        """Deletes all but the newest `keep` snapshots (never the current one).
+        Workers that still map a deleted file keep reading it until they swap."""
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith("bank-") and n.endswith(".bin"))
+        for name in names[:-keep] if keep else names:
+            if name != self._pointer:
+                os.remove(os.path.join(self.directory, name))
+
+    def status(self):
+        return self.current().status()
+
+
+bank_store = BankStore(BANK_DIR)
+
+
+def current_bank():
+    """The word bank this process should score against right now."""
+    return bank_store.current()
@@ -0,0 +1,198 @@
+"""Batch evaluation of the extract -> score -> feedback pipeline over a corpus of recordings.
+
+    python -m audio.batch_eval --data-dir data/test --output results.csv
+    python -m audio.batch_eval --manifest clips.csv --output results.json --workers 4 --batch-size 8
+
+A manifest is a CSV with a `path` column and an optional `word` column holding the
+expected word. With --data-dir the expected word is guessed from the file name when
+it names a word in the bank (e.g. suhyma_carrot.wav -> carrot).
+
+Recordings are decoded in a process pool, sorted by length and grouped into
+batches of similar length so little of each forward pass is padding. The batches
+then run through predict_batch in the same pool. Each worker loads the model once and
+gets an equal share of the cores for torch's intra-op threads.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+from .audio_feedback import generate_feedback_for_target
+from .audio_ingest import SAMPLE_RATE, decode_audio_file, iter_recordings
+from .audio_scoring import find_most_similar_word, get_score
+from .model_registry import DEFAULT_CHECKPOINT, registry
+from .phoneme_extraction import predict_batch
+from .phonemes import WORD_BANK
+from .vad import trim_silence
+
+STAGES = ("decode_ms", "trim_ms", "inference_ms", "score_ms", "feedback_ms")
+
+
+def guess_word(path):
+    """Expected word from a file name such as 'suhyma_carrot.wav' or 'sandra stop.wav', if it is in the bank."""
+    tokens = re.split(r"[^a-z]+", os.path.splitext(os.path.basename(path))[0].lower())
+    for token in reversed(tokens):
+        if token in WORD_BANK:
+            return token
+    return None
+
+
+def read_manifest(manifest_path):
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="") as f:
+        return [
+            (os.path.join(base, row["path"]), row.get("word") or None)
+            for row in csv.DictReader(f)
+        ]
+
+
+def _init_worker(checkpoint, threads, backend=None):
+    # every worker runs its own forward passes; split the cores between them instead of each using all of them
+    torch.set_num_threads(threads)
+    registry.warm_up([checkpoint], backend)
+
+
+def _decode(job):
+    path, word = job
+    start = time.perf_counter()
+    audio_array = decode_audio_file(path, SAMPLE_RATE)
+    decoded = time.perf_counter()
+    trimmed, leading, trailing = trim_silence(audio_array, SAMPLE_RATE)
+    trimmed = np.ascontiguousarray(trimmed)
+    return {
+        "path": path,
+        "expected_word": word,
+        "audio": trimmed,
+        "audio_seconds": len(audio_array) / SAMPLE_RATE,
+        "trimmed_samples": leading + trailing,
+        "decode_ms": (decoded - start) * 1000,
+        "trim_ms": (time.perf_counter() - decoded) * 1000,
+    }
+
+
+def _score_batch(args):
+    items, checkpoint, backend = args
+    start = time.perf_counter()
+    predictions = predict_batch([item.pop("audio") for item in items], checkpoint, backend=backend)
+    # the batch's forward pass is shared, so each item is charged an equal part of it
+    inference_ms = (time.perf_counter() - start) * 1000 / len(items)
+
+    for item, prediction in zip(items, predictions):
+        item["prediction"] = prediction
+        item["batch_size"] = len(items)
+        item["inference_ms"] = inference_ms
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = get_score(prediction)
+            detected_word = find_most_similar_word(prediction)[0]
+        score, extra, missing = result if isinstance(result, tuple) else (result, [], [])
+        scored = time.perf_counter()
+        feedback = []
+        for extra_phoneme, target in zip(extra, missing):
+            generate_feedback_for_target(extra_phoneme, target, feedback)
+
+        item.update({
+            "detected_word": detected_word,
+            "word_match": None if item["expected_word"] is None else detected_word == item["expected_word"],
+            "score": score,
+            "extra_phonemes": " ".join(extra),
+            "missing_phonemes": " ".join(missing),
+            "feedback": " ".join(feedback),
+            "score_ms": (scored - start) * 1000,
+            "feedback_ms": (time.perf_counter() - scored) * 1000,
+        })
+        item["total_ms"] = sum(item[stage] for stage in STAGES)
+    return items
+
+
+def length_buckets(items, batch_size):
+    """Batches of up to batch_size items with neighbouring lengths."""
+    ordered = sorted(items, key=lambda item: len(item["audio"]))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def summarize(results, wall_seconds):
+    def percentiles(values):
+        if not values:
+            return {}
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {"mean": float(np.mean(values)), "p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+    matched = [r["word_match"] for r in results if r["word_match"] is not None]
+    return {
+        "files": len(results),
+        "wall_seconds": wall_seconds,
+        "files_per_second": len(results) / wall_seconds if wall_seconds else 0.0,
+        "audio_seconds_per_second": sum(r["audio_seconds"] for r in results) / wall_seconds if wall_seconds else 0.0,
+        "mean_score": float(np.mean([r["score"] for r in results])) if results else 0.0,
+        "word_accuracy": sum(matched) / len(matched) if matched else None,
+        "latency_ms": {stage: percentiles([r[stage] for r in results]) for stage in STAGES + ("total_ms",)},
+    }
+
+
+def evaluate(jobs, checkpoint=DEFAULT_CHECKPOINT, workers=None, batch_size=8, backend=None):
+    """Runs every (path, expected word) job through the pipeline and returns (per-file results, summary)."""
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(checkpoint, threads, backend)) as pool:
+        decoded = list(pool.map(_decode, jobs))
+        batches = length_buckets(decoded, batch_size)
+        results = [item for items in pool.map(_score_batch, [(batch, checkpoint, backend) for batch in batches])
+                   for item in items]
+    wall_seconds = time.perf_counter() - start
+    results.sort(key=lambda r: r["path"])
+    return results, summarize(results, wall_seconds)
+
+
+def write_results(results, summary, output_path):
+    if output_path.endswith(".json"):
+        with open(output_path, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2, ensure_ascii=False)
+        return
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()) if results else ["path"])
+        writer.writeheader()
+        writer.writerows(results)
+    with open(os.path.splitext(output_path)[0] + "_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-dir")
+    source.add_argument("--manifest")
+    parser.add_argument("--output", default="batch_eval.csv", help=".csv (plus a _summary.json) or .json")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--backend", default=None, help="inference backend (defaults to the registry's, see model_registry)")
+    args = parser.parse_args()
+
+    if args.manifest:
+        jobs = read_manifest(args.manifest)
+    else:
+        jobs = [(path, guess_word(path)) for path in iter_recordings(args.data_dir)]
+
+    results, summary = evaluate(jobs, args.checkpoint, args.workers, args.batch_size, args.backend)
+    write_results(results, summary, args.output)
+
+    total = summary["latency_ms"].get("total_ms", {})
+    print(f"{summary['files']} files in {summary['wall_seconds']:.1f}s "
+          f"({summary['files_per_second']:.2f} files/s, {summary['audio_seconds_per_second']:.1f} audio s/s)")
+    if total:
+        print(f"per-file latency ms: p50 {total['p50']:.0f}, p90 {total['p90']:.0f}, p99 {total['p99']:.0f}")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Stage-by-stage micro-benchmarks of the audio pipeline over the bundled recordings.
+
+    python -m audio.benchmarks --save-baseline bench_baseline.json
+    python -m audio.benchmarks --baseline bench_baseline.json --threshold 20
+    python -m audio.benchmarks --stub     # deterministic stub model, no weights needed
+
+Each stage is timed per recording after --warmup untimed runs, --repeat times.
+With --baseline, the run fails (exit 1) when a stage's median is more than
+--threshold percent slower than the baseline median. Stages whose tools are not
+installed (ffmpeg, librosa) are skipped.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import wave
+import numpy as np
+from .audio_ingest import SAMPLE_RATE, decode_audio_bytes, iter_recordings
+from .audio_scoring import find_most_similar_word
+from .bank_store import current_bank
+from .phoneme_alignment import align_phonemes
+from .model_registry import DEFAULT_CHECKPOINT, get_model
+from .phoneme_extraction import convert_mov_to_wav, prepare_inputs
+from .vad import trim_silence
+
+
+def read_wav_fallback(path, sr=SAMPLE_RATE):
+    """Decodes a PCM wav with the standard library (linear-interpolation resample), for machines without ffmpeg."""
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        frames = f.readframes(f.getnframes())
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    audio = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if width == 1:
+        audio -= 128
+    audio /= float(2 ** (8 * width - 1))
+    audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != sr:
+        audio = np.interp(np.arange(0, len(audio), rate / sr), np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def build_stages(path, loaded, has_ffmpeg, has_librosa):
+    """Returns (stage name, callable) pairs for one recording. Each stage reuses the
+    previous stages' outputs, computed once up front, so it times only its own work."""
+    with open(path, "rb") as f:
+        data = f.read()
+    audio = decode_audio_bytes(data, loaded.sampling_rate) if has_ffmpeg else read_wav_fallback(path, loaded.sampling_rate)
+    trimmed = trim_silence(audio, loaded.sampling_rate)[0]
+    inputs, _ = prepare_inputs([trimmed], loaded.processor)
+    logits = loaded.backend.logits(inputs)[0]
+    prediction = loaded.decoder.decode_batch([logits])[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        word, _, prediction_phonemes = find_most_similar_word(prediction)
+
+    def ffmpeg_convert():
+        os.remove(convert_mov_to_wav(path))
+
+    def librosa_load():
+        import librosa
+        librosa.load(path, sr=loaded.sampling_rate)
+
+    stages = []
+    if has_ffmpeg:
+        stages.append(("ffmpeg_convert", ffmpeg_convert))
+        stages.append(("ffmpeg_decode", lambda: decode_audio_bytes(data, loaded.sampling_rate)))
+    if has_librosa:
+        stages.append(("librosa_load", librosa_load))
+    stages.append(("vad_trim", lambda: trim_silence(audio, loaded.sampling_rate)))
+    if loaded.backend.name != "stub":
+        stages.append(("processor_normalize", lambda: loaded.processor(
+            trimmed, sampling_rate=loaded.sampling_rate, return_tensors="pt", padding="longest")))
+    stages += [
+        ("prepare_inputs", lambda: prepare_inputs([trimmed], loaded.processor)),
+        ("model_forward", lambda: loaded.backend.logits(inputs)),
+        ("decode_phonemes", lambda: loaded.decoder.decode_batch([logits])),
+        ("find_most_similar_word", lambda: find_most_similar_word(prediction)),
+        ("align_phonemes", lambda: align_phonemes(prediction_phonemes, current_bank().split[word])),
+    ]
+    return stages
+
+
+def run_benchmarks(paths, checkpoint=DEFAULT_CHECKPOINT, backend=None, warmup=2, repeat=5):
+    """Times every stage over every recording; returns {stage: summary stats in ms}."""
+    loaded = get_model(checkpoint, backend)
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    try:
+        import librosa  # noqa: F401
+        has_librosa = True
+    except ImportError:
+        has_librosa = False
+
+    timings = {}
+    # the scoring functions print on every call; keep that out of the terminal (it costs the same every run)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            if not has_ffmpeg and not path.lower().endswith(".wav"):
+                continue
+            for name, stage in build_stages(path, loaded, has_ffmpeg, has_librosa):
+                for _ in range(warmup):
+                    stage()
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    stage()
+                    timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+    return {
+        name: {
+            "median_ms": float(np.median(samples)),
+            "p90_ms": float(np.percentile(samples, 90)),
+            "mean_ms": float(np.mean(samples)),
+            "runs": len(samples),
+        }
+        for name, samples in timings.items()
+    }
+
+
+def find_regressions(results, baseline, threshold_pct, min_delta_ms=0.05):
+    """Stages whose median got slower than the baseline by more than threshold_pct (and min_delta_ms)."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("stages", baseline).get(name)
+        if base is None:
+            continue
+        limit = base["median_ms"] * (1 + threshold_pct / 100)
+        if stats["median_ms"] > limit and stats["median_ms"] - base["median_ms"] > min_delta_ms:
+            regressions.append((name, base["median_ms"], stats["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N recordings")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--stub", action="store_true", help="use the deterministic stub model instead of wav2vec2")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown per stage, in percent")
+    parser.add_argument("--save-baseline", help="write this run's results as a JSON baseline")
+    args = parser.parse_args()
+
+    paths = list(iter_recordings(args.data_dir))[:args.limit]
+    backend = "stub" if args.stub else None
+    results = run_benchmarks(paths, args.checkpoint, backend, args.warmup, args.repeat)
+
+    print(f"{'stage':<24}{'median ms':>12}{'p90 ms':>12}{'runs':>8}")
+    for name, stats in results.items():
+        print(f"{name:<24}{stats['median_ms']:>12.3f}{stats['p90_ms']:>12.3f}{stats['runs']:>8}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"backend": backend or "default", "stages": results}, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms (> {args.threshold:.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"no stage regressed more than {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
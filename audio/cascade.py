@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from .ctc_scoring import score_target
+from .model_registry import DEFAULT_CHECKPOINT, get_model
+from .phoneme_extraction import predict_batch
+
+FIRST_PASS, FULL = "first_pass", "full"
+
+
+def first_pass_confidence(result):
+    """How sure the cheap model is that the target was said correctly: the lowest of the
+    target phonemes' alignment confidences and of their posteriors against every known confusion."""
+    values = [confidence for _, confidence in result.phoneme_confidence]
+    values += [posterior for _, _, _, posterior in result.substitutions]
+    return min(values) if values else 0.0
+
+
+class CascadedInference:
+    """Two-tier inference: a cheap model first, the full model only when needed.
+
+    Items are (audio array, target word) pairs. Clips with a target word go
+    through first_pass_backend (by default the truncated encoder, see
+    inference_backends.TruncatedBackend) and are scored against the target from
+    its logits; a clip whose first_pass_confidence reaches threshold keeps the
+    first-pass result. Everything else (low confidence, no target, a target the
+    model cannot score) runs through the full model. predict_batch has the
+    BatchScheduler infer_batch signature and returns (prediction, logits, tier)
+    per item. stats() reports the escalation rate, per-tier latency and the
+    recent first-pass confidences, for tuning threshold.
+    """
+    def __init__(self, checkpoint=DEFAULT_CHECKPOINT, first_pass_backend="torch-truncated", full_backend=None,
+                 threshold=0.8, history_size=1000):
+        self.checkpoint = checkpoint
+        self.first_pass_backend = first_pass_backend
+        self.full_backend = full_backend
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "with_target": 0, "accepted": 0, "escalated": 0}
+        self._latency = {FIRST_PASS: deque(maxlen=history_size), FULL: deque(maxlen=history_size)}
+        self._confidence = deque(maxlen=history_size)
+
+    def predict_batch(self, items):
+        results = [None] * len(items)
+        # with no first_pass_backend nothing is scored first, so nothing counts as with_target or escalated
+        first = [i for i, (_, target_word) in enumerate(items) if target_word and self.first_pass_backend]
+        escalate = [i for i, (_, target_word) in enumerate(items) if not (target_word and self.first_pass_backend)]
+        confidences = []
+
+        if first:
+            start = time.perf_counter()
+            decoder = get_model(self.checkpoint, self.first_pass_backend).decoder
+            outputs = predict_batch([items[i][0] for i in first], self.checkpoint, return_logits=True,
+                                    backend=self.first_pass_backend)
+            self._record(FIRST_PASS, start, len(first))
+            for i, (prediction, logits) in zip(first, outputs):
+                try:
+                    confidence = first_pass_confidence(score_target(logits, items[i][1], decoder))
+                except ValueError:
+                    confidence = None
+                confidences.append(confidence)
+                if confidence is not None and confidence >= self.threshold:
+                    results[i] = (prediction, logits, FIRST_PASS)
+                else:
+                    escalate.append(i)
+
+        if escalate:
+            escalate.sort()
+            start = time.perf_counter()
+            outputs = predict_batch([items[i][0] for i in escalate], self.checkpoint, return_logits=True,
+                                    backend=self.full_backend)
+            self._record(FULL, start, len(escalate))
+            for i, (prediction, logits) in zip(escalate, outputs):
+                results[i] = (prediction, logits, FULL)
+
+        with self._lock:
+            self._counts["requests"] += len(items)
+            self._counts["with_target"] += len(first)
+            self._counts["accepted"] += sum(result[2] == FIRST_PASS for result in results)
+            self._counts["escalated"] += sum(results[i][2] == FULL for i in first)
+            self._confidence.extend(c for c in confidences if c is not None)
+        return results
+
+    def _record(self, tier, start, size):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._latency[tier].append((elapsed_ms, size))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            latency = {tier: list(samples) for tier, samples in self._latency.items()}
+            confidence = list(self._confidence)
+
+        def summarize(samples):
+            if not samples:
+                return {"batches": 0}
+            per_batch = [ms for ms, _ in samples]
+            return {
+                "batches": len(samples),
+                "median_batch_ms": round(float(np.median(per_batch)), 2),
+                "p90_batch_ms": round(float(np.percentile(per_batch, 90)), 2),
+                "mean_clip_ms": round(sum(per_batch) / sum(size for _, size in samples), 2),
+            }
+
+        return {
+            "first_pass_backend": self.first_pass_backend,
+            "threshold": self.threshold,
+            **counts,
+            "escalation_rate": counts["escalated"] / counts["with_target"] if counts["with_target"] else 0.0,
+            "latency": {tier: summarize(samples) for tier, samples in latency.items()},
+            # where recent first-pass confidences fall, to see what a different threshold would escalate
+            "confidence_percentiles": {
+                str(q): round(float(np.percentile(confidence, q)), 3) for q in (10, 25, 50, 75, 90)
+            } if confidence else {},
+        }
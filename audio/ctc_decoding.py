@@ -0,0 +1,94 @@
+import weakref
+import numpy as np
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+STRESS_MARKS = ("ˈ", "ˌ")
+
+
+class CTCDecoder:
+    """Greedy CTC decoding with the token table precomputed once per model.
+
+    Builds an id -> phoneme lookup array (with and without IPA stress marks) and a
+    special-token mask from the processor, then collapses repeats and drops blanks
+    with tensor ops over a whole batch at once. Python only touches the surviving
+    phonemes of each clip.
+    """
+    def __init__(self, processor, vocab_size=None):
+        tokenizer = processor.tokenizer
+        vocab_size = vocab_size or len(tokenizer)
+        special_ids = set(tokenizer.all_special_ids + [tokenizer.word_delimiter_token_id])
+
+        self.special_mask = torch.ones(vocab_size, dtype=torch.bool)
+        self.tokens = np.full(vocab_size, "", dtype=object)
+        for id_ in range(min(vocab_size, len(tokenizer))):
+            self.tokens[id_] = processor.decode(id_)
+            self.special_mask[id_] = id_ in special_ids
+        self.stressless_tokens = np.array(
+            [token.replace(STRESS_MARKS[0], "").replace(STRESS_MARKS[1], "") for token in self.tokens],
+            dtype=object,
+        )
+        self.blank_id = tokenizer.pad_token_id
+        # phoneme (without stress marks) -> every non-special token id spelling it
+        self.phoneme_ids = {}
+        for id_, token in enumerate(self.stressless_tokens):
+            if token and not self.special_mask[id_]:
+                self.phoneme_ids.setdefault(token, []).append(id_)
+
+    def kept_ids(self, ids, lengths=None):
+        """Collapses consecutive duplicates and removes special tokens for a [batch, frames]
+        tensor of ids. Returns one NumPy array of surviving ids per clip.
+        """
+        ids = torch.as_tensor(ids)
+        if ids.dim() == 1:
+            ids = ids.unsqueeze(0)
+        batch, frames = ids.shape
+        if lengths is None:
+            lengths = torch.full((batch,), frames)
+
+        keep = torch.arange(frames).unsqueeze(0) < torch.as_tensor(lengths).unsqueeze(1)
+        keep[:, 1:] &= ids[:, 1:] != ids[:, :-1]
+        keep &= ~self.special_mask[ids]
+
+        ids_np = ids.numpy()
+        keep_np = keep.numpy()
+        return [ids_np[row][keep_np[row]] for row in range(batch)]
+
+    def to_prediction(self, kept, ignore_stress=True):
+        """Turns one clip's surviving ids into a space-separated phoneme string."""
+        tokens = self.tokens[kept]
+        # get rid of duplicate phonemes at the start and end of the word that cause scoring issues
+        if len(tokens) >= 2 and tokens[0] == tokens[1]:
+            kept = kept[1:]
+            tokens = tokens[1:]
+        if len(tokens) >= 2 and tokens[-1] == tokens[-2]:
+            kept = kept[:-1]
+
+        table = self.stressless_tokens if ignore_stress else self.tokens
+        return " ".join(table[kept])
+
+    def decode_ids(self, ids, lengths=None, ignore_stress=True):
+        """Decodes a [batch, frames] (or [frames]) tensor of argmax ids into phoneme strings."""
+        return [self.to_prediction(kept, ignore_stress) for kept in self.kept_ids(ids, lengths)]
+
+    def decode_batch(self, logits, lengths=None, ignore_stress=True):
+        """Decodes a batch of logits: either a padded [batch, frames, vocab] tensor with
+        optional frame lengths, or a list of per-clip [frames, vocab] tensors.
+        """
+        if isinstance(logits, (list, tuple)):
+            lengths = torch.tensor([len(clip_logits) for clip_logits in logits])
+            ids = pad_sequence([clip_logits.argmax(dim=-1) for clip_logits in logits], batch_first=True)
+        else:
+            ids = logits.argmax(dim=-1)
+        return self.decode_ids(ids, lengths, ignore_stress)
+
+
+_decoders = weakref.WeakKeyDictionary()
+
+
+def decoder_for(processor):
+    """Returns the cached CTCDecoder for a processor, building it on first use."""
+    decoder = _decoders.get(processor)
+    if decoder is None:
+        decoder = _decoders[processor] = CTCDecoder(processor)
+    return decoder
@@ -0,0 +1,181 @@
+from collections import namedtuple
+import numpy as np
+from .audio_feedback import feedback_dictionaries
+from .audio_scoring import normalized_score
+from .bank_store import current_bank
+
+# a phoneme whose aligned frames average below this posterior is reported as not clearly produced
+MIN_PHONEME_CONFIDENCE = 0.3
+
+TargetScore = namedtuple("TargetScore", [
+    "word",
+    "score",               # on the same 0-100 scale as get_score
+    "extra_phonemes",      # confusions heard instead of the target phoneme, paired with...
+    "missing_phonemes",    # ...the target phonemes they replaced, then target phonemes not clearly produced
+    "log_likelihood",      # CTC log-likelihood of the target sequence
+    "phoneme_confidence",  # (phoneme, mean frame posterior along the forced alignment) per target phoneme
+    "substitutions",       # (position, target phoneme, heard phoneme, posterior of the target) for every confusion checked
+])
+
+
+def _logsumexp(a, axis):
+    peak = np.max(a, axis=axis, keepdims=True)
+    peak = np.where(np.isfinite(peak), peak, 0.0)
+    with np.errstate(divide="ignore"):
+        return np.squeeze(np.log(np.sum(np.exp(a - peak), axis=axis, keepdims=True)) + peak, axis=axis)
+
+
+def phoneme_log_probs(logits, decoder, symbols):
+    """[frames, 1 + len(symbols)] log-posteriors: column 0 is the CTC blank and column k + 1
+    is symbols[k], summed over every token spelling it (e.g. stressed variants)."""
+    missing = [symbol for symbol in symbols if symbol not in decoder.phoneme_ids]
+    if missing:
+        raise ValueError(f"Phonemes not in the model vocabulary: {' '.join(missing)}")
+    logits = np.asarray(logits, dtype=np.float64)
+    log_probs = logits - _logsumexp(logits, axis=1)[:, None]
+    columns = [log_probs[:, decoder.blank_id]]
+    columns += [_logsumexp(log_probs[:, decoder.phoneme_ids[symbol]], axis=1) for symbol in symbols]
+    return np.stack(columns, axis=1)
+
+
+def _extend(labels):
+    """CTC label sequences with blanks (0) interleaved: [H, L] -> [H, 2L + 1]."""
+    extended = np.zeros((labels.shape[0], 2 * labels.shape[1] + 1), dtype=np.intp)
+    extended[:, 1::2] = labels
+    return extended
+
+
+def _skip_allowed(extended):
+    # a state may be entered from two back when it is a label different from the previous label
+    skip = np.zeros(extended.shape, dtype=bool)
+    skip[:, 2:] = (extended[:, 2:] != 0) & (extended[:, 2:] != extended[:, :-2])
+    return skip
+
+
+def ctc_log_likelihoods(class_log_probs, labels):
+    """CTC forward log-likelihood of each row of labels ([H, L] column indices into
+    class_log_probs). All hypotheses advance together: emissions for every frame are
+    gathered in one indexing op and each frame is a handful of [H, 2L + 1] array ops."""
+    extended = _extend(labels)
+    skip = _skip_allowed(extended)
+    emissions = class_log_probs[:, extended]  # [T, H, S]
+    frames, states = emissions.shape[0], extended.shape[1]
+    alpha = np.full(extended.shape, -np.inf)
+    if frames == 0:
+        return np.full(len(labels), -np.inf)
+    alpha[:, 0] = emissions[0, :, 0]
+    if states > 1:
+        alpha[:, 1] = emissions[0, :, 1]
+    # frames stay a loop: alpha at t needs alpha at t - 1, and a parallel scan over frames would
+    # multiply [S, S] matrices per frame, more work than these ~100 steps of [H, S] ops for a word
+    for t in range(1, frames):
+        step = alpha.copy()
+        step[:, 1:] = np.logaddexp(step[:, 1:], alpha[:, :-1])
+        step[:, 2:] = np.where(skip[:, 2:], np.logaddexp(step[:, 2:], alpha[:, :-2]), step[:, 2:])
+        alpha = step + emissions[t]
+    return np.logaddexp(alpha[:, -1], alpha[:, -2]) if states > 1 else alpha[:, -1]
+
+
+def forced_alignment(class_log_probs, labels):
+    """Viterbi CTC alignment of one label sequence; returns, for every frame, the index of
+    the label it is aligned to (-1 for blank frames), or None if the clip is too short."""
+    extended = _extend(labels[None, :])[0]
+    skip = _skip_allowed(extended[None, :])[0]
+    emissions = class_log_probs[:, extended]
+    frames, states = emissions.shape
+    if frames == 0:
+        return None
+    score = np.full(states, -np.inf)
+    score[0] = emissions[0, 0]
+    if states > 1:
+        score[1] = emissions[0, 1]
+    back = np.zeros((frames, states), dtype=np.int8)
+    for t in range(1, frames):
+        candidates = np.full((3, states), -np.inf)
+        candidates[0] = score
+        candidates[1, 1:] = score[:-1]
+        candidates[2, 2:] = np.where(skip[2:], score[:-2], -np.inf)
+        back[t] = np.argmax(candidates, axis=0)
+        score = candidates[back[t], np.arange(states)] + emissions[t]
+
+    end = states - 1 if states == 1 or score[-1] >= score[-2] else states - 2
+    if not np.isfinite(score[end]):
+        return None
+    path = np.empty(frames, dtype=np.intp)
+    state = end
+    for t in range(frames - 1, -1, -1):
+        path[t] = state
+        state -= back[t, state]
+    return np.where(path % 2 == 1, (path - 1) // 2, -1)
+
+
+def score_target(logits, target_word, decoder, bank=None):
+    """Scores a clip's frame logits against the word the child was asked to say.
+
+    Instead of decoding and searching the bank, this scores the target's phonemes
+    directly: the forced alignment gives each phoneme's mean frame posterior, and
+    every known confusion of a target phoneme (feedback_dictionaries, e.g. ɹ -> w) is
+    tested by comparing the CTC likelihood of the word with that one phoneme swapped.
+    A confusion more likely than the target counts as a substitution (weighted like
+    get_score) and a phoneme below MIN_PHONEME_CONFIDENCE as missing.
+
+    Raises ValueError for words not in the bank or phonemes the model cannot emit.
+    """
+    bank = bank or current_bank()
+    if target_word not in bank.split:
+        raise ValueError(f"{target_word!r} is not in the word bank")
+    target = bank.split[target_word]
+
+    # every target phoneme, then every confusion the model can emit, as columns of class_log_probs
+    symbols = list(dict.fromkeys(target))
+    hypotheses = [[symbols.index(p) + 1 for p in target]]
+    checked = []
+    for position, phoneme in enumerate(target):
+        for heard in feedback_dictionaries.get(phoneme, {}):
+            if heard not in decoder.phoneme_ids:
+                continue
+            if heard not in symbols:
+                symbols.append(heard)
+            variant = list(hypotheses[0])
+            variant[position] = symbols.index(heard) + 1
+            hypotheses.append(variant)
+            checked.append((position, phoneme, heard))
+    class_log_probs = phoneme_log_probs(logits, decoder, symbols)
+    labels = np.array(hypotheses, dtype=np.intp).reshape(len(hypotheses), len(target))
+    log_likelihoods = ctc_log_likelihoods(class_log_probs, labels)
+
+    confidence = np.zeros(len(target))
+    alignment = forced_alignment(class_log_probs, labels[0])
+    if alignment is not None:
+        aligned = alignment >= 0
+        frame_log_probs = class_log_probs[np.flatnonzero(aligned), labels[0][alignment[aligned]]]
+        counts = np.bincount(alignment[aligned], minlength=len(target))
+        sums = np.bincount(alignment[aligned], weights=frame_log_probs, minlength=len(target))
+        confidence = np.exp(sums / np.maximum(counts, 1)) * (counts > 0)
+
+    # the most likely confusion at each position, if it beats the target
+    substitutions, heard_at = [], {}
+    for (position, phoneme, heard), log_likelihood in zip(checked, log_likelihoods[1:]):
+        competing = [log_likelihoods[0]] + [ll for (p, _, _), ll in zip(checked, log_likelihoods[1:]) if p == position]
+        posterior = float(np.exp(log_likelihoods[0] - np.logaddexp.reduce(competing))) if np.isfinite(log_likelihoods[0]) else 0.0
+        substitutions.append((position, phoneme, heard, posterior))
+        if log_likelihood > log_likelihoods[0] and log_likelihood > heard_at.get(position, (None, -np.inf))[1]:
+            heard_at[position] = (heard, log_likelihood)
+
+    costs = bank.inventory.cost_matrix
+    ids = bank.inventory.ids
+    distance = 0.0
+    extra_phonemes, missing_phonemes = [], []
+    for position in sorted(heard_at):
+        heard = heard_at[position][0]
+        extra_phonemes.append(heard)
+        missing_phonemes.append(target[position])
+        distance += float(costs[ids.get(heard, 0), ids[target[position]]])
+    for position, phoneme in enumerate(target):
+        if position not in heard_at and confidence[position] < MIN_PHONEME_CONFIDENCE:
+            missing_phonemes.append(phoneme)
+            distance += 1.0
+
+    score = normalized_score(distance, len(target)) if target else 0
+    return TargetScore(target_word, score, extra_phonemes, missing_phonemes, float(log_likelihoods[0]),
+                       [(phoneme, float(c)) for phoneme, c in zip(target, confidence)], substitutions)
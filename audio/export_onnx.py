@@ -0,0 +1,61 @@
+"""Exports a Hugging Face wav2vec2 CTC checkpoint to an ONNX graph for the "onnx" inference backend.
+
+    python -m audio.export_onnx [--checkpoint bookbot/wav2vec2-ljspeech-gruut] [--output models/...onnx]
+"""
+import argparse
+import os
+import torch
+from transformers import AutoModelForCTC, AutoProcessor
+from .model_registry import DEFAULT_CHECKPOINT
+from .inference_backends import artifact_path
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wraps the model so the graph has a single `logits` output."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_values, attention_mask=None):
+        return self.model(input_values, attention_mask=attention_mask).logits
+
+
+def export_onnx(checkpoint=DEFAULT_CHECKPOINT, output_path=None, opset=17):
+    """Writes the ONNX graph with dynamic batch and sequence axes and returns its path."""
+    output_path = output_path or artifact_path(checkpoint, ".onnx")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    model = AutoModelForCTC.from_pretrained(checkpoint)
+    model.eval()
+    processor = AutoProcessor.from_pretrained(checkpoint)
+    # only models trained with an attention mask get one as a graph input, matching prepare_inputs
+    use_mask = processor.feature_extractor.return_attention_mask
+
+    sr = processor.feature_extractor.sampling_rate
+    input_values = torch.randn(1, sr)
+    args = (input_values, torch.ones(1, sr, dtype=torch.long)) if use_mask else (input_values,)
+    input_names = ["input_values", "attention_mask"] if use_mask else ["input_values"]
+    dynamic_axes = {name: {0: "batch", 1: "samples"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch", 1: "frames"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model), args, output_path,
+            input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes,
+            opset_version=opset, do_constant_folding=True,
+        )
+    print(f"Exported {checkpoint} to {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--output", default=None, help="defaults to the path the onnx backend loads from")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export_onnx(args.checkpoint, args.output, args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import copy
+import glob
+import json
+import mmap
+import os
+import struct
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForCTC
+
+# where exported artifacts (ONNX graphs, ...) are kept, one file per checkpoint
+MODEL_DIR = os.environ.get("AUDIO_MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"))
+
+
+def artifact_path(checkpoint, suffix):
+    return os.path.join(MODEL_DIR, checkpoint.replace("/", "__") + suffix)
+
+
+# load snapshot weights as copy-on-write views of the file mapping instead of reading them into memory
+MMAP_WEIGHTS = os.environ.get("AUDIO_MODEL_MMAP", "1") == "1"
+
+
+def snapshot_dir(checkpoint):
+    """Local copy of a checkpoint written by audio.model_snapshot (safetensors weights, config, processor)."""
+    return artifact_path(checkpoint, ".snapshot")
+
+
+def resolve_checkpoint(checkpoint):
+    """What to pass to from_pretrained: the local snapshot when there is one, so loading does not
+    depend on the Hugging Face cache or network; otherwise the checkpoint itself."""
+    path = snapshot_dir(checkpoint)
+    return path if os.path.isdir(path) else checkpoint
+
+
+def conv_output_lengths(config, input_lengths):
+    """Number of logit frames the wav2vec2 feature encoder produces for each input length."""
+    lengths = torch.as_tensor(input_lengths)
+    for kernel, stride in zip(config.conv_kernel, config.conv_stride):
+        lengths = torch.div(lengths - kernel, stride, rounding_mode="floor") + 1
+    return lengths
+
+
+# transformer layers kept by the "torch-truncated" first-pass model; unset keeps half of them
+TRUNCATED_LAYERS = int(os.environ["AUDIO_TRUNCATED_LAYERS"]) if os.environ.get("AUDIO_TRUNCATED_LAYERS") else None
+
+
+def gate_path(checkpoint):
+    """Result file written by audio.quantization_gate for a checkpoint."""
+    return artifact_path(checkpoint, ".int8-gate.json")
+
+
+def quantize_dynamic_int8(model):
+    """Dynamic int8 quantization of the model's linear layers (weights int8, activations quantized on the fly)."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _tensor_nbytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_nbytes(v) for v in value)
+    return 0
+
+
+class InferenceBackend:
+    """Runs the acoustic model over a padded batch built by prepare_inputs.
+
+    Subclasses implement logits(inputs), returning a [batch, frames, vocab] tensor.
+    """
+    name = None
+
+    def __init__(self, config):
+        self.config = config
+
+    def logits(self, inputs):
+        raise NotImplementedError
+
+    def output_lengths(self, input_lengths):
+        return conv_output_lengths(self.config, input_lengths)
+
+    def nbytes(self):
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    """Eager PyTorch execution of the Hugging Face model."""
+    name = "torch"
+
+    def __init__(self, model, name="torch"):
+        super().__init__(model.config)
+        self.model = model
+        self.name = name
+
+    def logits(self, inputs):
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+    def nbytes(self):
+        # state_dict rather than parameters() so packed int8 weights are counted too
+        return sum(_tensor_nbytes(value) for value in self.model.state_dict().values())
+
+
+def truncate_encoder(model, num_layers=None):
+    """A view of a wav2vec2 CTC model that runs only its first num_layers transformer layers
+    before the CTC head. Modules are shallow-copied, so every weight is shared with model."""
+    def clone(module):
+        shallow = copy.copy(module)
+        shallow._modules = copy.copy(module._modules)
+        return shallow
+
+    layers = list(model.wav2vec2.encoder.layers)
+    num_layers = num_layers or TRUNCATED_LAYERS or max(1, len(layers) // 2)
+    truncated, wav2vec2, encoder = clone(model), clone(model.wav2vec2), clone(model.wav2vec2.encoder)
+    encoder.layers = torch.nn.ModuleList(layers[:num_layers])
+    wav2vec2.encoder = encoder
+    truncated.wav2vec2 = wav2vec2
+    return truncated
+
+
+class TruncatedBackend(TorchBackend):
+    """Cheap first-pass model: the full model's feature encoder, its first transformer
+    layers and its CTC head (see truncate_encoder).
+
+    The CTC head was trained on the last layer's output, not on these intermediate
+    ones, so expect low confidence and frequent escalation to the full model until
+    a head is fine-tuned for the cut; check the cascade's accept rate before enabling it.
+    """
+    name = "torch-truncated"
+
+    def __init__(self, model, num_layers=None):
+        super().__init__(truncate_encoder(model, num_layers), name=self.name)
+
+    def nbytes(self):
+        # every weight belongs to the full model it was cut from, which the registry
+        # keeps resident (and evicts together with this backend)
+        return 0
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime CPU execution of a graph exported by audio.export_onnx.
+
+    The graph takes input_values (and attention_mask if it was exported with one)
+    with dynamic batch and sequence axes. Full graph optimizations are enabled.
+    """
+    name = "onnx"
+
+    def __init__(self, onnx_path, config, intra_op_threads=None):
+        import onnxruntime as ort
+
+        super().__init__(config)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def logits(self, inputs):
+        feeds = {name: value.numpy() for name, value in inputs.items() if name in self.input_names}
+        (logits,) = self.session.run(["logits"], feeds)
+        return torch.from_numpy(np.asarray(logits))
+
+    def nbytes(self):
+        return os.path.getsize(self.onnx_path)
+
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8, "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def mmap_state_dict(path):
+    """The tensors of a .safetensors file as views of a private mapping of the file.
+
+    Nothing is copied: the weights are read from the page cache on first touch, and every
+    process mapping the same file shares those pages (a write would copy just that page).
+    """
+    with open(path, "rb") as f:
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    state = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // dtype.itemsize
+        tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=8 + header_length + start) if count \
+            else torch.empty(0, dtype=dtype)
+        state[name] = tensor.reshape(info["shape"])
+    return state
+
+
+def load_mapped_model(directory):
+    """Builds the CTC model from a snapshot with its weights memory-mapped (see mmap_state_dict)."""
+    config = AutoConfig.from_pretrained(directory)
+    # no weights are allocated here; load_state_dict(assign=True) puts the mapped tensors in place
+    with torch.device("meta"):
+        model = AutoModelForCTC.from_config(config)
+    state = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.safetensors"))):
+        state.update(mmap_state_dict(path))
+    model.load_state_dict(state, strict=True, assign=True)
+    missing = [name for name, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if missing:
+        raise ValueError(f"Snapshot {directory} does not cover {missing}")
+    return model
+
+
+def load_model(checkpoint):
+    """The eval-mode CTC model for a checkpoint, from its local snapshot when one exists."""
+    source = resolve_checkpoint(checkpoint)
+    if source != checkpoint and MMAP_WEIGHTS:
+        try:
+            model = load_mapped_model(source)
+        except (ValueError, KeyError, RuntimeError) as e:
+            print(f"Could not memory-map {source} ({e}); loading it normally")
+            model = AutoModelForCTC.from_pretrained(source)
+    else:
+        model = AutoModelForCTC.from_pretrained(source)
+    model.eval()
+    return model
+
+
+def load_backend(kind, checkpoint):
+    """Builds an inference backend for a checkpoint. `kind` is "torch", "torch-int8",
+    "torch-truncated" or "onnx".
+
+    "torch-int8" is only loaded once audio.quantization_gate has passed for the checkpoint.
+    """
+    if kind in ("torch", "torch-int8", "torch-truncated"):
+        model = load_model(checkpoint)
+        if kind == "torch":
+            return TorchBackend(model)
+        if kind == "torch-truncated":
+            return TruncatedBackend(model)
+        check_int8_gate(checkpoint)
+        return TorchBackend(quantize_dynamic_int8(model), name=kind)
+    if kind == "onnx":
+        onnx_path = artifact_path(checkpoint, ".onnx")
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"No ONNX export for {checkpoint} at {onnx_path}; run python -m audio.export_onnx first")
+        return OnnxBackend(onnx_path, AutoConfig.from_pretrained(resolve_checkpoint(checkpoint)))
+    raise ValueError(f"Unknown inference backend: {kind}")
+
+
+def check_int8_gate(checkpoint):
+    """Refuses the quantized model unless the accuracy gate has passed for this checkpoint."""
+    path = gate_path(checkpoint)
+    if not os.path.exists(path):
+        raise RuntimeError(f"int8 model for {checkpoint} has not been gated; run python -m audio.quantization_gate")
+    with open(path) as f:
+        gate = json.load(f)
+    if not gate.get("passed"):
+        raise RuntimeError(f"int8 model for {checkpoint} failed its accuracy gate: {gate.get('reasons')}")
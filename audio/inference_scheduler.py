@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """Collects concurrent inference requests into micro-batches.
+
+    A background thread waits for the first pending request, then keeps
+    collecting until either max_batch_size requests are queued or max_wait_ms
+    has passed since that first request. The whole batch goes through a single
+    call to infer_batch, and each caller gets its own result back on a Future.
+    """
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10, history_size=1000):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._history = deque(maxlen=history_size)
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue one input and return a Future for its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result(timeout=timeout)
+
+    def stats(self):
+        """Per-batch occupancy stats for the most recent batches."""
+        with self._stats_lock:
+            history = list(self._history)
+            batches, requests = self._batches, self._requests
+        sizes = [batch["size"] for batch in history]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "total_batches": batches,
+            "total_requests": requests,
+            "queue_depth": self._queue.qsize(),
+            "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "mean_occupancy": sum(sizes) / (len(sizes) * self.max_batch_size) if sizes else 0.0,
+            "recent_batches": history[-20:],
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            start = time.perf_counter()
+            try:
+                results = list(self.infer_batch(items))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                results = None
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if results is not None:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+                # a short result list must not leave the remaining callers waiting forever
+                for future in futures[len(results):]:
+                    future.set_exception(RuntimeError(f"infer_batch returned {len(results)} results for {len(futures)} items"))
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._history.append({
+                    "size": len(batch),
+                    "occupancy": len(batch) / self.max_batch_size,
+                    "inference_ms": round(elapsed_ms, 2),
+                    "failed": results is None or len(results) < len(batch),
+                })
@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+from transformers import AutoProcessor
+from .ctc_decoding import CTCDecoder
+from .inference_backends import TruncatedBackend, load_backend, resolve_checkpoint
+
+DEFAULT_CHECKPOINT = "bookbot/wav2vec2-ljspeech-gruut"
+# "torch" (eager PyTorch), "torch-int8" (dynamic int8, needs a passing audio.quantization_gate)
+# "onnx" (ONNX Runtime over an artifact from audio.export_onnx) or "stub" (no weights, see audio.stub_model);
+# "torch-truncated" (first transformer layers only) is the cheap first pass of audio.cascade
+DEFAULT_BACKEND = os.environ.get("AUDIO_INFERENCE_BACKEND", "torch")
+
+
+class LoadedModel:
+    """An inference backend and processor pair held by the registry. depends_on is the
+    registry key of the entry whose weights this one shares, if any."""
+    def __init__(self, checkpoint, backend, processor, depends_on=None):
+        self.checkpoint = checkpoint
+        self.backend = backend
+        self.processor = processor
+        self.depends_on = depends_on
+        self.sampling_rate = processor.feature_extractor.sampling_rate
+        self.nbytes = backend.nbytes()
+        # id -> phoneme table and special-token mask, built once per model
+        self.decoder = CTCDecoder(processor, backend.config.vocab_size)
+
+    @property
+    def model(self):
+        """The underlying PyTorch model (torch backend only)."""
+        return getattr(self.backend, "model", None)
+
+
+class ModelRegistry:
+    """Loads each checkpoint once per process and keeps it resident.
+
+    Entries are keyed by (checkpoint, backend) and kept in least-recently-used
+    order. When a memory budget is set, loading a new entry evicts the least
+    recently used ones until the resident total fits (the entry being requested
+    is never evicted). An entry that shares another's weights (torch-truncated)
+    is evicted together with it.
+    """
+    def __init__(self, memory_budget_bytes=None, default_backend=DEFAULT_BACKEND):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.default_backend = default_backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, checkpoint=DEFAULT_CHECKPOINT, backend=None):
+        """Return the LoadedModel for a checkpoint, loading it on a cold miss."""
+        key = (checkpoint, backend or self.default_backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.depends_on in self._entries:
+                    self._entries.move_to_end(entry.depends_on)
+                self._entries.move_to_end(key)
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # load outside the registry lock so other checkpoints stay servable
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(*key)
+                with self._lock:
+                    self._entries[key] = entry
+                    self._enforce_budget(keep=key)
+        return entry
+
+    def warm_up(self, checkpoints=(DEFAULT_CHECKPOINT,), backend=None):
+        """Eagerly load checkpoints, e.g. when a worker boots."""
+        for checkpoint in checkpoints:
+            self.get(checkpoint, backend)
+
+    def is_warm(self, checkpoint=DEFAULT_CHECKPOINT, backend=None):
+        with self._lock:
+            return (checkpoint, backend or self.default_backend) in self._entries
+
+    def evict(self, checkpoint, backend=None):
+        with self._lock:
+            key = (checkpoint, backend or self.default_backend)
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def status(self):
+        """Warm/cold state of the registry, least recently used first."""
+        with self._lock:
+            models = [
+                {"checkpoint": checkpoint, "backend": backend, "warm": True, "bytes": entry.nbytes}
+                for (checkpoint, backend), entry in self._entries.items()
+            ]
+        return {
+            "default_backend": self.default_backend,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": sum(m["bytes"] for m in models),
+            "models": models,
+        }
+
+    def _load(self, checkpoint, backend):
+        if backend == "stub":
+            # deterministic stand-in that loads no weights, for benchmarks and offline runs
+            from .stub_model import StubBackend
+            stub = StubBackend()
+            return LoadedModel(checkpoint, stub, stub.processor)
+        if backend == "torch-truncated":
+            # cut from the resident full model so the weights are not loaded twice
+            full = self.get(checkpoint, "torch")
+            return LoadedModel(checkpoint, TruncatedBackend(full.model), full.processor,
+                               depends_on=(checkpoint, "torch"))
+        processor = AutoProcessor.from_pretrained(resolve_checkpoint(checkpoint))
+        return LoadedModel(checkpoint, load_backend(backend, checkpoint), processor)
+
+    def _enforce_budget(self, keep):
+        if self.memory_budget_bytes is None:
+            return
+        total = sum(entry.nbytes for entry in self._entries.values())
+        pinned = {keep, self._entries[keep].depends_on}
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            if key in pinned or key not in self._entries:
+                continue
+            total -= self._pop(key)
+
+    def _pop(self, key):
+        """Removes an entry and those sharing its weights; returns the bytes freed."""
+        freed = self._entries.pop(key).nbytes
+        for other in [k for k, entry in self._entries.items() if entry.depends_on == key]:
+            freed += self._entries.pop(other).nbytes
+        return freed
+
+
+def _budget_from_env():
+    budget_mb = os.environ.get("AUDIO_MODEL_MEMORY_BUDGET_MB")
+    return int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+
+
+# process-wide registry shared by every request handled by this worker
+registry = ModelRegistry(memory_budget_bytes=_budget_from_env())
+
+
+def get_model(checkpoint=DEFAULT_CHECKPOINT, backend=None):
+    return registry.get(checkpoint, backend)
@@ -0,0 +1,61 @@
+"""Saves a local snapshot (safetensors weights, config and processor) of a checkpoint for the model registry.
+
+    python -m audio.model_snapshot [--checkpoint bookbot/wav2vec2-ljspeech-gruut ...] [--output models/...snapshot]
+
+Once a snapshot exists, workers load from it instead of the Hugging Face cache, with the
+weights memory-mapped so every worker on the host shares one copy (AUDIO_MODEL_MMAP=0 reads
+them into each process instead).
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from transformers import AutoModelForCTC, AutoProcessor
+from .model_registry import DEFAULT_CHECKPOINT
+from .inference_backends import load_mapped_model, snapshot_dir
+
+
+def save_snapshot(checkpoint=DEFAULT_CHECKPOINT, output_dir=None):
+    """Writes the snapshot directory (replacing any previous one as a whole) and returns its path."""
+    output_dir = os.path.abspath(output_dir or snapshot_dir(checkpoint))
+    parent = os.path.dirname(output_dir)
+    os.makedirs(parent, exist_ok=True)
+
+    model = AutoModelForCTC.from_pretrained(checkpoint)
+    processor = AutoProcessor.from_pretrained(checkpoint)
+    # written next to the destination and renamed into place, so a worker never sees half a snapshot
+    staging = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+    try:
+        model.save_pretrained(staging, safe_serialization=True)
+        processor.save_pretrained(staging)
+        # fail here rather than in a worker if the weights cannot be mapped back
+        load_mapped_model(staging)
+        if os.path.isdir(output_dir):
+            previous = output_dir + ".old"
+            shutil.rmtree(previous, ignore_errors=True)
+            os.rename(output_dir, previous)
+            os.rename(staging, output_dir)
+            shutil.rmtree(previous, ignore_errors=True)
+        else:
+            os.rename(staging, output_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+    print(f"Saved {checkpoint} to {output_dir} ({size / 1e6:.1f} MB)")
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", nargs="+", default=[DEFAULT_CHECKPOINT])
+    parser.add_argument("--output", default=None, help="defaults to the path the registry loads from (one checkpoint only)")
+    args = parser.parse_args()
+    if args.output and len(args.checkpoint) > 1:
+        parser.error("--output only applies to a single checkpoint")
+    for checkpoint in args.checkpoint:
+        save_snapshot(checkpoint, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from array import array
+from collections import namedtuple
+import numpy as np
+from .phoneme_inventory import INVENTORY
+
+Alignment = namedtuple("Alignment", [
+    "distance",            # weighted edit distance
+    "aligned_prediction",  # prediction with "-" where a correct phoneme is missing
+    "aligned_correct",     # correct phonemes with "-" where the prediction has an extra one
+    "extra_phonemes",      # predicted phonemes that were substituted or inserted, in order
+    "missing_phonemes",    # correct phonemes that were substituted or deleted, in order
+    "substitutions",       # (predicted, correct) pairs
+])
+
+_DIAGONAL, _EXTRA, _MISSING = 0, 1, 2
+
+
+def align_ids(prediction_ids, correct_ids, costs=None):
+    """Weighted edit-distance alignment of two interned phoneme id arrays.
+
+    Insertions and deletions cost 1 and substitutions cost the pair's entry in the
+    inventory's dense cost matrix (compiled from the phoneme similarity table), so
+    similar-sounding swaps are penalized less. The pair's substitution costs are
+    gathered from the matrix in one vectorized lookup; the cost and backpointer
+    tables are flat typed arrays, so no Python objects are allocated per cell.
+
+    Returns the distance and the alignment path as (prediction index, correct index)
+    pairs, with None on the side of a gap.
+    """
+    costs = INVENTORY.cost_matrix if costs is None else costs
+    n, m = len(prediction_ids), len(correct_ids)
+    width = m + 1
+    substitution = costs[np.ix_(np.asarray(prediction_ids, dtype=np.intp), np.asarray(correct_ids, dtype=np.intp))]
+    cost = array("d", bytes(8 * (n + 1) * width))
+    back = array("B", bytes((n + 1) * width))
+    for j in range(1, width):
+        cost[j] = j
+        back[j] = _MISSING
+    for i in range(1, n + 1):
+        row, prev = i * width, (i - 1) * width
+        cost[row] = i
+        back[row] = _EXTRA
+        row_costs = substitution[i - 1].tolist()
+        for j in range(1, width):
+            # ties prefer the diagonal so mismatches pair up as substitutions
+            best = cost[prev + j - 1] + row_costs[j - 1]
+            move = _DIAGONAL
+            extra = cost[prev + j] + 1
+            if extra < best:
+                best, move = extra, _EXTRA
+            missing = cost[row + j - 1] + 1
+            if missing < best:
+                best, move = missing, _MISSING
+            cost[row + j] = best
+            back[row + j] = move
+
+    path = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        move = back[i * width + j]
+        if move == _DIAGONAL:
+            i, j = i - 1, j - 1
+            path.append((i, j))
+        elif move == _EXTRA:
+            i -= 1
+            path.append((i, None))
+        else:
+            j -= 1
+            path.append((None, j))
+    path.reverse()
+    return cost[n * width + m], path
+
+
+def _encode(symbols, inventory, extra):
+    """Ids for symbols; ones the inventory lacks get ids past its end, recorded in extra."""
+    ids = inventory.ids
+    return np.array([ids[s] if s in ids else extra.setdefault(s, len(inventory) + len(extra)) for s in symbols],
+                    dtype=np.intp)
+
+
+def align_phonemes(prediction, correct, prediction_ids=None, correct_ids=None, inventory=INVENTORY):
+    """Aligns a predicted phoneme list against the correct one (see align_ids).
+
+    The id arrays are encoded with inventory from the symbol lists unless the caller
+    already has them. Symbols the inventory does not know (e.g. in a target outside
+    the bank) get ids for this call only, matching themselves and costing 1 against
+    everything else, so the shared inventory is never modified.
+    """
+    extra = {}
+    if correct_ids is None:
+        correct_ids = _encode(correct, inventory, extra)
+    if prediction_ids is None:
+        prediction_ids = _encode(prediction, inventory, extra)
+    costs = inventory.cost_matrix
+    if extra:
+        n = len(inventory)
+        costs = np.ones((n + len(extra), n + len(extra)), dtype=costs.dtype)
+        costs[:n, :n] = inventory.cost_matrix
+        costs[np.arange(n, n + len(extra)), np.arange(n, n + len(extra))] = 0.0
+    distance, path = align_ids(prediction_ids, correct_ids, costs)
+
+    aligned_prediction, aligned_correct = [], []
+    extra_phonemes, missing_phonemes, substitutions = [], [], []
+    for i, j in path:
+        p = "-" if i is None else prediction[i]
+        c = "-" if j is None else correct[j]
+        aligned_prediction.append(p)
+        aligned_correct.append(c)
+        if i is not None and j is not None:
+            if p != c:
+                extra_phonemes.append(p)
+                missing_phonemes.append(c)
+                substitutions.append((p, c))
+        elif i is not None:
+            extra_phonemes.append(p)
+        else:
+            missing_phonemes.append(c)
+    return Alignment(distance, aligned_prediction, aligned_correct,
+                     extra_phonemes, missing_phonemes, substitutions)
@@ -1,44 +1,23 @@
 import torch
-from transformers import AutoProcessor, AutoModelForCTC, Wav2Vec2Processor
-import librosa
+from transformers import Wav2Vec2Processor
 import torch
-from itertools import groupby
 import subprocess
 import os
 import tempfile
-import sounddevice as sd
+import numpy as np
+from .model_registry import DEFAULT_CHECKPOINT, get_model
+from .audio_ingest import decode_audio_file
+from .vad import trim_silence
+from .ctc_decoding import decoder_for
 
 def decode_phonemes(ids: torch.Tensor, processor: Wav2Vec2Processor, ignore_stress: bool = True) -> str:
-    """CTC-like decoding. First removes consecutive duplicates, then removes special tokens."""
-    # removes consecutive duplicates
-    ids = [id_ for id_, _ in groupby(ids)]
-
-    special_token_ids = processor.tokenizer.all_special_ids + [
-        processor.tokenizer.word_delimiter_token_id
-    ]
-    # converts id to token, skipping special tokens
-    phonemes = [processor.decode(id_) for id_ in ids if id_ not in special_token_ids]
-
-    # get rid of duplicate phonemes at the start that cause scoring issues
-    print("Original phonemes: " + str(phonemes))
-    if len(phonemes) >= 2 and phonemes[0] == phonemes[1]:
-        phonemes.pop(0)
-    print("Duplicate removed phonemes: " + str(phonemes))
-    
-    # and also remove duplicates at end of word
-    if len(phonemes) >= 2 and phonemes[-1] == phonemes[-2]:
-        phonemes.pop()
-
-    # joins phonemes
-    prediction = " ".join(phonemes)
-
-    # whether to ignore IPA stress marks
-    if ignore_stress == True:
-        prediction = prediction.replace("ˈ", "").replace("ˌ", "")
-
-    return prediction
+    """CTC-like decoding of one clip's argmax ids. First removes consecutive duplicates, then removes special tokens.
+    Batched callers should use the model's CTCDecoder directly."""
+    return decoder_for(processor).decode_ids(ids, ignore_stress=ignore_stress)[0]
 
 def play_audio(audio_array, sr):
+    # imported on use: sounddevice needs PortAudio, which servers usually lack
+    import sounddevice as sd
     sd.play(audio_array, sr, device = 1)
     sd.wait()
 
@@ -61,33 +40,134 @@ def convert_mov_to_wav(input_path):
         print(f"Error during conversion: {e}")
         return None
 
-def extract_phonemes(audiofile):
-    checkpoint = "bookbot/wav2vec2-ljspeech-gruut"
-    model = AutoModelForCTC.from_pretrained(checkpoint)
-    processor = AutoProcessor.from_pretrained(checkpoint)
+# clips longer than this are run in overlapping windows instead of in one pass
+CHUNK_LENGTH_S = 10.0
+# audio shared by neighbouring windows on each side; frames in it are taken from whichever window sees more context
+CHUNK_STRIDE_S = 1.0
+
+def prepare_inputs(audio_arrays, processor):
+    """Builds the padded model input for a batch of 16 kHz float32 clips.
+
+    Each clip is normalized (zero mean, unit variance, as the feature extractor does)
+    directly into its row of one preallocated buffer, so the decoded arrays are read
+    in place and written exactly once instead of going through the processor's
+    intermediate lists and arrays.
+    """
+    feature_extractor = processor.feature_extractor
+    lengths = [len(a) for a in audio_arrays]
+    input_values = np.full((len(audio_arrays), max(lengths)), feature_extractor.padding_value, dtype=np.float32)
+    attention_mask = np.zeros((len(audio_arrays), max(lengths)), dtype=np.int64)
+
+    for row, mask, audio_array, length in zip(input_values, attention_mask, audio_arrays, lengths):
+        if feature_extractor.do_normalize:
+            np.subtract(audio_array, audio_array.mean(), out=row[:length])
+            row[:length] /= np.sqrt(audio_array.var() + 1e-7)
+        else:
+            row[:length] = audio_array
+        mask[:length] = 1
+
+    # torch.from_numpy shares memory with the batch buffer
+    inputs = {"input_values": torch.from_numpy(input_values)}
+    # the attention mask is only passed for models trained with it
+    if feature_extractor.return_attention_mask:
+        inputs["attention_mask"] = torch.from_numpy(attention_mask)
+    return inputs, torch.tensor(lengths)
+
+def batch_logits(audio_arrays, backend, processor):
+    """Padded forward passes; returns each clip's frame logits without its padding frames.
+
+    Models without an attention mask see the padding, which shifts the group-norm
+    statistics of the shorter clips, so for those only clips of equal length share a pass.
+    """
+    if processor.feature_extractor.return_attention_mask:
+        groups = [list(range(len(audio_arrays)))]
+    else:
+        by_length = {}
+        for i, audio_array in enumerate(audio_arrays):
+            by_length.setdefault(len(audio_array), []).append(i)
+        groups = list(by_length.values())
+
+    results = [None] * len(audio_arrays)
+    for group in groups:
+        inputs, input_lengths = prepare_inputs([audio_arrays[i] for i in group], processor)
+        logits = backend.logits(inputs)
+        frame_lengths = backend.output_lengths(input_lengths)
+        for row, i in enumerate(group):
+            results[i] = logits[row, :frame_lengths[row]]
+    return results
+
+def chunked_logits(audio_array, backend, processor, chunk_length_s=CHUNK_LENGTH_S, stride_length_s=CHUNK_STRIDE_S):
+    """Frame logits for a long clip, computed over overlapping windows with bounded memory.
+
+    Windows are chunk_length_s long and overlap their neighbours by 2 * stride_length_s.
+    Window starts are whole frames apart, so a window's local frame j is global frame
+    start // ratio + j; each window contributes the global frames from where the previous
+    one stopped up to stride before its own end, so every output frame comes from a window
+    where it had context on both sides and none is skipped or repeated.
+    """
     sr = processor.feature_extractor.sampling_rate
-
-    print(f"Received audio file: {audiofile.name}")
-    # wav_path = audiofile.name.replace(".mov", ".wav")
-    wav_path = convert_mov_to_wav(audiofile.name)
-
-    # reading a single audio file
-    # audio_array, _ = librosa.load(audiofile, sr=sr)
-    # audio_array, _ = librosa.load(audiofile.path, sr=sr)
-    audio_array, _ = librosa.load(wav_path, sr=sr)
-    print(f"Audio file loaded. Sample rate: {sr}, Audio length: {len(audio_array)} samples")
+    ratio = backend.config.inputs_to_logits_ratio
+    chunk_len = int(round(chunk_length_s * sr / ratio)) * ratio
+    stride = int(round(stride_length_s * sr / ratio)) * ratio
+    step = chunk_len - 2 * stride
+    if step <= 0:
+        raise ValueError("chunk_length_s must be more than twice stride_length_s")
+
+    pieces = []
+    n = len(audio_array)
+    next_frame = 0
+    for start in range(0, n, step):
+        end = min(start + chunk_len, n)
+        logits = batch_logits([audio_array[start:end]], backend, processor)[0]
+        offset = start // ratio
+        # a window of k frames' worth of samples yields fewer than k frames, so clamp to what it produced
+        stop = offset + logits.shape[0] if end == n else min(offset + logits.shape[0], (end - stride) // ratio)
+        pieces.append(logits[next_frame - offset:stop - offset])
+        next_frame = stop
+        if end == n:
+            break
+    return torch.cat(pieces)
+
+def predict_logits(audio_arrays, checkpoint=DEFAULT_CHECKPOINT, chunk_length_s=CHUNK_LENGTH_S, stride_length_s=CHUNK_STRIDE_S, backend=None):
+    """Frame logits for each clip. Clips up to chunk_length_s share one batched pass, longer ones are windowed."""
+    # model and processor are loaded once per worker process by the registry
+    loaded = get_model(checkpoint, backend)
+    max_samples = int(chunk_length_s * loaded.sampling_rate)
+
+    short = [i for i, a in enumerate(audio_arrays) if len(a) <= max_samples]
+    results = [None] * len(audio_arrays)
+    if short:
+        for i, logits in zip(short, batch_logits([audio_arrays[i] for i in short], loaded.backend, loaded.processor)):
+            results[i] = logits
+    for i, audio_array in enumerate(audio_arrays):
+        if results[i] is None:
+            results[i] = chunked_logits(audio_array, loaded.backend, loaded.processor, chunk_length_s, stride_length_s)
+    return results
+
+def predict_batch(audio_arrays, checkpoint=DEFAULT_CHECKPOINT, return_logits=False, backend=None):
+    """Runs batched inference over several clips and decodes each clip's phonemes.
+    With return_logits, each result is a (prediction, frame logits array) pair."""
+    decoder = get_model(checkpoint, backend).decoder
+    logits = predict_logits(audio_arrays, checkpoint, backend=backend)
+    predictions = decoder.decode_batch(logits, ignore_stress=True)
+    if return_logits:
+        return [(prediction, clip_logits.numpy()) for prediction, clip_logits in zip(predictions, logits)]
+    return predictions
+
+def extract_phonemes(audiofile, checkpoint=DEFAULT_CHECKPOINT, trim=True):
+    """Extracts phonemes from a recording given as a path, an open file, or an already decoded 16 kHz array."""
+    if isinstance(audiofile, np.ndarray):
+        audio_array = audiofile
+    else:
+        # single ffmpeg pass straight to a 16 kHz mono float32 buffer
+        audio_array = decode_audio_file(audiofile, get_model(checkpoint).sampling_rate)
+    print(f"Audio decoded. Audio length: {len(audio_array)} samples")
+    if trim:
+        # silent lead-in/tail still costs a full encoder pass, so crop to the speech region
+        audio_array, leading, trailing = trim_silence(audio_array, get_model(checkpoint).sampling_rate)
+        print(f"Trimmed {leading + trailing} samples of silence ({leading} leading, {trailing} trailing)")
     # play_audio(audio_array, sr)
-    inputs = processor(audio_array, return_tensors="pt", padding="longest", truncation=True, max_length=60000)
-
-    with torch.no_grad():
-        logits = model(inputs["input_values"]).logits
-
-    predicted_ids = torch.argmax(logits, dim=-1)
-    prediction = decode_phonemes(predicted_ids[0], processor, ignore_stress=True)
+    prediction = predict_batch([audio_array], checkpoint)[0]
     # => should give 'b ɪ k ʌ z j u ɚ z s l i p ɪ ŋ ɪ n s t ɛ d ə v k ɔ ŋ k ɚ ɪ ŋ ð ə l ʌ v l i ɹ z p ɹ ɪ n s ə s h æ z b ɪ k ʌ m ə v f ɪ t ə l w ɪ θ n b oʊ p ɹ ə ʃ æ ɡ i s ɪ t s ð ɛ ɹ ə k u ɪ ŋ d ʌ v'
 
-    os.remove(wav_path)
     return prediction
-
-
-
@@ -0,0 +1,129 @@
+import heapq
+import Levenshtein
+import numpy as np
+
+
+class _Node:
+    __slots__ = ("phonemes", "entries", "children")
+
+    def __init__(self, phonemes, entry):
+        self.phonemes = phonemes
+        # (bank order, word) for every word with exactly these phonemes
+        self.entries = [entry]
+        self.children = {}
+
+
+class PhonemeIndex:
+    """BK-tree over the phoneme sequences of a word bank, under Levenshtein distance.
+
+    Sequences may be symbol lists or interned id arrays (see phoneme_inventory), as
+    long as entries and queries use the same representation.
+
+    Lookups only visit subtrees that the triangle inequality cannot rule out, and
+    skip the distance computation for nodes whose length difference alone already
+    exceeds the search radius. Ties are broken by bank order, so nearest() returns
+    exactly what a linear scan keeping the first strictly-smaller distance returns.
+    """
+    def __init__(self, bank_split):
+        self._root = None
+        self._size = 0
+        for word, phonemes in bank_split.items():
+            self.add(word, phonemes)
+
+    @classmethod
+    def from_compiled(cls, bank):
+        """Index over a CompiledBank's id arrays; query it with inventory-encoded arrays."""
+        return cls(dict(zip(bank.words, bank.entries)))
+
+    @classmethod
+    def from_arrays(cls, words, sequences, node_parent, node_edge, entry_node):
+        """Rebuilds an index saved with to_arrays, without computing any distances."""
+        index = cls({})
+        nodes = [None] * len(node_parent)
+        for order, (word, node) in enumerate(zip(words, entry_node.tolist())):
+            if nodes[node] is None:
+                nodes[node] = _Node(sequences[order], (order, word))
+            else:
+                nodes[node].entries.append((order, word))
+        for node, parent, edge in zip(nodes[1:], node_parent[1:].tolist(), node_edge[1:].tolist()):
+            nodes[parent].children[edge] = node
+        index._root = nodes[0] if nodes else None
+        index._size = len(words)
+        return index
+
+    def __len__(self):
+        return self._size
+
+    def to_arrays(self):
+        """The tree shape as int32 arrays (node_parent, node_edge, entry_node).
+
+        Nodes are numbered parents first, the root being node 0 (its parent and edge are -1);
+        entry_node maps each word, in bank order, to the node holding its phonemes.
+        """
+        node_parent, node_edge = [], []
+        entry_node = np.zeros(self._size, dtype=np.int32)
+        queue = [(self._root, -1, -1)] if self._root is not None else []
+        for node, parent, edge in queue:
+            number = len(node_parent)
+            node_parent.append(parent)
+            node_edge.append(edge)
+            for order, _ in node.entries:
+                entry_node[order] = number
+            queue.extend((child, number, child_edge) for child_edge, child in node.children.items())
+        return np.array(node_parent, dtype=np.int32), np.array(node_edge, dtype=np.int32), entry_node
+
+    def add(self, word, phonemes):
+        entry = (self._size, word)
+        self._size += 1
+        if self._root is None:
+            self._root = _Node(phonemes, entry)
+            return
+        node = self._root
+        while True:
+            distance = Levenshtein.distance(phonemes, node.phonemes)
+            if distance == 0:
+                node.entries.append(entry)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(phonemes, entry)
+                return
+            node = child
+
+    def top_k(self, phonemes, k=1):
+        """The k closest words as (word, distance) pairs, nearest first, ties in bank order."""
+        if self._root is None or k <= 0:
+            return []
+        # max-heap of the best k so far, keyed on (distance, bank order)
+        best = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            radius = -best[0][0] if len(best) == k else None
+            if radius is not None and abs(len(node.phonemes) - len(phonemes)) > radius:
+                # cannot be in the result, but its subtree may still hold closer words
+                lower = abs(len(node.phonemes) - len(phonemes))
+                distance = None
+            else:
+                distance = Levenshtein.distance(phonemes, node.phonemes)
+                for order, word in node.entries:
+                    item = (-distance, -order, word)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+            radius = -best[0][0] if len(best) == k else None
+            for edge, child in node.children.items():
+                if distance is None:
+                    # only a lower bound on the distance to this node is known, so keep every
+                    # child some distance >= lower could still reach within the radius
+                    if edge + radius >= lower:
+                        stack.append(child)
+                elif radius is None or abs(edge - distance) <= radius:
+                    stack.append(child)
+        return [(word, -neg_distance) for neg_distance, _, word in sorted(best, reverse=True)]
+
+    def nearest(self, phonemes):
+        """(word, distance) of the closest word, or (None, inf) for an empty index."""
+        result = self.top_k(phonemes, 1)
+        return result[0] if result else (None, float("inf"))
@@ -0,0 +1,127 @@
+import numpy as np
+from .phonemes import phoneme_bank_split
+from .phoneme_similarity import PHONEME_SIMILARITY
+
+# id 0 stands for any symbol the inventory has not seen (e.g. a phoneme only the model emits);
+# it never occurs in the bank, so it costs the same as the real symbol would
+UNKNOWN_ID = 0
+
+
+class PhonemeInventory:
+    """Interns IPA symbols to small integers so phoneme sequences can be stored and
+    compared as compact integer arrays instead of lists of strings.
+
+    An inventory is built up while a bank is compiled and then frozen, after which it
+    is only read, so request threads can share it without locking.
+    """
+    def __init__(self, symbols=()):
+        self.symbols = ["<unk>"]
+        self.ids = {}
+        self.frozen = False
+        self._cost_matrix = None
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def intern(self, symbol):
+        id_ = self.ids.get(symbol)
+        if id_ is None:
+            if self.frozen:
+                raise ValueError(f"Cannot add {symbol!r} to a frozen phoneme inventory")
+            id_ = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._cost_matrix = None
+        return id_
+
+    def encode(self, phonemes):
+        """uint16 id array for a list of symbols; unseen symbols map to UNKNOWN_ID."""
+        ids = self.ids
+        return np.fromiter((ids.get(p, UNKNOWN_ID) for p in phonemes), dtype=np.uint16, count=len(phonemes))
+
+    def decode(self, ids):
+        return [self.symbols[id_] for id_ in ids]
+
+    def compile_costs(self, similarity):
+        """Dense symmetric substitution-cost matrix: 0 on the diagonal, the similarity
+        weight for listed pairs (in either order) and 1 everywhere else."""
+        for pair in similarity:
+            for symbol in pair:
+                self.intern(symbol)
+        n = len(self.symbols)
+        costs = np.ones((n, n), dtype=np.float64)
+        np.fill_diagonal(costs, 0.0)
+        for (a, b), weight in similarity.items():
+            costs[self.ids[a], self.ids[b]] = weight
+            costs[self.ids[b], self.ids[a]] = weight
+        # two unseen symbols are not known to be equal
+        costs[UNKNOWN_ID, UNKNOWN_ID] = 1.0
+        self._cost_matrix = costs
+        return costs
+
+    def freeze(self, similarity=PHONEME_SIMILARITY):
+        """Interns the similarity symbols, compiles the cost matrix and stops accepting
+        new symbols. Returns the inventory."""
+        if not self.frozen:
+            self.compile_costs(similarity)
+            self.frozen = True
+        return self
+
+    @property
+    def cost_matrix(self):
+        if self._cost_matrix is None:
+            self.compile_costs(PHONEME_SIMILARITY)
+        return self._cost_matrix
+
+
+class CompiledBank:
+    """A word bank with every entry stored as interned ids in one flat uint16 array.
+
+    Entry i is flat[offsets[i]:offsets[i + 1]]; `entries` holds those slices as
+    zero-copy memoryviews for the distance routines, so flat can also be a
+    read-only buffer over a memory-mapped snapshot (see bank_store).
+    """
+    def __init__(self, words, flat, offsets, inventory):
+        self.words = list(words)
+        self.flat = flat
+        self.offsets = offsets
+        self.inventory = inventory
+        self.word_ids = {word: i for i, word in enumerate(self.words)}
+        view = memoryview(flat).cast("B").cast("H")
+        self.entries = [view[offsets[i]:offsets[i + 1]] for i in range(len(self.words))]
+
+    @classmethod
+    def from_split(cls, bank_split, inventory):
+        for phonemes in bank_split.values():
+            for symbol in phonemes:
+                inventory.intern(symbol)
+        encoded = [inventory.encode(phonemes) for phonemes in bank_split.values()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        flat = np.concatenate(encoded) if encoded else np.zeros(0, dtype=np.uint16)
+        return cls(bank_split.keys(), flat, offsets, inventory)
+
+    def __len__(self):
+        return len(self.words)
+
+    def ids_for(self, word):
+        i = self.word_ids[word]
+        return self.flat[self.offsets[i]:self.offsets[i + 1]]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def padded(self, fill=UNKNOWN_ID):
+        """[words, longest entry] id matrix and the entry lengths, for vectorized comparisons."""
+        lengths = self.lengths()
+        matrix = np.full((len(self.words), int(lengths.max()) if len(lengths) else 0), fill, dtype=np.uint16)
+        for i, length in enumerate(lengths):
+            matrix[i, :length] = self.flat[self.offsets[i]:self.offsets[i + 1]]
+        return matrix, lengths
+
+
+INVENTORY = PhonemeInventory()
+COMPILED_BANK = CompiledBank.from_split(phoneme_bank_split, INVENTORY)
+# compiled after the bank so every bank and similarity symbol has an id
+SUBSTITUTION_COSTS = INVENTORY.freeze().cost_matrix
@@ -0,0 +1,108 @@
+"""Per-process memory accounting from /proc, to check that worker processes share the model weights.
+
+    python -m audio.process_memory [PID ...] [--children-of MASTER_PID]
+
+RSS counts every resident page a process can see, so pages shared by N workers are counted N
+times; PSS divides each shared page by the number of processes mapping it. When the weights
+are shared, the workers' summed PSS stays close to one model while their summed RSS grows with
+the worker count.
+"""
+import argparse
+import os
+
+# fields of /proc/<pid>/smaps_rollup reported, in kB there and in bytes here
+SMAPS_FIELDS = {
+    "Rss": "rss", "Pss": "pss", "Shared_Clean": "shared_clean", "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean", "Private_Dirty": "private_dirty", "Anonymous": "anonymous",
+}
+
+
+def _parse_smaps(lines):
+    usage = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        if key in SMAPS_FIELDS:
+            usage[SMAPS_FIELDS[key]] = usage.get(SMAPS_FIELDS[key], 0) + int(rest.split()[0]) * 1024
+    return usage
+
+
+def memory_usage(pid="self"):
+    """RSS/PSS/shared/private byte counts for a process, or None where /proc has no smaps (non-Linux)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            usage = _parse_smaps(f)
+    except OSError:
+        return None
+    usage["shared"] = usage.get("shared_clean", 0) + usage.get("shared_dirty", 0)
+    usage["pid"] = os.getpid() if pid == "self" else int(pid)
+    return usage
+
+
+def mapped_file_usage(pid="self", path_fragment=".snapshot"):
+    """The same counts restricted to file mappings whose path contains path_fragment
+    (by default the memory-mapped model snapshots)."""
+    usage, in_mapping = [], False
+    try:
+        with open(f"/proc/{pid}/smaps") as f:
+            for line in f:
+                first = line.split(None, 1)[0]
+                if "-" in first and not first.endswith(":"):
+                    # a mapping header: "start-end perms offset dev inode [path]"
+                    fields = line.split(None, 5)
+                    in_mapping = len(fields) == 6 and path_fragment in fields[5]
+                elif in_mapping:
+                    usage.append(line)
+    except OSError:
+        return None
+    return _parse_smaps(usage)
+
+
+def child_pids(parent_pid):
+    """Processes whose parent is parent_pid (e.g. the workers of a gunicorn master)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name is parenthesised and may contain spaces; ppid is the second field after it
+        if int(stat.rsplit(")", 1)[1].split()[1]) == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_report(pids):
+    """Per-process usage (with the snapshot mappings) and totals over pids."""
+    processes = []
+    for pid in pids:
+        usage = memory_usage(pid)
+        if usage is not None:
+            usage["model_mapping"] = mapped_file_usage(pid)
+            processes.append(usage)
+    totals = {key: sum(p.get(key, 0) for p in processes) for key in ("rss", "pss", "shared")}
+    return {"processes": processes, "totals": totals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pids", nargs="*", type=int)
+    parser.add_argument("--children-of", type=int, default=None, help="report every child of this process (e.g. a gunicorn master)")
+    args = parser.parse_args()
+    pids = args.pids + (child_pids(args.children_of) if args.children_of else [])
+    report = memory_report(pids or [os.getpid()])
+
+    mb = lambda n: f"{n / 1e6:9.1f}"
+    print(f"{'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>9} {'model RSS':>9} {'model PSS':>9}")
+    for p in report["processes"]:
+        model = p["model_mapping"] or {}
+        print(f"{p['pid']:>8} {mb(p.get('rss', 0))} {mb(p.get('pss', 0))} {mb(p['shared'])} "
+              f"{mb(model.get('rss', 0))} {mb(model.get('pss', 0))}")
+    totals = report["totals"]
+    print(f"{'total':>8} {mb(totals['rss'])} {mb(totals['pss'])} {mb(totals['shared'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Accuracy gate for the int8 dynamic-quantized acoustic model.
+
+    python -m audio.quantization_gate [--max-per 0.05] [--max-score-drift 5.0]
+                                      [--max-file-per 0.25] [--max-file-score-drift 20.0]
+
+Runs the fp32 and int8 models over the recordings in data/panel_exam_demo and
+data/test, then compares the int8 phonemes against fp32 (phoneme error rate)
+and their get_score results (score drift, in score points). The gate fails if
+the mean over all recordings or any single recording is over its limit. The result is
+written next to the model artifacts. The "torch-int8" inference backend
+refuses to load unless that result says the gate passed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import Levenshtein
+from transformers import AutoModelForCTC, AutoProcessor
+from .audio_ingest import decode_audio_file, iter_recordings
+from .audio_scoring import get_score
+from .ctc_decoding import CTCDecoder
+from .inference_backends import TorchBackend, gate_path, quantize_dynamic_int8, resolve_checkpoint
+from .model_registry import DEFAULT_CHECKPOINT
+from .phoneme_extraction import chunked_logits
+from .vad import trim_silence
+
+GATE_DIRS = ("data/panel_exam_demo", "data/test")
+
+
+def phoneme_error_rate(reference, hypothesis):
+    reference, hypothesis = reference.split(), hypothesis.split()
+    return Levenshtein.distance(reference, hypothesis) / max(1, len(reference))
+
+
+def score_of(prediction):
+    result = get_score(prediction)
+    # get_score returns a bare 0 when no word in the bank matches
+    return result[0] if isinstance(result, tuple) else result
+
+
+def gate_reasons(files, max_per=0.05, max_score_drift=5.0, max_file_per=0.25, max_file_score_drift=20.0):
+    """Why the per-recording comparisons in `files` fail the gate (empty if they pass)."""
+    if not files:
+        return ["no recordings found"]
+    mean_per = sum(f["per"] for f in files) / len(files)
+    mean_drift = sum(f["score_drift"] for f in files) / len(files)
+    reasons = []
+    if mean_per > max_per:
+        reasons.append(f"mean phoneme error rate {mean_per:.3f} > {max_per}")
+    if mean_drift > max_score_drift:
+        reasons.append(f"mean score drift {mean_drift:.2f} > {max_score_drift}")
+    # one badly broken recording fails the gate even when the means look fine
+    for f in files:
+        if f["per"] > max_file_per:
+            reasons.append(f"{f['path']}: phoneme error rate {f['per']:.3f} > {max_file_per}")
+        if f["score_drift"] > max_file_score_drift:
+            reasons.append(f"{f['path']}: score drift {f['score_drift']:.2f} > {max_file_score_drift}")
+    return reasons
+
+
+def run_gate(paths, checkpoint=DEFAULT_CHECKPOINT, max_per=0.05, max_score_drift=5.0,
+             max_file_per=0.25, max_file_score_drift=20.0):
+    """Scores both models over `paths` and returns the gate result dict."""
+    # the local snapshot when there is one (see audio.model_snapshot), as the registry loads it
+    source = resolve_checkpoint(checkpoint)
+    model = AutoModelForCTC.from_pretrained(source)
+    model.eval()
+    processor = AutoProcessor.from_pretrained(source)
+    fp32 = TorchBackend(model)
+    int8 = TorchBackend(quantize_dynamic_int8(model), name="torch-int8")
+    decoder = CTCDecoder(processor, model.config.vocab_size)
+    sr = processor.feature_extractor.sampling_rate
+
+    files = []
+    timings = {"fp32": 0.0, "int8": 0.0}
+    for path in paths:
+        audio_array, _, _ = trim_silence(decode_audio_file(path, sr), sr)
+        predictions = {}
+        for label, backend in (("fp32", fp32), ("int8", int8)):
+            start = time.perf_counter()
+            logits = chunked_logits(audio_array, backend, processor)
+            timings[label] += time.perf_counter() - start
+            predictions[label] = decoder.decode_batch([logits])[0]
+        files.append({
+            "path": path,
+            "fp32": predictions["fp32"],
+            "int8": predictions["int8"],
+            "per": phoneme_error_rate(predictions["fp32"], predictions["int8"]),
+            "score_drift": abs(score_of(predictions["fp32"]) - score_of(predictions["int8"])),
+        })
+
+    n = max(1, len(files))
+    mean_per = sum(f["per"] for f in files) / n
+    mean_drift = sum(f["score_drift"] for f in files) / n
+    reasons = gate_reasons(files, max_per, max_score_drift, max_file_per, max_file_score_drift)
+    return {
+        "checkpoint": checkpoint,
+        "passed": not reasons,
+        "reasons": reasons,
+        "thresholds": {"max_per": max_per, "max_score_drift": max_score_drift,
+                       "max_file_per": max_file_per, "max_file_score_drift": max_file_score_drift},
+        "mean_per": mean_per,
+        "max_per": max((f["per"] for f in files), default=0.0),
+        "mean_score_drift": mean_drift,
+        "max_score_drift": max((f["score_drift"] for f in files), default=0.0),
+        "fp32_seconds": timings["fp32"],
+        "int8_seconds": timings["int8"],
+        "fp32_bytes": fp32.nbytes(),
+        "int8_bytes": int8.nbytes(),
+        "files": files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--data-dirs", nargs="+", default=list(GATE_DIRS))
+    parser.add_argument("--max-per", type=float, default=0.05, help="max mean phoneme error rate of int8 vs fp32")
+    parser.add_argument("--max-score-drift", type=float, default=5.0, help="max mean |score difference| in points")
+    parser.add_argument("--max-file-per", type=float, default=0.25, help="max phoneme error rate of any one recording")
+    parser.add_argument("--max-file-score-drift", type=float, default=20.0, help="max |score difference| of any one recording")
+    args = parser.parse_args()
+
+    paths = [path for data_dir in args.data_dirs for path in iter_recordings(data_dir)]
+    gate = run_gate(paths, args.checkpoint, args.max_per, args.max_score_drift,
+                    args.max_file_per, args.max_file_score_drift)
+
+    output_path = gate_path(args.checkpoint)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(gate, f, indent=2, ensure_ascii=False)
+
+    print(f"mean PER {gate['mean_per']:.3f}, mean score drift {gate['mean_score_drift']:.2f} over {len(gate['files'])} recordings")
+    print(f"fp32 {gate['fp32_seconds']:.2f}s / {gate['fp32_bytes'] / 1e6:.0f} MB, int8 {gate['int8_seconds']:.2f}s / {gate['int8_bytes'] / 1e6:.0f} MB")
+    if gate["passed"]:
+        print(f"PASSED: int8 model enabled for {args.checkpoint} ({output_path})")
+    else:
+        print(f"FAILED: int8 model stays disabled: {'; '.join(gate['reasons'])}")
+    sys.exit(0 if gate["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
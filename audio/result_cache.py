@@ -0,0 +1,196 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def audio_cache_key(audio_array, checkpoint, backend):
+    """Content address of a decoded clip for a given model: the checkpoint and the inference
+    backend running it (torch, torch-int8 and onnx results differ, so they must not be shared)."""
+    digest = hashlib.sha256(f"{checkpoint}\0{backend}".encode())
+    digest.update(str(audio_array.dtype).encode())
+    digest.update(np.ascontiguousarray(audio_array))
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count, with an optional TTL in seconds."""
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """One pickle per key in a directory, bounded by total bytes, with an optional TTL.
+
+    Reads refresh a file's mtime, so eviction removes the least recently used files first.
+    Safe to share between worker processes on the same host.
+    """
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            if self.ttl and os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, value):
+        # write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._file(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                os.remove(entry.path)
+
+
+class DjangoCacheBackend:
+    """Stores entries in one of Django's configured caches (CACHES setting)."""
+    def __init__(self, alias="default", ttl=None, prefix="audio-result:"):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.cache.set(self.prefix + key, value, timeout=self.ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResultCache:
+    """Caches phoneme predictions (and optionally logits) by content hash of the decoded
+    audio and the model (checkpoint and backend). Download URLs can be aliased to a content key so a
+    repeated submission of the same URL skips the download and decode as well. An alias only lasts
+    url_ttl seconds, since the object behind a URL can be replaced (e.g. re-uploaded to the same path)
+    and the alias never sees its content.
+
+    Callers that score against a target word need the logits: they store them whatever
+    store_logits says, and ask for need_logits so an entry saved without them counts as a miss.
+    """
+    def __init__(self, backend, store_logits=False, url_ttl=300):
+        self.backend = backend
+        self.store_logits = store_logits
+        self.url_ttl = url_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, need_logits=False):
+        value = self.backend.get(key)
+        if value is not None and need_logits and value.get("logits") is None:
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, prediction, logits=None, keep_logits=None):
+        """keep_logits overrides store_logits for this entry."""
+        value = {"prediction": prediction}
+        if (self.store_logits if keep_logits is None else keep_logits) and logits is not None:
+            value["logits"] = logits
+        self.backend.set(key, value)
+
+    def get_for_url(self, url, need_logits=False):
+        alias = self.backend.get("url:" + hashlib.sha256(url.encode()).hexdigest())
+        if not isinstance(alias, dict) or time.time() - alias["at"] > self.url_ttl:
+            return None
+        return self.get(alias["key"], need_logits)
+
+    def alias_url(self, url, key):
+        self.backend.set("url:" + hashlib.sha256(url.encode()).hexdigest(), {"key": key, "at": time.time()})
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def build_result_cache(config):
+    """Builds a ResultCache from a config dict such as the AUDIO_RESULT_CACHE setting:
+    {"BACKEND": "memory" | "disk" | "django", "TTL": seconds, "MAX_ENTRIES": n,
+     "PATH": dir, "MAX_BYTES": n, "ALIAS": cache alias, "STORE_LOGITS": bool, "URL_TTL": seconds}
+    """
+    backend = config.get("BACKEND", "memory")
+    ttl = config.get("TTL")
+    if backend == "memory":
+        store = MemoryBackend(max_entries=config.get("MAX_ENTRIES", 1024), ttl=ttl)
+    elif backend == "disk":
+        store = DiskBackend(config["PATH"], max_bytes=config.get("MAX_BYTES", 512 * 1024 * 1024), ttl=ttl)
+    elif backend == "django":
+        store = DjangoCacheBackend(alias=config.get("ALIAS", "default"), ttl=ttl)
+    else:
+        raise ValueError(f"Unknown result cache backend: {backend}")
+    return ResultCache(store, store_logits=config.get("STORE_LOGITS", False), url_ttl=config.get("URL_TTL", 300))
@@ -0,0 +1,114 @@
+import threading
+import numpy as np
+from .model_registry import DEFAULT_CHECKPOINT
+from .phoneme_extraction import predict_batch
+from .vad import FRAME_MS, FRICATIVE_FLOOR_DB, FRICATIVE_ZCR, frame_features, trim_silence
+
+# a frame this far above the noise floor counts as speech for endpointing
+SPEECH_ABOVE_FLOOR_DB = 10.0
+
+PCM_FORMATS = ("s16le", "f32le")
+SAMPLE_BYTES = {"s16le": 2, "f32le": 4}
+
+
+def _pcm_to_float32(data, sample_format):
+    if sample_format == "s16le":
+        return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_format == "f32le":
+        return np.frombuffer(data, dtype="<f4")
+    raise ValueError(f"Unsupported PCM format: {sample_format}")
+
+
+class StreamingRecognizer:
+    """Incremental recognition of one utterance arriving as raw PCM frames.
+
+    feed() appends audio and runs a frame-level energy/zero-crossing endpointer
+    (the same features as vad.trim_silence) against a noise floor estimated from
+    the stream so far; it returns True once speech has been followed by
+    end_silence_ms of silence, or the utterance hit max_utterance_s. partial()
+    re-runs the model on the last window_s of audio for a running hypothesis, and
+    finish() runs the final pass over the trimmed utterance.
+    """
+    def __init__(self, checkpoint=DEFAULT_CHECKPOINT, backend=None, sr=16000, sample_format="s16le", window_s=4.0,
+                 partial_every_s=0.3, end_silence_ms=400, max_utterance_s=15.0):
+        if sample_format not in PCM_FORMATS:
+            raise ValueError(f"Unsupported PCM format: {sample_format}")
+        self.checkpoint = checkpoint
+        self.backend = backend
+        self.sr = sr
+        self.sample_format = sample_format
+        self.window = int(window_s * sr)
+        self.partial_every = int(partial_every_s * sr)
+        self.max_samples = int(max_utterance_s * sr)
+        self.frame_len = int(sr * FRAME_MS / 1000)
+        self.end_frames = max(1, end_silence_ms // FRAME_MS)
+        self._chunks = []
+        self._samples = 0
+        self._leftover = b""  # bytes of a sample split across frames
+        self._pending = np.zeros(0, dtype=np.float32)  # samples not yet in a whole frame
+        self._energies = []
+        self._speech_started = False
+        self._silent_frames = 0
+        self._last_partial_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def duration_s(self):
+        return self._samples / self.sr
+
+    @property
+    def speech_started(self):
+        return self._speech_started
+
+    def feed(self, data):
+        """Adds a block of PCM bytes; returns True when the utterance has ended.
+        A block need not hold whole samples: a trailing partial sample waits for the next one."""
+        data = self._leftover + bytes(data)
+        whole = len(data) - len(data) % SAMPLE_BYTES[self.sample_format]
+        data, self._leftover = data[:whole], data[whole:]
+        samples = _pcm_to_float32(data, self.sample_format)
+        with self._lock:
+            self._chunks.append(samples)
+            self._samples += len(samples)
+
+        frames = np.concatenate([self._pending, samples])
+        whole = len(frames) // self.frame_len * self.frame_len
+        self._pending = frames[whole:]
+        if whole:
+            energy_db, zcr = frame_features(frames[:whole], self.frame_len)
+            self._energies.extend(energy_db.tolist())
+            noise_floor_db = float(np.percentile(self._energies, 10))
+            speech = (energy_db > noise_floor_db + SPEECH_ABOVE_FLOOR_DB)
+            speech |= (energy_db > noise_floor_db + FRICATIVE_FLOOR_DB) & (zcr > FRICATIVE_ZCR)
+            for is_speech in speech:
+                if is_speech:
+                    self._speech_started = True
+                    self._silent_frames = 0
+                elif self._speech_started:
+                    self._silent_frames += 1
+        ended = self._speech_started and self._silent_frames >= self.end_frames
+        return ended or self._samples >= self.max_samples
+
+    def audio(self):
+        with self._lock:
+            if len(self._chunks) > 1:
+                self._chunks = [np.concatenate(self._chunks)]
+            return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    def partial_due(self):
+        return self._speech_started and self._samples - self._last_partial_at >= self.partial_every
+
+    def skip_partial(self):
+        """Counts the due partial as done without running it (e.g. the server is busy)."""
+        self._last_partial_at = self._samples
+
+    def partial(self):
+        """Phoneme hypothesis for the most recent window of audio."""
+        self._last_partial_at = self._samples
+        window = self.audio()[-self.window:]
+        return predict_batch([window], self.checkpoint, backend=self.backend)[0]
+
+    def finish(self):
+        """Final (prediction, frame logits) for the whole utterance, silence trimmed."""
+        audio_array = trim_silence(self.audio(), self.sr)[0]
+        return predict_batch([audio_array], self.checkpoint, return_logits=True, backend=self.backend)[0]
@@ -0,0 +1,86 @@
+import zlib
+import numpy as np
+import torch
+from .inference_backends import InferenceBackend
+from .phonemes import WORD_BANK, phoneme_bank_split
+
+SPECIAL_TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|"]
+
+
+class _StubFeatureExtractor:
+    sampling_rate = 16000
+    do_normalize = True
+    padding_value = 0.0
+    return_attention_mask = False
+
+
+class _StubTokenizer:
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.pad_token_id = 0
+        self.all_special_ids = [0, 1, 2, 3]
+        self.word_delimiter_token_id = 4
+
+    def __len__(self):
+        return len(self.vocab)
+
+
+class StubProcessor:
+    """Stands in for the wav2vec2 processor; the vocabulary is the phonemes of the word bank."""
+    def __init__(self):
+        phonemes = sorted({p for phonemes in phoneme_bank_split.values() for p in phonemes})
+        self.feature_extractor = _StubFeatureExtractor()
+        self.tokenizer = _StubTokenizer(SPECIAL_TOKENS + phonemes)
+
+    def decode(self, id_):
+        return self.tokenizer.vocab[id_]
+
+
+class _StubConfig:
+    # same feature-encoder geometry as wav2vec2, so frame counts match the real model
+    conv_kernel = (10, 3, 3, 3, 3, 2, 2)
+    conv_stride = (5, 2, 2, 2, 2, 2, 2)
+    inputs_to_logits_ratio = 320
+
+    def __init__(self, vocab_size):
+        self.vocab_size = vocab_size
+
+
+class StubBackend(InferenceBackend):
+    """Deterministic stand-in for the acoustic model.
+
+    Each clip "says" a word from the bank chosen by a checksum of its samples: the
+    word's phonemes are emitted as one-hot frames separated by blanks, padded with
+    blanks to the real model's frame count. No weights are loaded, so the stages
+    around the model can be benchmarked and exercised anywhere.
+    """
+    name = "stub"
+
+    def __init__(self, processor=None):
+        self.processor = processor or StubProcessor()
+        vocab = self.processor.tokenizer.vocab
+        super().__init__(_StubConfig(len(vocab)))
+        self._ids = {token: i for i, token in enumerate(vocab)}
+        self._words = list(WORD_BANK)
+
+    def logits(self, inputs):
+        input_values = inputs["input_values"]
+        batch, samples = input_values.shape
+        frames = int(self.output_lengths(torch.tensor([samples]))[0])
+        ids = np.zeros((batch, max(frames, 0)), dtype=np.int64)
+        for row in range(batch):
+            clip = input_values[row].numpy()
+            word = self._words[zlib.crc32(clip[:4096].tobytes()) % len(self._words)]
+            sequence = [self._ids[p] for p in phoneme_bank_split[word]]
+            # spread the word over this clip's own frames, not the batch padding
+            nonzero = np.flatnonzero(clip)
+            clip_frames = int(self.output_lengths(torch.tensor([nonzero[-1] + 1 if len(nonzero) else 0]))[0])
+            step = max(2, clip_frames // (len(sequence) + 1))
+            for i, id_ in enumerate(sequence):
+                ids[row, (i + 1) * step - 1:(i + 1) * step + step // 2 - 1] = id_
+        logits = torch.full((batch, ids.shape[1], self.config.vocab_size), -10.0)
+        logits.scatter_(2, torch.from_numpy(ids).unsqueeze(-1), 10.0)
+        return logits
+
+    def nbytes(self):
+        return 0
@@ -0,0 +1,44 @@
+import numpy as np
+
+FRAME_MS = 20
+PAD_MS = 150
+# frames within this many dB of the loudest frame count as speech
+ENERGY_RANGE_DB = 35.0
+# quieter frames still count as speech (fricatives like s/ʃ) when they are this far above
+# the noise floor and cross zero this often
+FRICATIVE_FLOOR_DB = 6.0
+FRICATIVE_ZCR = 0.25
+
+
+def frame_features(audio_array, frame_len):
+    """Per-frame energy (dBFS) and zero-crossing rate over non-overlapping frames."""
+    n_frames = len(audio_array) // frame_len
+    frames = audio_array[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+    return energy_db, zcr
+
+
+def trim_silence(audio_array, sr=16000, frame_ms=FRAME_MS, pad_ms=PAD_MS):
+    """Crops a clip to its speech region (plus pad_ms on each side) using frame energy and
+    zero-crossing rate. Returns the cropped view along with the number of samples trimmed
+    from the start and from the end. Clips with no detectable speech are returned whole.
+    """
+    frame_len = int(sr * frame_ms / 1000)
+    if len(audio_array) < 2 * frame_len:
+        return audio_array, 0, 0
+
+    energy_db, zcr = frame_features(audio_array, frame_len)
+    noise_floor_db = np.percentile(energy_db, 10)
+    voiced = energy_db > energy_db.max() - ENERGY_RANGE_DB
+    voiced &= energy_db > noise_floor_db + FRICATIVE_FLOOR_DB
+    fricative = (energy_db > noise_floor_db + FRICATIVE_FLOOR_DB) & (zcr > FRICATIVE_ZCR)
+    speech = np.flatnonzero(voiced | fricative)
+    if len(speech) == 0:
+        return audio_array, 0, 0
+
+    pad = int(sr * pad_ms / 1000)
+    start = max(0, speech[0] * frame_len - pad)
+    end = min(len(audio_array), (speech[-1] + 1) * frame_len + pad)
+    return audio_array[start:end], start, len(audio_array) - end
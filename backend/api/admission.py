@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the server is saturated; retry_after is in seconds."""
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class AdmissionController:
+    """Bounds how much scoring work runs at once in this process.
+
+    At most max_concurrent requests run; up to max_queue more wait, no more than
+    max_queue_per_user of them from one user. Freed slots go to waiting users in
+    round-robin order (oldest request first within a user), so one client
+    retrying in a loop cannot starve the others. A request that finds the queue
+    full, or waits longer than queue_timeout_s, is rejected right away with an
+    Overloaded carrying a Retry-After estimate from recent service times.
+    """
+    def __init__(self, max_concurrent=4, max_queue=16, max_queue_per_user=2, queue_timeout_s=10.0, history_size=1000):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout_s = queue_timeout_s
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = OrderedDict()  # user -> deque of tickets, in round-robin order
+        self._queued = 0
+        self._admitted = 0
+        self._skipped = 0
+        self._rejected = {"queue_full": 0, "user_queue_full": 0, "timeout": 0}
+        self._wait_ms = deque(maxlen=history_size)
+        self._service_s = deque(maxlen=history_size)
+
+    @contextmanager
+    def admit(self, user):
+        """Holds a slot for the duration of the block; raises Overloaded if none can be had."""
+        start = time.monotonic()
+        self._acquire(user)
+        admitted = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release()
+            with self._cond:
+                self._wait_ms.append((admitted - start) * 1000)
+                self._service_s.append(time.monotonic() - admitted)
+
+    @contextmanager
+    def admit_if_idle(self, user):
+        """For optional work (e.g. partial hypotheses): holds a slot for the block only if one is
+        free right now, never queueing; yields whether it got one."""
+        with self._cond:
+            admitted = self._active < self.max_concurrent and not self._queued
+            if admitted:
+                self._active += 1
+            else:
+                self._skipped += 1
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self._release()
+
+    def _acquire(self, user):
+        with self._cond:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self._admitted += 1
+                return
+            if self._queued >= self.max_queue:
+                self._reject("queue_full")
+            if len(self._waiting.get(user, ())) >= self.max_queue_per_user:
+                self._reject("user_queue_full")
+
+            ticket = _Ticket()
+            self._waiting.setdefault(user, deque()).append(ticket)
+            self._queued += 1
+            deadline = time.monotonic() + self.queue_timeout_s
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    tickets = self._waiting[user]
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del self._waiting[user]
+                    self._queued -= 1
+                    self._reject("timeout")
+                self._cond.wait(remaining)
+            self._admitted += 1
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            if self._waiting:
+                # the slot passes straight to the next user in turn
+                user, tickets = next(iter(self._waiting.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    self._waiting.move_to_end(user)
+                else:
+                    del self._waiting[user]
+                self._queued -= 1
+                self._active += 1
+                ticket.granted = True
+                self._cond.notify_all()
+
+    def _reject(self, reason):
+        # called with the lock held
+        self._rejected[reason] += 1
+        raise Overloaded(reason, self._retry_after())
+
+    def _retry_after(self):
+        service_s = sum(self._service_s) / len(self._service_s) if self._service_s else 1.0
+        return max(1, math.ceil(service_s * (self._queued + 1) / self.max_concurrent))
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._wait_ms)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._queued,
+                "waiting_users": len(self._waiting),
+                "admitted": self._admitted,
+                "skipped": self._skipped,
+                "rejected": dict(self._rejected),
+                "wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else 0.0,
+                "wait_ms_p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 2) if waits else 0.0,
+                "retry_after_s": self._retry_after(),
+            }
+
+
+def client_address(remote_addr, forwarded_for="", trusted_proxies=0):
+    """The address a request came from. X-Forwarded-For is only believed behind trusted_proxies
+    reverse proxies that each append the address they saw: the entry added by the outermost one
+    is the client, and anything left of it was sent by the client and could be forged."""
+    hops = [hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]
+    if trusted_proxies and hops:
+        return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or ""
@@ -1,6 +1,21 @@
+import os
+import sys
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+        # score against the published word bank snapshots (falls back to the built-in bank until one exists)
+        from audio.bank_store import bank_store
+        bank_store.configure(settings.AUDIO_WORD_BANK_DIR, settings.AUDIO_WORD_BANK_CHECK_S)
+
+        # optionally load the acoustic model(s) at worker boot so the first request is not cold
+        # (this is the one start-up path allowed to import the inference stack)
+        if getattr(settings, "AUDIO_WARM_UP_ON_BOOT", False):
+            from .inference import get_inference
+            get_inference().registry.warm_up(settings.AUDIO_MODEL_CHECKPOINTS)
@@ -0,0 +1,84 @@
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadError(Exception):
+    """A recording could not be fetched; status is the HTTP status to answer the client with."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class DownloadTooLarge(DownloadError):
+    def __init__(self, max_bytes):
+        super().__init__(f"Recording is larger than {max_bytes} bytes", status=413)
+
+
+class AudioDownloader:
+    """Fetches recordings from remote storage over one shared, keep-alive connection pool.
+
+    Responses are streamed in chunk_size pieces and cut off once max_bytes have been
+    read (or refused up front from Content-Length), so a download never has to sit in
+    memory whole. Connection errors and 502/503/504 answers are retried with
+    exponential backoff before any bytes are handed out; a failure mid-stream is not.
+    """
+    def __init__(self, max_bytes=25 * 1024 * 1024, connect_timeout_s=3.0, read_timeout_s=15.0,
+                 retries=2, backoff_s=0.2, pool_size=16, chunk_size=64 * 1024):
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout_s, read_timeout_s)
+        self.chunk_size = chunk_size
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff_s,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        # requests.Session is safe to share across threads for plain GETs like these
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def iter_chunks(self, url):
+        """Yields the body of url in chunks; raises DownloadError (or DownloadTooLarge)."""
+        try:
+            response = self.session.get(url, stream=True, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"Failed to fetch audio from URL: {url}: {e}")
+            raise DownloadError("Failed to fetch audio from URL")
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch audio from URL: {url} (HTTP {response.status_code})")
+                raise DownloadError("Failed to fetch audio from URL")
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise DownloadTooLarge(self.max_bytes)
+            received = 0
+            try:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise DownloadTooLarge(self.max_bytes)
+                    yield chunk
+            except requests.RequestException as e:
+                logger.error(f"Download of {url} interrupted: {e}")
+                raise DownloadError("Failed to fetch audio from URL")
+
+    def fetch(self, url):
+        """The whole (size-capped) body of url as bytes."""
+        return b"".join(self.iter_chunks(url))
+
+    def close(self):
+        self.session.close()
+
+
+def build_downloader(config):
+    return AudioDownloader(
+        max_bytes=config.get("MAX_BYTES", 25 * 1024 * 1024),
+        connect_timeout_s=config.get("CONNECT_TIMEOUT_S", 3.0),
+        read_timeout_s=config.get("READ_TIMEOUT_S", 15.0),
+        retries=config.get("RETRIES", 2),
+        backoff_s=config.get("BACKOFF_S", 0.2),
+        pool_size=config.get("POOL_SIZE", 16),
+    )
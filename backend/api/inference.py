@@ -0,0 +1,42 @@
+import importlib
+import sys
+import threading
+
+# the ML stack; only api.inference_service (and the audio modules it pulls in) may import these,
+# so migrations, management commands and the CRUD/auth endpoints start without them
+HEAVY_MODULES = ("torch", "transformers", "librosa", "sounddevice")
+
+SERVICE_MODULE = "api.inference_service"
+
+_lock = threading.Lock()
+_service = None
+
+
+class SubmissionError(Exception):
+    """A submission that cannot be scored; status is the HTTP status to answer with."""
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def get_inference():
+    """The inference service (api.inference_service), imported on first use.
+
+    The first call pays for importing torch/transformers and building the pipeline;
+    concurrent first callers wait for it rather than seeing a half-imported module.
+    """
+    global _service
+    if _service is None:
+        with _lock:
+            if _service is None:
+                _service = importlib.import_module(SERVICE_MODULE)
+    return _service
+
+
+def inference_loaded():
+    return _service is not None
+
+
+def heavy_modules_loaded():
+    """Which of HEAVY_MODULES this process has imported."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,137 @@
+import logging
+import os
+import sys
+from django.conf import settings
+from .downloads import DownloadError, build_downloader
+from .inference import SubmissionError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from audio.audio_ingest import AudioDecodeError, decode_audio_stream
+from audio.vad import trim_silence
+from audio.result_cache import audio_cache_key, build_result_cache
+from audio.model_registry import DEFAULT_CHECKPOINT, registry
+from audio.inference_scheduler import BatchScheduler
+from audio.cascade import FULL, CascadedInference
+from audio.audio_scoring import get_score
+from audio.ctc_scoring import score_target
+from audio.audio_feedback import generate_feedback_for_target
+
+# Everything that needs the acoustic model lives here, behind api.inference.get_inference(),
+# so importing the views (and Django start-up in general) does not import torch/transformers.
+
+logger = logging.getLogger(__name__)
+
+# keep-alive connection pool to the recording storage, shared by every request in this worker
+downloader = build_downloader(settings.AUDIO_DOWNLOAD)
+
+# repeated submissions (client retries, same download URL) are answered from here
+result_cache = build_result_cache(settings.AUDIO_RESULT_CACHE)
+
+# clips with a target word try a cheap first-pass model before the full one (when enabled)
+cascade = CascadedInference(
+    DEFAULT_CHECKPOINT,
+    first_pass_backend=settings.AUDIO_CASCADE['FIRST_PASS_BACKEND'] if settings.AUDIO_CASCADE['ENABLED'] else None,
+    threshold=settings.AUDIO_CASCADE['THRESHOLD'],
+)
+
+# concurrent submissions share batched forward passes instead of running one each;
+# the frame logits come back too, for scoring against a target word
+inference_scheduler = BatchScheduler(
+    cascade.predict_batch,
+    max_batch_size=settings.AUDIO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.AUDIO_BATCH_MAX_WAIT_MS,
+)
+
+# the backend that produces cached (full-model) results, part of every cache key
+FULL_BACKEND = cascade.full_backend or registry.default_backend
+
+def predict_phonemes(audio_array, target_word=None):
+    """Predicts phonemes for a decoded clip, reusing the cached prediction if this audio was seen before.
+    Returns the prediction, the frame logits (None for a cache hit stored without them) and the clip's cache key.
+    With a target word the logits are needed for scoring, so they are always cached and an entry without them is not reused."""
+    cache_key = audio_cache_key(audio_array, DEFAULT_CHECKPOINT, FULL_BACKEND)
+    cached = result_cache.get(cache_key, need_logits=bool(target_word))
+    if cached is not None:
+        logger.debug("Result cache hit")
+        return cached['prediction'], cached.get('logits'), cache_key
+
+    audio_array, leading, trailing = trim_silence(audio_array)
+    logger.debug(f"Trimmed {leading + trailing} samples of silence ({leading} leading, {trailing} trailing)")
+    prediction, logits, tier = inference_scheduler.predict((audio_array, target_word))
+    # only full-model results are cached; a first-pass result is only trusted for its own target word
+    if tier == FULL:
+        result_cache.set(cache_key, prediction, logits, keep_logits=True if target_word else None)
+    return prediction, logits, cache_key
+
+def score_prediction(prediction, logits, target_word=None):
+    """Scores against the exercise's target word straight from the logits when possible,
+    otherwise against the closest bank word. Returns (score, extra phonemes, missing phonemes, details)."""
+    if target_word and logits is not None:
+        try:
+            result = score_target(logits, target_word, registry.get(DEFAULT_CHECKPOINT).decoder)
+            return result.score, result.extra_phonemes, result.missing_phonemes, {
+                'target_word': result.word,
+                'phoneme_confidence': result.phoneme_confidence,
+            }
+        except ValueError as e:
+            logger.debug(f"Target scoring unavailable, searching the bank instead: {e}")
+    score, extra_phonemes, missing_phonemes = get_score(prediction)
+    return score, extra_phonemes, missing_phonemes, {}
+
+def process_submission(uri, target_word=None):
+    """Download, decode, inference, scoring and feedback for one recording URL.
+    Returns the response body; raises SubmissionError. Shared by submit_audio and the job workers."""
+    # a URL that was already scored skips the download and decode entirely
+    cached = result_cache.get_for_url(uri, need_logits=bool(target_word))
+    if cached is not None:
+        logger.debug(f"Result cache hit for URL: {uri}")
+        phoneme_results, logits = cached['prediction'], cached.get('logits')
+    else:
+        # Steps 1-2: Stream the recording from the Firebase URL straight into the decoder,
+        # which produces a 16 kHz mono float32 buffer while the download is still arriving
+        try:
+            logger.debug(f"Downloading and decoding audio from URL: {uri}")
+            audio_array = decode_audio_stream(downloader.iter_chunks(uri))
+        except DownloadError as e:
+            raise SubmissionError(str(e), status=e.status)
+        except AudioDecodeError as e:
+            logger.error(f"Error during audio decoding: {e}")
+            raise SubmissionError(f'Error during audio decoding: {str(e)}')
+
+        # Step 3: Phoneme extraction
+        phoneme_results, logits, cache_key = extract_from_audio(audio_array, target_word)
+        result_cache.alias_url(uri, cache_key)
+
+    return score_and_feedback(phoneme_results, logits, target_word)
+
+def extract_from_audio(audio_array, target_word=None):
+    """Step 3 for a decoded recording: (prediction, logits, cache key); raises SubmissionError."""
+    try:
+        logger.debug("Processing the audio")
+        phoneme_results, logits, cache_key = predict_phonemes(audio_array, target_word)
+        logger.debug("Phoneme extraction successful")
+        return phoneme_results, logits, cache_key
+    except Exception as e:
+        logger.error(f"Error during audio processing: {e}")
+        raise SubmissionError(f'Error during audio processing: {str(e)}')
+
+def score_and_feedback(phoneme_results, logits, target_word=None):
+    """Steps 4-5: the response body for a prediction."""
+    # Step 4: Scoring and feedback
+    score, extra_phonemes, missing_phonemes, details = score_prediction(phoneme_results, logits, target_word)
+    feedback = []
+    for extra, target in zip(extra_phonemes, missing_phonemes):
+        generate_feedback_for_target(extra, target, feedback)
+    logger.debug(f"Feedback generated: {feedback}")
+
+    # Step 5: Return feedback and score
+    return {'score': score, 'feedback': feedback, **details}
+
+def stats():
+    """Batching, result cache and cascade counters for this worker."""
+    return {**inference_scheduler.stats(), 'result_cache': result_cache.stats(), 'cascade': cascade.stats()}
+
+def model_status():
+    """Warm/cold state of the acoustic models loaded in this worker."""
+    return registry.status()
@@ -0,0 +1,213 @@
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+import requests
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import AudioFile
+
+logger = logging.getLogger(__name__)
+
+# how often worker threads look for jobs whose worker died mid-run
+REQUEUE_EVERY_S = 60.0
+
+
+class LocalBroker:
+    """In-process queue of job ids. Jobs only run in the process that queued them and
+    are lost if it exits first; meant for development, tests and single-process deploys."""
+    name = "local"
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, job_id):
+        self._queue.put(job_id)
+
+    def claim(self, timeout):
+        """Next job id to run, or None if none arrived within timeout seconds."""
+        try:
+            job_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        # a job another path already picked up (or deleted) is skipped
+        claimed = AudioFile.objects.filter(id=job_id, status=AudioFile.QUEUED).update(
+            status=AudioFile.RUNNING, started_at=timezone.now())
+        return job_id if claimed else None
+
+    def depth(self):
+        return self._queue.qsize()
+
+
+class DatabaseBroker:
+    """The queue is the table itself: workers in any process claim the oldest queued
+    AudioFile row with SELECT ... FOR UPDATE SKIP LOCKED, so jobs survive restarts and
+    can be served by dedicated worker processes (manage.py run_audio_workers)."""
+    name = "database"
+
+    def __init__(self, poll_interval_s=0.5):
+        self.poll_interval_s = poll_interval_s
+
+    def _queued(self):
+        # rows from before jobs existed have no URL to score
+        return AudioFile.objects.filter(status=AudioFile.QUEUED).exclude(source_url="")
+
+    def publish(self, job_id):
+        # the row is already queued; workers find it on their next poll
+        pass
+
+    def claim(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with transaction.atomic():
+                job = self._queued().select_for_update(skip_locked=True).order_by("uploaded_at", "id").first()
+                if job is not None:
+                    job.status, job.started_at = AudioFile.RUNNING, timezone.now()
+                    job.save(update_fields=["status", "started_at"])
+                    return job.id
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(self.poll_interval_s, max(0.0, deadline - time.monotonic())))
+
+    def depth(self):
+        return self._queued().count()
+
+
+def build_broker(config):
+    kind = config.get("BROKER", "local")
+    if kind == "local":
+        return LocalBroker()
+    if kind == "database":
+        return DatabaseBroker(config.get("POLL_INTERVAL_S", 0.5))
+    raise ValueError(f"Unknown AUDIO_JOBS broker: {kind}")
+
+
+class JobWorkerPool:
+    """Background threads that take jobs from a broker and run them through handler.
+
+    handler(source_url, target_word) returns the JSON result saved to AudioFile.result;
+    an exception marks the job failed with its message in AudioFile.error. When the job
+    has a callback_url, the final job status is POSTed to it (best effort).
+
+    A job still running stale_after_s after it started is assumed lost with its worker
+    (a crash or restart mid-job) and goes back to the queue, so stale_after_s must be
+    longer than any job takes.
+    """
+    def __init__(self, broker, handler, workers=2, stale_after_s=600.0):
+        self.broker = broker
+        self.handler = handler
+        self.workers = workers
+        self.stale_after_s = stale_after_s
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counts = {"completed": 0, "failed": 0, "requeued": 0}
+        self._running = 0
+        self._next_requeue = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [threading.Thread(target=self._run, name=f"audio-job-worker-{i}", daemon=True)
+                             for i in range(self.workers)]
+        # the local broker's queue did not survive the restart, so everything still queued is published again
+        self.requeue(all_queued=True)
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, source_url, target_word="", callback_url="", user=None):
+        """Queues a recording URL for scoring and returns its AudioFile job row."""
+        job = AudioFile.objects.create(user=user, source_url=source_url, target_word=target_word or "",
+                                       callback_url=callback_url or "", status=AudioFile.QUEUED)
+        # publish only once the row is visible to other connections
+        transaction.on_commit(lambda: self.broker.publish(job.id))
+        return job
+
+    def requeue(self, all_queued=False):
+        """Returns jobs that have been running for over stale_after_s to the queue and
+        publishes them again (with all_queued, every queued job); returns the stale job ids."""
+        self._next_requeue = time.monotonic() + REQUEUE_EVERY_S
+        cutoff = timezone.now() - timedelta(seconds=self.stale_after_s)
+        stale = list(AudioFile.objects.filter(status=AudioFile.RUNNING, started_at__lt=cutoff).values_list("id", flat=True))
+        if stale:
+            # a worker that finished one of these in the meantime wins
+            AudioFile.objects.filter(id__in=stale, status=AudioFile.RUNNING).update(status=AudioFile.QUEUED, started_at=None)
+            logger.warning(f"Requeued {len(stale)} audio jobs running for over {self.stale_after_s:.0f} s")
+            with self._lock:
+                self._counts["requeued"] += len(stale)
+        if all_queued:
+            # claims skip ids that are already running or done, so publishing one twice is harmless
+            job_ids = (AudioFile.objects.filter(status=AudioFile.QUEUED).exclude(source_url="")
+                       .order_by("uploaded_at", "id").values_list("id", flat=True))
+        else:
+            job_ids = stale
+        for job_id in job_ids:
+            self.broker.publish(job_id)
+        return stale
+
+    def _run(self):
+        while True:
+            try:
+                if time.monotonic() >= self._next_requeue:
+                    self.requeue()
+                job_id = self.broker.claim(timeout=1.0)
+                if job_id is not None:
+                    self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"Audio job worker error: {e}")
+                time.sleep(1.0)
+            finally:
+                close_old_connections()
+
+    def run_job(self, job_id):
+        job = AudioFile.objects.get(id=job_id)
+        with self._lock:
+            self._running += 1
+        try:
+            job.result = self.handler(job.source_url, job.target_word or None)
+            job.status, job.processed, job.error = AudioFile.DONE, True, ""
+        except Exception as e:
+            logger.error(f"Audio job {job_id} failed: {e}")
+            job.status, job.error = AudioFile.FAILED, str(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+        job.finished_at = timezone.now()
+        job.save(update_fields=["result", "status", "processed", "error", "finished_at"])
+        with self._lock:
+            self._counts["completed" if job.status == AudioFile.DONE else "failed"] += 1
+        if job.callback_url:
+            try:
+                # the allow-listed host gets the result; a redirect could point anywhere
+                requests.post(job.callback_url, json=job_payload(job), timeout=5, allow_redirects=False)
+            except requests.RequestException as e:
+                logger.warning(f"Callback for audio job {job_id} failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "broker": self.broker.name,
+                "workers": self.workers,
+                "running": self._running,
+                "queue_depth": self.broker.depth(),
+                **self._counts,
+            }
+
+
+def callback_allowed(url, hosts):
+    """Whether a job's result may be POSTed to url: http(s) on one of the allow-listed hosts.
+    Callbacks are sent from inside the network, so any other URL would let a client reach internal services."""
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and (parts.hostname or "") in hosts
+
+
+def job_payload(job):
+    """What the status endpoint and the callback report for a job."""
+    payload = {"job_id": str(job.token), "status": job.status}
+    if job.status == AudioFile.DONE:
+        payload["result"] = job.result
+    elif job.status == AudioFile.FAILED:
+        payload["error"] = job.error
+    return payload
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.inference import HEAVY_MODULES
+
+# run in a fresh interpreter: this process has already imported whatever manage.py needed
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns  # imports every views module behind the URLconf
+import config.asgi, config.wsgi
+elapsed_ms = (time.perf_counter() - start) * 1000
+from api.inference import heavy_modules_loaded
+print(json.dumps({"elapsed_ms": elapsed_ms, "heavy": heavy_modules_loaded(), "modules": len(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr):
+    """(module, cumulative us, depth) for each line of -X importtime output, in the order printed."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip()) - 1) // 2))
+    return rows
+
+
+def import_chain(rows, module):
+    """Who imported module: its importers, outermost first (children print before their parents)."""
+    for i, (name, _, depth) in enumerate(rows):
+        if name != module:
+            continue
+        chain = [name]
+        for parent, _, parent_depth in rows[i + 1:]:
+            if parent_depth < depth:
+                chain.append(parent)
+                depth = parent_depth
+        return list(reversed(chain))
+    return []
+
+
+class Command(BaseCommand):
+    help = "Fails if Django start-up (settings, apps, URLconf, ASGI/WSGI) imports the ML stack or exceeds an import-time budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=3000.0, help="maximum start-up import time")
+        parser.add_argument("--top", type=int, default=10, help="how many of the slowest top-level imports to list")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"))
+        # warming the model at boot is opt-in and imports the stack on purpose
+        env["AUDIO_WARM_UP_ON_BOOT"] = "0"
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT], cwd=str(settings.BASE_DIR),
+                              env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise CommandError(f"Start-up failed:\n{proc.stderr[-4000:]}")
+        report = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(proc.stderr)
+
+        self.stdout.write(f"Start-up imported {report['modules']} modules in {report['elapsed_ms']:.0f} ms "
+                          f"(budget {options['budget_ms']:.0f} ms)")
+        top_level = sorted((row for row in rows if row[2] == 0), key=lambda row: -row[1])
+        for name, cumulative, _ in top_level[:options["top"]]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        problems = []
+        for module in report["heavy"]:
+            chain = import_chain(rows, module)
+            problems.append(f"{module} imported at start-up" + (f" via {' -> '.join(chain)}" if chain else ""))
+        if report["elapsed_ms"] > options["budget_ms"]:
+            problems.append(f"start-up took {report['elapsed_ms']:.0f} ms, over the {options['budget_ms']:.0f} ms budget")
+        if problems:
+            raise CommandError("Import budget exceeded:\n" + "\n".join(problems)
+                               + f"\nOnly api.inference_service may import {', '.join(HEAVY_MODULES)}.")
+        self.stdout.write(self.style.SUCCESS("Import budget OK"))
@@ -0,0 +1,34 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.word_bank import import_words, publish_word_bank  # also puts the repo root on sys.path
+from audio.phonemes import WORD_BANK
+
+
+class Command(BaseCommand):
+    help = "Bulk imports words into the word bank (CSV of word,ipa rows or a JSON {word: ipa} object) and publishes a new version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help=".csv or .json files to import")
+        parser.add_argument("--seed", action="store_true", help="also import the built-in WORD_BANK")
+        parser.add_argument("--no-publish", action="store_true", help="only write the table, do not compile a new snapshot")
+
+    def handle(self, *args, **options):
+        words = dict(WORD_BANK) if options["seed"] else {}
+        for path in options["files"]:
+            try:
+                with open(path, newline="", encoding="utf-8") as f:
+                    if path.endswith(".json"):
+                        words.update(json.load(f))
+                    else:
+                        words.update((row[0], row[1]) for row in csv.reader(f) if len(row) >= 2 and row[0] != "word")
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {path}: {e}")
+        if not words and options["no_publish"]:
+            raise CommandError("Nothing to import")
+
+        count = import_words(words)
+        self.stdout.write(f"Imported {count} words")
+        if not options["no_publish"]:
+            version = publish_word_bank()
+            self.stdout.write(self.style.SUCCESS(f"Published word bank v{version}"))
@@ -0,0 +1,29 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Runs background audio scoring workers for the job queue (use with AUDIO_JOBS_BROKER=database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.AUDIO_JOBS["WORKERS"])
+
+    def handle(self, *args, **options):
+        from api.inference import get_inference
+        from api.views import job_pool
+
+        # load the inference pipeline before taking jobs, rather than inside the first one
+        get_inference()
+
+        if job_pool.broker.name == "local":
+            self.stderr.write("The local broker only runs jobs queued by this process; set AUDIO_JOBS_BROKER=database")
+        job_pool.workers = options["workers"]
+        job_pool.start()
+        self.stdout.write(f"Running {job_pool.workers} audio job workers ({job_pool.broker.name} broker)")
+        try:
+            while True:
+                time.sleep(60)
+                self.stdout.write(str(job_pool.stats()))
+        except KeyboardInterrupt:
+            pass
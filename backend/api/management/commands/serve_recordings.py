@@ -0,0 +1,52 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+
+
+class _RecordingHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 so clients keep their connections alive, like the real storage host
+    protocol_version = "HTTP/1.1"
+    delay_s = 0.0
+    fail_every = 0
+    _count = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        with self._lock:
+            type(self)._count += 1
+            count = self._count
+        if self.fail_every and count % self.fail_every == 0:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().do_GET()
+
+
+class Command(BaseCommand):
+    help = ("Serves a directory of recordings over HTTP as an offline stand-in for remote storage, "
+            "e.g. to submit http://localhost:8001/panel_exam_demo/<file> to submit_audio.")
+
+    def add_arguments(self, parser):
+        default_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "data"))
+        parser.add_argument("--dir", default=default_dir)
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--delay-ms", type=float, default=0, help="added latency per request")
+        parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503, to exercise retries")
+
+    def handle(self, *args, **options):
+        handler = type("Handler", (_RecordingHandler,), {
+            "delay_s": options["delay_ms"] / 1000,
+            "fail_every": options["fail_every"],
+        })
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), functools.partial(handler, directory=options["dir"]))
+        self.stdout.write(f"Serving {options['dir']} on http://127.0.0.1:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
@@ -34,11 +35,43 @@ class Score(models.Model):
 
 # audio model
 class AudioFile(models.Model):
-    """Model to temporarily store an uploaded audio file for processing."""
+    """Model to temporarily store an uploaded audio file for processing.
+    Also the record of a queued scoring job (see jobs.py): status moves queued -> running -> done/failed."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)  # Allow null temporarily
-    file = models.FileField(upload_to='temp_audio/')  # Temporarily stored file
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)  # the job id clients see; not guessable like id
+    file = models.FileField(upload_to='temp_audio/', blank=True)  # Temporarily stored file (jobs submitted by URL have none)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)  # Optional if you need it
     result = models.JSONField(null=True, blank=True)  # Add this line
+    source_url = models.URLField(max_length=2000, blank=True)
+    target_word = models.CharField(max_length=100, blank=True)
+    callback_url = models.URLField(max_length=2000, blank=True)  # POSTed the result when the job finishes
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
 
 
+# word bank
+class WordBankEntry(models.Model):
+    """A word the exercises can target, with its space-separated IPA phonemes."""
+    word = models.CharField(max_length=100, unique=True)
+    ipa = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.word
+
+class WordBankVersion(models.Model):
+    """A published, compiled snapshot of the word bank that workers load (see audio/bank_store.py)."""
+    version = models.PositiveIntegerField(unique=True)
+    word_count = models.PositiveIntegerField()
+    snapshot = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"v{self.version}"
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from django.conf import settings
+from .admission import Overloaded, client_address
+from .inference import get_inference
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+logger = logging.getLogger(__name__)
+
+RECOGNIZE_PATH = "/ws/recognize/"
+
+# open recognition connections in this process; they all run on one event loop
+_connections = 0
+
+
+async def _send_json(send, payload):
+    await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+
+async def _close(send, code=1000):
+    await send({"type": "websocket.close", "code": code})
+
+
+def _partial_result(recognizer, client):
+    """A running hypothesis, or None when scoring is at capacity: partials never queue
+    behind (or hold a slot from) final results and uploads."""
+    from .views import admission
+
+    with admission.admit_if_idle(client) as admitted:
+        if not admitted:
+            recognizer.skip_partial()
+            return None
+        return recognizer.partial()
+
+
+def _final_result(recognizer, target_word, client):
+    """Final inference and scoring for the utterance; blocking, so it runs off the event loop."""
+    # imported here so the views module loads once Django is ready
+    from .views import admission
+
+    with admission.admit(client):
+        prediction, logits = recognizer.finish()
+        body = get_inference().score_and_feedback(prediction, logits, target_word)
+    return {"type": "final", "phonemes": prediction, **body}
+
+
+async def recognize(scope, receive, send):
+    """Live recognition of one utterance per connection.
+
+    The client sends a JSON start message ({"type": "start", "target_word": ...,
+    "sample_rate": 16000, "format": "s16le" | "f32le"}), then binary frames of mono
+    PCM while the child speaks, and optionally {"type": "end"} to stop early. The
+    server pushes {"type": "partial", "phonemes": ...} as the hypothesis changes and
+    one {"type": "final", ...} message with the same body as /api/submit_audio/ as
+    soon as the endpointer (or the client) ends the utterance, then closes.
+    Past AUDIO_STREAMING['MAX_CONNECTIONS'] open connections, new ones are closed
+    with 1013 (try again later).
+    """
+    global _connections
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    if _connections >= settings.AUDIO_STREAMING["MAX_CONNECTIONS"]:
+        await _send_json(send, {"type": "error", "error": "Server is busy, please retry later"})
+        return await _close(send, 1013)
+    _connections += 1
+    try:
+        await _recognize_utterance(scope, receive, send)
+    finally:
+        _connections -= 1
+
+
+async def _recognize_utterance(scope, receive, send):
+    config = settings.AUDIO_STREAMING
+    recognizer = None
+    target_word = None
+    partial_task = None
+    last_partial = None
+    headers = dict(scope.get("headers") or [])
+    client = "ip:" + client_address((scope.get("client") or ("",))[0],
+                                    headers.get(b"x-forwarded-for", b"").decode("latin-1"),
+                                    settings.AUDIO_ADMISSION["TRUSTED_PROXIES"])
+
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            if partial_task is not None:
+                partial_task.cancel()
+            return
+
+        ended = False
+        if message.get("text") is not None:
+            try:
+                control = json.loads(message["text"])
+            except ValueError:
+                control = {}
+            if not isinstance(control, dict):
+                control = {}
+            if control.get("type") == "start" and recognizer is None:
+                try:
+                    sample_rate = int(control.get("sample_rate", 16000))
+                except (TypeError, ValueError):
+                    # e.g. null, "16k" or a list
+                    sample_rate = None
+                if sample_rate != 16000:
+                    await _send_json(send, {"type": "error", "error": "Audio must be 16 kHz mono PCM"})
+                    return await _close(send, 1003)
+                target_word = control.get("target_word") or None
+                # the first connection imports the model stack; keep that off the event loop
+                await asyncio.to_thread(get_inference)
+                from audio.model_registry import DEFAULT_CHECKPOINT
+                from audio.streaming import StreamingRecognizer
+                try:
+                    recognizer = StreamingRecognizer(
+                        DEFAULT_CHECKPOINT,
+                        sample_format=control.get("format", "s16le"),
+                        window_s=config["WINDOW_S"],
+                        partial_every_s=config["PARTIAL_EVERY_S"],
+                        end_silence_ms=config["END_SILENCE_MS"],
+                        max_utterance_s=config["MAX_UTTERANCE_S"],
+                    )
+                except ValueError as e:
+                    await _send_json(send, {"type": "error", "error": str(e)})
+                    return await _close(send, 1003)
+                continue
+            if control.get("type") == "end" and recognizer is not None:
+                ended = True
+            else:
+                await _send_json(send, {"type": "error", "error": "Expected a start message, PCM frames or end"})
+                continue
+        elif message.get("bytes") is not None:
+            if recognizer is None:
+                await _send_json(send, {"type": "error", "error": "Send a start message before audio"})
+                continue
+            ended = recognizer.feed(message["bytes"])
+
+        # report the last partial that finished; only one runs at a time, so a slow
+        # model skips hypotheses instead of falling behind the audio
+        if partial_task is not None and partial_task.done():
+            try:
+                phonemes = partial_task.result()
+                if phonemes is not None and phonemes != last_partial:
+                    last_partial = phonemes
+                    await _send_json(send, {"type": "partial", "phonemes": phonemes})
+            except Exception as e:
+                logger.warning(f"Partial recognition failed: {e}")
+            partial_task = None
+
+        if ended:
+            if partial_task is not None:
+                await asyncio.gather(partial_task, return_exceptions=True)
+            if not recognizer.speech_started:
+                await _send_json(send, {"type": "error", "error": "No speech detected"})
+                return await _close(send)
+            try:
+                result = await asyncio.to_thread(_final_result, recognizer, target_word, client)
+            except Overloaded as e:
+                result = {"type": "error", "error": "Server is busy, please retry later", "retry_after": e.retry_after}
+            except Exception as e:
+                logger.error(f"Streaming recognition failed: {e}")
+                result = {"type": "error", "error": "Processing failed"}
+            await _send_json(send, result)
+            return await _close(send)
+
+        if recognizer is not None and partial_task is None and recognizer.partial_due():
+            partial_task = asyncio.ensure_future(asyncio.to_thread(_partial_result, recognizer, client))
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI entry point for WebSocket connections."""
+    if scope["path"] == RECOGNIZE_PATH:
+        return await recognize(scope, receive, send)
+    # reject the handshake for anything else
+    message = await receive()
+    if message["type"] == "websocket.connect":
+        await _close(send, 4404)
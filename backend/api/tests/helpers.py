@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+import numpy as np
+
+
+def tiny_wav2vec2(return_attention_mask=False, seed=0):
+    """A small, randomly initialised wav2vec2 CTC model with the real checkpoint's layout
+    (group-norm feature encoder), wrapped in a TorchBackend, and its processor."""
+    import torch
+    from transformers import (Wav2Vec2Config, Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor, Wav2Vec2ForCTC,
+                              Wav2Vec2Processor)
+    from audio.inference_backends import TorchBackend
+
+    torch.manual_seed(seed)
+    vocab = {token: i for i, token in enumerate(["<pad>", "<s>", "</s>", "<unk>", "|", "ɹ", "æ", "b", "ɪ", "t"])}
+    config = Wav2Vec2Config(hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+                            vocab_size=len(vocab), conv_dim=(16,) * 7, num_conv_pos_embeddings=16)
+    with tempfile.TemporaryDirectory() as directory:
+        vocab_path = os.path.join(directory, "vocab.json")
+        with open(vocab_path, "w") as f:
+            json.dump(vocab, f)
+        tokenizer = Wav2Vec2CTCTokenizer(vocab_path)
+    feature_extractor = Wav2Vec2FeatureExtractor(return_attention_mask=return_attention_mask, do_normalize=True)
+    model = Wav2Vec2ForCTC(config).eval()
+    return TorchBackend(model), Wav2Vec2Processor(feature_extractor=feature_extractor, tokenizer=tokenizer)
+
+
+def noise(seconds, seed, sr=16000, scale=0.1):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * sr)) * scale).astype(np.float32)
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+
+from api.admission import AdmissionController, Overloaded, client_address
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def setUp(self):
+        self.controller = AdmissionController(max_concurrent=1, max_queue=8, max_queue_per_user=2, queue_timeout_s=5.0)
+        self.held = ExitStack()
+        self.addCleanup(self.held.close)
+        self.admitted = []
+        self.errors = []
+        self.threads = []
+
+    def hold(self, user="holder"):
+        self.held.enter_context(self.controller.admit(user))
+
+    def wait_in_queue(self, user, name):
+        """Starts a request on a thread and returns once it is queued."""
+        def request():
+            try:
+                with self.controller.admit(user):
+                    self.admitted.append(name)
+            except Overloaded as e:
+                self.errors.append((name, e.reason))
+
+        depth = self.controller.stats()["queue_depth"]
+        thread = threading.Thread(target=request, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        deadline = time.monotonic() + 5
+        while self.controller.stats()["queue_depth"] == depth and thread.is_alive():
+            self.assertLess(time.monotonic(), deadline, f"{name} never queued")
+            time.sleep(0.001)
+        self.assertEqual(self.errors, [])
+
+    def finish(self):
+        self.held.close()
+        for thread in self.threads:
+            thread.join(5)
+        self.assertEqual(self.errors, [])
+
+    def test_per_user_queue_cap(self):
+        self.hold()
+        self.wait_in_queue("a", "a1")
+        self.wait_in_queue("a", "a2")
+        with self.assertRaises(Overloaded) as raised:
+            with self.controller.admit("a"):
+                pass
+        self.assertEqual(raised.exception.reason, "user_queue_full")
+        # other users still get in line
+        self.wait_in_queue("b", "b1")
+        self.finish()
+        self.assertEqual(sorted(self.admitted), ["a1", "a2", "b1"])
+        self.assertEqual(self.controller.stats()["rejected"]["user_queue_full"], 1)
+
+    def test_freed_slots_go_round_robin_between_users(self):
+        self.hold()
+        for user, name in (("a", "a1"), ("a", "a2"), ("b", "b1"), ("c", "c1"), ("b", "b2")):
+            self.wait_in_queue(user, name)
+        self.finish()
+        self.assertEqual(self.admitted, ["a1", "b1", "c1", "a2", "b2"])
+        stats = self.controller.stats()
+        self.assertEqual((stats["active"], stats["queue_depth"], stats["waiting_users"]), (0, 0, 0))
+
+    def test_queue_timeout(self):
+        self.controller.queue_timeout_s = 0.05
+        self.hold()
+        start = time.monotonic()
+        with self.assertRaises(Overloaded) as raised:
+            with self.controller.admit("a"):
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(raised.exception.reason, "timeout")
+        stats = self.controller.stats()
+        self.assertEqual((stats["queue_depth"], stats["waiting_users"], stats["rejected"]["timeout"]), (0, 0, 1))
+
+    def test_full_queue_and_retry_after(self):
+        self.controller = AdmissionController(max_concurrent=2, max_queue=1, max_queue_per_user=1)
+        # no history yet: assume one second per request
+        self.assertEqual(self.controller.stats()["retry_after_s"], 1)
+        # one request that took 4 s (start, admitted, finished)
+        with mock.patch("api.admission.time.monotonic", side_effect=[100.0, 100.0, 104.0]):
+            with self.controller.admit("a"):
+                pass
+        self.hold()
+        self.hold()
+        self.wait_in_queue("b", "b1")
+        with self.assertRaises(Overloaded) as raised:
+            with self.controller.admit("c"):
+                pass
+        # 4 s each, for the queued request and this one, over two slots
+        self.assertEqual((raised.exception.reason, raised.exception.retry_after), ("queue_full", 4))
+        self.finish()
+        self.assertEqual(self.admitted, ["b1"])
+
+
+class ClientAddressTests(unittest.TestCase):
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        self.assertEqual(client_address("10.0.0.5", "203.0.113.9"), "10.0.0.5")
+        self.assertEqual(client_address(None), "")
+
+    def test_entry_added_by_outermost_trusted_proxy(self):
+        # the client sent a forged first entry; the proxy appended the address it saw
+        self.assertEqual(client_address("10.0.0.5", "1.2.3.4, 203.0.113.9", trusted_proxies=1), "203.0.113.9")
+        self.assertEqual(client_address("10.0.0.5", "1.2.3.4, 203.0.113.9, 10.0.0.2", trusted_proxies=2),
+                         "203.0.113.9")
+        self.assertEqual(client_address("10.0.0.5", "203.0.113.9", trusted_proxies=3), "203.0.113.9")
+        self.assertEqual(client_address("10.0.0.5", "", trusted_proxies=1), "10.0.0.5")
@@ -0,0 +1,54 @@
+import sys
+import threading
+import unittest
+from unittest import mock
+from .helpers import noise
+
+import numpy as np
+from audio import audio_ingest
+from audio.audio_ingest import AudioDecodeError, decode_audio_stream
+
+# stands in for ffmpeg: echoes stdin to stdout after writing `stderr_bytes` of diagnostics,
+# more than a pipe buffer holds, and exits with `status`
+FAKE_DECODER = """
+import sys
+stderr_bytes, status = int(sys.argv[1]), int(sys.argv[2])
+data = sys.stdin.buffer.read()
+sys.stderr.write("w" * stderr_bytes)
+sys.stderr.flush()
+sys.stdout.buffer.write(data)
+sys.exit(status)
+"""
+
+
+def decode_with_fake_decoder(chunks, stderr_bytes, status=0):
+    command = [sys.executable, "-c", FAKE_DECODER, str(stderr_bytes), str(status)]
+    result = {}
+
+    def run():
+        try:
+            result["audio"] = decode_audio_stream(chunks)
+        except Exception as e:
+            result["error"] = e
+
+    with mock.patch.object(audio_ingest, "_ffmpeg_command", return_value=command):
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+    return thread.is_alive(), result
+
+
+class DecodeAudioStreamTests(unittest.TestCase):
+    def test_large_stderr_does_not_deadlock(self):
+        clip = noise(2.0, 5)
+        data = clip.tobytes()
+        chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)]
+        hung, result = decode_with_fake_decoder(chunks, stderr_bytes=1 << 20)
+        self.assertFalse(hung)
+        np.testing.assert_array_equal(result["audio"], clip)
+
+    def test_failure_reports_stderr(self):
+        hung, result = decode_with_fake_decoder([b"\0" * 64], stderr_bytes=200_000, status=1)
+        self.assertFalse(hung)
+        self.assertIsInstance(result["error"], AudioDecodeError)
+        self.assertEqual(len(str(result["error"])), 200_000)
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import unittest
+from .test_phoneme_index import random_predictions
+
+import numpy as np
+from audio.audio_scoring import get_score, score_batch
+from audio.bank_store import current_bank
+
+
+def quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+class ScoreBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.predictions = [" ".join(phonemes) for phonemes in random_predictions(300, seed=15) if phonemes]
+
+    def test_results_match_get_score(self):
+        batch = score_batch(self.predictions)
+        for prediction, result in zip(self.predictions, batch.results):
+            expected = quiet(get_score, prediction)
+            self.assertEqual((result.score, result.extra_phonemes, result.missing_phonemes), expected)
+
+    def test_matrices_match_get_score_against_each_word(self):
+        bank = current_bank()
+        batch = score_batch(self.predictions[:40])
+        for i, prediction in enumerate(self.predictions[:40]):
+            best = int(np.argmin(batch.lev_distances[i]))
+            self.assertEqual(batch.results[i].word, batch.words[best])
+            self.assertEqual(batch.scores[i, best], batch.results[i].score)
+        self.assertEqual(batch.words, bank.words)
+
+    def test_blocking_does_not_change_results(self):
+        whole = score_batch(self.predictions)
+        # small enough to split both the predictions and the bank into many blocks
+        blocked = score_batch(self.predictions, max_cells=200)
+        np.testing.assert_array_equal(whole.lev_distances, blocked.lev_distances)
+        np.testing.assert_array_equal(whole.distances, blocked.distances)
+        np.testing.assert_array_equal(whole.scores, blocked.scores)
+
+    def test_explicit_targets_and_empty_inputs(self):
+        batch = score_batch(["ɹ æ b ɪ t"], targets=["rabbit"])
+        self.assertEqual(batch.words, ["rabbit"])
+        self.assertEqual(batch.results[0].word, "rabbit")
+        self.assertEqual(score_batch([], targets=["rabbit"]).scores.shape, (0, 1))
+        self.assertIsNone(score_batch(["ɹ"], targets=[]).results[0].word)
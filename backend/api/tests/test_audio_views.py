@@ -0,0 +1,108 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from django.urls import reverse
+import numpy as np
+from api.admission import AdmissionController
+from api.uploads import UploadSpool
+
+
+def decode(chunks):
+    """Stands in for decode_audio_stream: consumes the body and returns half a second of silence."""
+    for _ in chunks:
+        pass
+    return np.zeros(8000, dtype=np.float32)
+
+
+@mock.patch("api.views.decode_audio_stream", decode)
+class AdmissionResponseTests(SimpleTestCase):
+    def setUp(self):
+        self.inference = mock.Mock()
+        self.inference.process_submission.return_value = {"score": 100.0}
+        self.inference.extract_from_audio.return_value = ([], None, None)
+        self.inference.score_and_feedback.return_value = {"score": 100.0}
+        self.admission = AdmissionController(max_concurrent=1, max_queue=0)
+        for patcher in (mock.patch("api.views.get_inference", lambda: self.inference),
+                        mock.patch("api.views.admission", self.admission)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def submit(self):
+        return self.client.post(reverse("submit_audio"), {"audio_file": "https://example.com/a.m4a"},
+                                content_type="application/json")
+
+    def upload(self):
+        return self.client.post(reverse("upload_audio") + "?target_word=rabbit", b"\0" * 1024,
+                                content_type="audio/mp4")
+
+    def test_busy_server_answers_429_with_retry_after(self):
+        for send in (self.submit, self.upload):
+            # another request holds the only slot and nothing may queue
+            with self.admission.admit("ip:10.0.0.9"):
+                response = send()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response["Retry-After"], "1")
+            self.assertEqual(response.json()["reason"], "queue_full")
+        self.inference.process_submission.assert_not_called()
+        self.inference.extract_from_audio.assert_not_called()
+
+    def test_admitted_once_the_slot_is_free(self):
+        self.assertEqual(self.submit().status_code, 200)
+        self.assertEqual(self.upload().status_code, 200)
+        self.assertEqual(self.admission.stats()["admitted"], 2)
+
+
+@mock.patch("api.views.decode_audio_stream", decode)
+class UploadAudioTests(SimpleTestCase):
+    def setUp(self):
+        self.inference = mock.Mock()
+        self.inference.extract_from_audio.return_value = ([], None, None)
+        self.inference.score_and_feedback.return_value = {"score": 100.0}
+        self.admission = AdmissionController(max_concurrent=1, max_queue=0)
+        self.spools = []
+
+        def spool(max_bytes):
+            self.spools.append(UploadSpool(max_bytes))
+            return self.spools[-1]
+
+        for patcher in (mock.patch("api.views.get_inference", lambda: self.inference),
+                        mock.patch("api.views.admission", self.admission),
+                        mock.patch("api.views.UploadSpool", spool)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def upload(self, query="?target_word=rabbit"):
+        return self.client.post(reverse("upload_audio") + query, b"\0" * 1024, content_type="audio/mp4")
+
+    def test_raw_body_spool_is_closed_unless_archived(self):
+        self.assertEqual(self.upload().status_code, 200)
+        self.assertTrue(self.spools[-1].file.closed)
+        # a failure after the body was read must not leak it either
+        self.inference.extract_from_audio.side_effect = RuntimeError("boom")
+        self.assertEqual(self.upload().status_code, 500)
+        self.assertTrue(self.spools[-1].file.closed)
+
+        self.inference.extract_from_audio.side_effect = None
+        with mock.patch("api.views.archive_recording") as archive_recording:
+            self.assertEqual(self.upload("?target_word=rabbit&archive=1").status_code, 200)
+        # handed to the archiver, which closes it once saved
+        self.assertIs(archive_recording.call_args.args[0].file, self.spools[-1].file)
+        self.assertFalse(self.spools[-1].file.closed)
+        self.spools[-1].file.close()
+
+    def test_unexpected_errors_are_500(self):
+        self.inference.score_and_feedback.side_effect = KeyError("feedback")
+        response = self.upload()
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.json())
+
+    def test_no_slot_is_held_while_the_body_streams_in(self):
+        active = []
+
+        def decode_and_check(chunks):
+            active.append(self.admission.stats()["active"])
+            return decode(chunks)
+
+        with mock.patch("api.views.decode_audio_stream", decode_and_check):
+            self.assertEqual(self.upload().status_code, 200)
+        self.assertEqual(active, [0])
+        self.assertEqual(self.admission.stats()["admitted"], 1)
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+from audio.audio_scoring import get_score
+from audio.bank_store import BankStore, compile_bank, load_snapshot
+from audio.phoneme_alignment import align_phonemes
+from audio.phoneme_inventory import INVENTORY, UNKNOWN_ID
+from audio.phoneme_similarity import PHONEME_SIMILARITY
+
+BANK = {"rabbit": "ɹ æ b ɪ t", "cat": "k æ t", "dog": "d ɔ ɡ"}
+
+
+def quiet_score(prediction, bank):
+    with mock.patch("audio.audio_scoring.current_bank", return_value=bank), \
+            contextlib.redirect_stdout(io.StringIO()):
+        return get_score(prediction)
+
+
+class BankStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = BankStore(self.directory.name, check_interval_s=0.0)
+
+    def test_compiled_bank_knows_similarity_symbols(self):
+        inventory = compile_bank(BANK).inventory
+        self.assertTrue(inventory.frozen)
+        for pair in PHONEME_SIMILARITY:
+            self.assertNotIn(UNKNOWN_ID, inventory.encode(list(pair)).tolist())
+        with self.assertRaises(ValueError):
+            inventory.intern("q̃")
+
+    def test_first_score_after_load_matches_later_ones(self):
+        # ɾ is only in the similarity table, not in the bank
+        for bank in (compile_bank(BANK), load_snapshot(self._publish(BANK, 1))):
+            first = quiet_score("ɹ æ b ɪ ɾ", bank)
+            self.assertEqual(quiet_score("ɹ æ b ɪ ɾ", bank), first)
+            self.assertEqual(first[0], 100.0)
+
+    def test_snapshot_round_trip(self):
+        compiled = compile_bank(BANK)
+        loaded = load_snapshot(self._publish(BANK, 1))
+        self.assertEqual(loaded.version, 1)
+        self.assertEqual(loaded.inventory.symbols, compiled.inventory.symbols)
+        self.assertTrue((loaded.inventory.cost_matrix == compiled.inventory.cost_matrix).all())
+        for word, ipa in BANK.items():
+            self.assertEqual(loaded.split[word], ipa.split())
+            self.assertEqual(loaded.index.nearest(loaded.compiled.ids_for(word).tolist())[0], word)
+
+    def test_publish_swaps_bank_and_prunes_old_snapshots(self):
+        for version in range(1, 6):
+            self.store.publish({**BANK, f"word{version}": "w ɝ d"}, version)
+            self.assertEqual(self.store.current().version, version)
+        snapshots = sorted(n for n in os.listdir(self.directory.name) if n.endswith(".bin"))
+        self.assertEqual(snapshots, ["bank-000003.bin", "bank-000004.bin", "bank-000005.bin"])
+
+    def test_alignment_does_not_grow_shared_inventory(self):
+        symbols = list(INVENTORY.symbols)
+        alignment = align_phonemes(["q̃", "æ"], ["q̃", "æ", "ʘ"])
+        self.assertEqual(alignment.distance, 1.0)
+        self.assertEqual(alignment.missing_phonemes, ["ʘ"])
+        self.assertEqual(INVENTORY.symbols, symbols)
+
+    def _publish(self, bank, version):
+        return os.path.join(self.directory.name, self.store.publish(bank, version))
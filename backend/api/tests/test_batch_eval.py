@@ -0,0 +1,80 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from .helpers import noise
+
+from audio.batch_eval import STAGES, _score_batch, guess_word, length_buckets, summarize, write_results
+from audio.model_registry import DEFAULT_CHECKPOINT
+
+
+def decoded_item(path, seconds, seed, word=None):
+    """What _decode produces for a recording, without ffmpeg."""
+    return {"path": path, "expected_word": word, "audio": noise(seconds, seed), "audio_seconds": seconds,
+            "trimmed_samples": 0, "decode_ms": 1.0, "trim_ms": 0.5}
+
+
+class BatchEvalTests(unittest.TestCase):
+    def setUp(self):
+        lengths = [0.9, 0.3, 1.5, 0.6, 1.2, 0.4, 0.8]
+        self.items = [decoded_item(f"clip{i}.wav", seconds, i, "rabbit" if i % 2 else None)
+                      for i, seconds in enumerate(lengths)]
+
+    def score(self, batch_size=3):
+        batches = length_buckets(self.items, batch_size)
+        return [item for batch in batches for item in _score_batch((batch, DEFAULT_CHECKPOINT, "stub"))]
+
+    def test_length_buckets(self):
+        batches = length_buckets(self.items, 3)
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        lengths = [len(item["audio"]) for batch in batches for item in batch]
+        self.assertEqual(lengths, sorted(lengths))
+        self.assertEqual(sorted(item["path"] for batch in batches for item in batch),
+                         sorted(item["path"] for item in self.items))
+        self.assertEqual(length_buckets([], 3), [])
+
+    def test_scored_items_and_summary(self):
+        results = self.score()
+        self.assertEqual(len(results), len(self.items))
+        for result in results:
+            self.assertNotIn("audio", result)
+            self.assertIsInstance(result["prediction"], str)
+            self.assertAlmostEqual(result["total_ms"], sum(result[stage] for stage in STAGES))
+            self.assertEqual(result["word_match"] is None, result["expected_word"] is None)
+
+        summary = summarize(results, wall_seconds=2.0)
+        matched = [r["word_match"] for r in results if r["word_match"] is not None]
+        self.assertEqual(summary["files"], 7)
+        self.assertEqual(summary["files_per_second"], 3.5)
+        self.assertAlmostEqual(summary["audio_seconds_per_second"], sum(r["audio_seconds"] for r in results) / 2.0)
+        self.assertAlmostEqual(summary["mean_score"], sum(r["score"] for r in results) / 7)
+        self.assertEqual(summary["word_accuracy"], sum(matched) / len(matched))
+        decode = summary["latency_ms"]["decode_ms"]
+        self.assertEqual((decode["mean"], decode["p50"], decode["p99"]), (1.0, 1.0, 1.0))
+        self.assertEqual(summarize([], 0.0)["word_accuracy"], None)
+
+    def test_csv_and_json_writers(self):
+        results = self.score()
+        summary = summarize(results, wall_seconds=1.0)
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "results.csv")
+            write_results(results, summary, csv_path)
+            with open(csv_path, newline="") as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([row["path"] for row in rows], [r["path"] for r in results])
+            self.assertEqual(rows[0]["prediction"], results[0]["prediction"])
+            with open(os.path.join(directory, "results_summary.json")) as f:
+                self.assertEqual(json.load(f), json.loads(json.dumps(summary)))
+
+            json_path = os.path.join(directory, "results.json")
+            write_results(results, summary, json_path)
+            with open(json_path) as f:
+                written = json.load(f)
+            self.assertEqual(written["summary"]["files"], 7)
+            self.assertEqual([r["path"] for r in written["results"]], [r["path"] for r in results])
+
+    def test_guess_word(self):
+        self.assertEqual(guess_word("data/test/suhyma_carrot.wav"), "carrot")
+        self.assertEqual(guess_word("data/test/sandra rope.wav"), "rope")
+        self.assertIsNone(guess_word("data/test/names.wav"))
@@ -0,0 +1,40 @@
+import unittest
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+from audio.benchmarks import find_regressions
+
+
+def stages(**medians):
+    return {name: {"median_ms": median, "p90_ms": median, "mean_ms": median, "runs": 5}
+            for name, median in medians.items()}
+
+
+class FindRegressionsTests(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {"backend": "stub", "stages": stages(decode=10.0, inference=40.0, align=0.02)}
+
+    def test_above_threshold_is_reported(self):
+        current = stages(decode=12.5, inference=40.0)
+        self.assertEqual(find_regressions(current, self.baseline, 20.0), [("decode", 10.0, 12.5)])
+
+    def test_below_threshold_or_faster_is_not(self):
+        current = stages(decode=11.9, inference=30.0)
+        self.assertEqual(find_regressions(current, self.baseline, 20.0), [])
+        # exactly at the limit is still allowed
+        self.assertEqual(find_regressions(stages(decode=12.0), self.baseline, 20.0), [])
+
+    def test_tiny_absolute_changes_are_ignored(self):
+        # 150% slower, but only 0.03 ms
+        self.assertEqual(find_regressions(stages(align=0.05), self.baseline, 20.0), [])
+        self.assertEqual(find_regressions(stages(align=0.05), self.baseline, 20.0, min_delta_ms=0.0),
+                         [("align", 0.02, 0.05)])
+
+    def test_stages_missing_from_either_side_are_skipped(self):
+        current = stages(decode=50.0, ffmpeg_convert=99.0)
+        self.assertEqual(find_regressions(current, self.baseline, 20.0), [("decode", 10.0, 50.0)])
+        self.assertEqual(find_regressions({}, self.baseline, 20.0), [])
+
+    def test_bare_stage_dict_baseline(self):
+        # older baselines were the stage dict without the {"stages": ...} wrapper
+        self.assertEqual(find_regressions(stages(inference=60.0), self.baseline["stages"], 20.0),
+                         [("inference", 40.0, 60.0)])
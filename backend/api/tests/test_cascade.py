@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+from .helpers import noise
+
+from audio import cascade
+from audio.cascade import FIRST_PASS, FULL, CascadedInference
+from audio.ctc_scoring import TargetScore
+from audio.phoneme_extraction import predict_batch
+
+# first-pass confidence per target word; the threshold below is 0.8
+CONFIDENCE = {"rabbit": 0.8, "carrot": 0.79, "rope": 0.95}
+
+
+def fake_score_target(logits, target_word, decoder):
+    if target_word not in CONFIDENCE:
+        raise ValueError(f"{target_word!r} is not in the word bank")
+    return TargetScore(target_word, 100.0, [], [], 0.0, [("ɹ", CONFIDENCE[target_word])], [])
+
+
+class CascadedInferenceTests(unittest.TestCase):
+    def setUp(self):
+        self.clips = [noise(0.4 + 0.1 * i, i) for i in range(6)]
+        self.items = list(zip(self.clips, ["rabbit", None, "carrot", "notaword", "rope", None]))
+        patcher = mock.patch.object(cascade, "score_target", fake_score_target)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_cascade(self, first_pass_backend="stub"):
+        inference = CascadedInference(first_pass_backend=first_pass_backend, full_backend="stub", threshold=0.8)
+        with mock.patch.object(cascade, "predict_batch", wraps=predict_batch) as spy:
+            results = inference.predict_batch(self.items)
+        return inference, results, spy
+
+    def test_accept_at_threshold_and_escalate_below(self):
+        inference, results, spy = self.run_cascade()
+        self.assertEqual([tier for _, _, tier in results], [FIRST_PASS, FULL, FULL, FULL, FIRST_PASS, FULL])
+        # one first-pass batch of the targeted clips, one full batch of the rest
+        first_batch, full_batch = [call.args[0] for call in spy.call_args_list]
+        self.assertEqual(len(first_batch), 4)
+        self.assertEqual([id(clip) for clip in full_batch], [id(self.clips[i]) for i in (1, 2, 3, 5)])
+
+        stats = inference.stats()
+        self.assertEqual((stats["requests"], stats["with_target"], stats["accepted"], stats["escalated"]), (6, 4, 2, 2))
+        self.assertEqual(stats["escalation_rate"], 0.5)
+        self.assertEqual(stats["latency"][FIRST_PASS]["batches"], 1)
+
+    def test_full_results_keep_input_order(self):
+        _, results, _ = self.run_cascade()
+        for clip, (prediction, logits, tier) in zip(self.clips, results):
+            expected, expected_logits = predict_batch([clip], return_logits=True, backend="stub")[0]
+            self.assertEqual(prediction, expected)
+            self.assertEqual(logits.shape, expected_logits.shape)
+
+    def test_disabled_cascade_reports_no_escalations(self):
+        inference, results, spy = self.run_cascade(first_pass_backend=None)
+        self.assertEqual([tier for _, _, tier in results], [FULL] * 6)
+        self.assertEqual(spy.call_count, 1)
+        stats = inference.stats()
+        self.assertEqual((stats["requests"], stats["with_target"], stats["escalated"]), (6, 0, 0))
+        self.assertEqual(stats["escalation_rate"], 0.0)
@@ -0,0 +1,87 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from itertools import groupby
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+import torch
+from transformers import Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor, Wav2Vec2Processor
+from audio.ctc_decoding import CTCDecoder
+
+VOCAB = ["<pad>", "<s>", "</s>", "<unk>", "|", "ɹ", "æ", "b", "ɪ", "ˈɪ", "t", "ˌoʊ", "oʊ"]
+
+
+def build_processor(vocab=VOCAB):
+    with tempfile.TemporaryDirectory() as directory:
+        vocab_path = os.path.join(directory, "vocab.json")
+        with open(vocab_path, "w") as f:
+            json.dump({token: i for i, token in enumerate(vocab)}, f)
+        tokenizer = Wav2Vec2CTCTokenizer(vocab_path)
+    return Wav2Vec2Processor(feature_extractor=Wav2Vec2FeatureExtractor(), tokenizer=tokenizer)
+
+
+def groupby_decode(ids, processor, ignore_stress=True):
+    """The greedy decode CTCDecoder replaced: groupby over the ids, one processor.decode per id."""
+    ids = [id_ for id_, _ in groupby(ids)]
+    special_token_ids = processor.tokenizer.all_special_ids + [processor.tokenizer.word_delimiter_token_id]
+    phonemes = [processor.decode(id_) for id_ in ids if id_ not in special_token_ids]
+    if len(phonemes) >= 2 and phonemes[0] == phonemes[1]:
+        phonemes.pop(0)
+    if len(phonemes) >= 2 and phonemes[-1] == phonemes[-2]:
+        phonemes.pop()
+    prediction = " ".join(phonemes)
+    if ignore_stress:
+        prediction = prediction.replace("ˈ", "").replace("ˌ", "")
+    return prediction
+
+
+class CTCDecoderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = build_processor()
+        cls.decoder = CTCDecoder(cls.processor)
+
+    def test_matches_groupby_decode_on_random_ids(self):
+        rng = random.Random(6)
+        # blank-heavy, like real CTC output
+        weights = [8, 1, 1, 1, 2] + [1] * (len(VOCAB) - 5)
+        for _ in range(500):
+            clips = [rng.choices(range(len(VOCAB)), weights, k=rng.randint(0, 40)) for _ in range(rng.randint(1, 6))]
+            lengths = torch.tensor([len(clip) for clip in clips])
+            padded = torch.zeros(len(clips), max(1, int(lengths.max())), dtype=torch.long)
+            # padding with a real phoneme id checks that lengths are respected
+            padded[:] = VOCAB.index("t")
+            for row, clip in enumerate(clips):
+                padded[row, :len(clip)] = torch.tensor(clip, dtype=torch.long)
+            for ignore_stress in (True, False):
+                expected = [groupby_decode(clip, self.processor, ignore_stress) for clip in clips]
+                self.assertEqual(self.decoder.decode_ids(padded, lengths, ignore_stress), expected)
+
+    def test_decode_batch_list_and_padded_logits_agree(self):
+        torch.manual_seed(6)
+        clips = [torch.randn(frames, len(VOCAB)) for frames in (5, 17, 1, 9)]
+        expected = [groupby_decode(clip.argmax(-1).tolist(), self.processor) for clip in clips]
+        self.assertEqual(self.decoder.decode_batch(clips), expected)
+        padded = torch.nn.utils.rnn.pad_sequence(clips, batch_first=True)
+        self.assertEqual(self.decoder.decode_batch(padded, torch.tensor([5, 17, 1, 9])), expected)
+
+    def test_edge_cases(self):
+        ids = {token: VOCAB.index(token) for token in VOCAB}
+        cases = [
+            ([], ""),
+            ([ids["<pad>"]] * 6, ""),
+            # repeats collapse, a blank between them keeps both
+            ([ids["ɹ"], ids["ɹ"], ids["æ"], ids["<pad>"], ids["æ"], ids["b"], ids["b"]], "ɹ æ æ b"),
+            # special tokens and the word delimiter are dropped
+            ([ids["<s>"], ids["ɹ"], ids["|"], ids["<unk>"], ids["æ"], ids["</s>"]], "ɹ æ"),
+            # a doubled first or last phoneme is trimmed once
+            ([ids["t"], ids["<pad>"], ids["t"], ids["ɪ"], ids["<pad>"], ids["ɪ"]], "t ɪ"),
+            ([ids["ˈɪ"], ids["ɪ"], ids["ˌoʊ"]], "ɪ ɪ oʊ"),
+        ]
+        for clip, expected in cases:
+            self.assertEqual(self.decoder.decode_ids(torch.tensor([clip], dtype=torch.long).reshape(1, len(clip)),
+                                                     torch.tensor([len(clip)])), [expected])
+            self.assertEqual(groupby_decode(clip, self.processor), expected)
+        self.assertEqual(self.decoder.decode_ids(torch.tensor([ids["ˈɪ"], ids["ɪ"]]), ignore_stress=False), ["ˈɪ ɪ"])
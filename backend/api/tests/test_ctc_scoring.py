@@ -0,0 +1,98 @@
+import unittest
+from .test_ctc_decoding import VOCAB, build_processor
+
+import numpy as np
+import torch
+from audio.audio_scoring import normalized_score
+from audio.bank_store import current_bank
+from audio.ctc_decoding import CTCDecoder
+from audio.ctc_scoring import ctc_log_likelihoods, forced_alignment, score_target
+
+SCORING_VOCAB = VOCAB + ["w"]
+
+
+def spoken(phonemes, frames_per_phoneme=3, confidence=8.0):
+    """Frame logits for a clip that clearly says the given phonemes, with blanks between them."""
+    ids = []
+    for phoneme in phonemes:
+        ids += [SCORING_VOCAB.index(phoneme)] * frames_per_phoneme + [0, 0]
+    logits = np.zeros((len(ids) + 2, len(SCORING_VOCAB)))
+    logits[np.arange(2, len(ids) + 2), ids] = confidence
+    logits[:2, 0] = confidence
+    return logits
+
+
+class CTCLogLikelihoodTests(unittest.TestCase):
+    def torch_log_likelihoods(self, class_log_probs, labels):
+        log_probs = torch.from_numpy(class_log_probs)[:, None, :].expand(-1, len(labels), -1)
+        loss = torch.nn.functional.ctc_loss(
+            log_probs, torch.from_numpy(labels).long(),
+            torch.full((len(labels),), len(class_log_probs), dtype=torch.long),
+            torch.full((len(labels),), labels.shape[1], dtype=torch.long),
+            blank=0, reduction="none", zero_infinity=False)
+        return -loss.numpy()
+
+    def test_matches_torch_ctc_loss_on_random_logits(self):
+        rng = np.random.default_rng(17)
+        for frames, classes, hypotheses, length in [(30, 6, 4, 5), (12, 3, 5, 4), (50, 9, 2, 8), (7, 4, 3, 1)]:
+            logits = rng.normal(scale=3.0, size=(frames, classes))
+            class_log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+            # repeated labels are drawn often with few classes, which exercises the no-skip rule
+            labels = rng.integers(1, classes, size=(hypotheses, length))
+            np.testing.assert_allclose(ctc_log_likelihoods(class_log_probs, labels),
+                                       self.torch_log_likelihoods(class_log_probs, labels), rtol=1e-6)
+
+    def test_too_few_frames_is_impossible(self):
+        class_log_probs = np.log(np.full((2, 3), 1 / 3))
+        labels = np.array([[1, 1], [1, 2]])
+        # "1 1" needs a blank between the repeats: three frames
+        self.assertEqual(ctc_log_likelihoods(class_log_probs, labels)[0], -np.inf)
+        self.assertTrue(np.isfinite(ctc_log_likelihoods(class_log_probs, labels)[1]))
+        self.assertTrue(np.all(ctc_log_likelihoods(class_log_probs[:0], labels) == -np.inf))
+        self.assertIsNone(forced_alignment(class_log_probs, labels[0]))
+
+
+class ScoreTargetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.decoder = CTCDecoder(build_processor(SCORING_VOCAB))
+        cls.bank = current_bank()
+
+    def score(self, phonemes):
+        return score_target(spoken(phonemes), "rabbit", self.decoder, self.bank)
+
+    def test_correct_word(self):
+        result = self.score(["ɹ", "æ", "b", "ɪ", "t"])
+        self.assertEqual(result.score, 100.0)
+        self.assertEqual((result.extra_phonemes, result.missing_phonemes), ([], []))
+        self.assertTrue(all(confidence > 0.9 for _, confidence in result.phoneme_confidence))
+        self.assertEqual([s[:3] for s in result.substitutions], [(0, "ɹ", "w")])
+        self.assertGreater(result.substitutions[0][3], 0.99)
+
+    def test_known_confusion(self):
+        result = self.score(["w", "æ", "b", "ɪ", "t"])
+        self.assertEqual((result.extra_phonemes, result.missing_phonemes), (["w"], ["ɹ"]))
+        self.assertLess(result.substitutions[0][3], 0.01)
+        heard, target = self.bank.inventory.encode(["w", "ɹ"])
+        cost = self.bank.inventory.cost_matrix[heard, target]
+        self.assertEqual(result.score, normalized_score(float(cost), 5))
+        self.assertLess(result.score, 100.0)
+
+    def test_missing_phoneme(self):
+        result = self.score(["ɹ", "æ", "ɪ", "t"])
+        self.assertEqual((result.extra_phonemes, result.missing_phonemes), ([], ["b"]))
+        self.assertEqual(result.score, normalized_score(1.0, 5))
+        confidence = dict(result.phoneme_confidence)
+        self.assertLess(confidence["b"], 0.3)
+        self.assertGreater(confidence["t"], 0.9)
+
+    def test_zero_frames(self):
+        result = score_target(np.zeros((0, len(SCORING_VOCAB))), "rabbit", self.decoder, self.bank)
+        self.assertEqual(result.score, 0)
+        self.assertEqual(result.log_likelihood, -np.inf)
+        self.assertEqual(result.missing_phonemes, ["ɹ", "æ", "b", "ɪ", "t"])
+        self.assertEqual([c for _, c in result.phoneme_confidence], [0.0] * 5)
+
+    def test_unknown_word(self):
+        with self.assertRaises(ValueError):
+            score_target(spoken(["t"]), "notaword", self.decoder, self.bank)
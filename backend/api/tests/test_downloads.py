@@ -0,0 +1,100 @@
+import functools
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from .helpers import noise
+from .test_audio_ingest import decode_with_fake_decoder
+
+import numpy as np
+from api.downloads import AudioDownloader, DownloadError, DownloadTooLarge
+from api.management.commands.serve_recordings import _RecordingHandler
+
+
+class _Handler(_RecordingHandler):
+    def do_GET(self):
+        if not self.path.startswith("/no-length/"):
+            return super().do_GET()
+        # a body of unknown length, as from a chunked or proxied response
+        with open(os.path.join(self.directory, os.path.basename(self.path)), "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AudioDownloaderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.clip = noise(1.0, 21)
+        with open(os.path.join(cls.directory.name, "clip.raw"), "wb") as f:
+            f.write(cls.clip.tobytes())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def serve(self, **attrs):
+        """Starts a recordings server on a free port; attrs configure its handler (e.g. fail_every)."""
+        handler = type("Handler", (_Handler,), {"_count": 0, "_lock": threading.Lock(), **attrs})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=self.directory.name))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.handler = handler
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def downloader(self, **kwargs):
+        downloader = AudioDownloader(backoff_s=0, **{"chunk_size": 4096, **kwargs})
+        self.addCleanup(downloader.close)
+        return downloader
+
+    def test_fetch(self):
+        base = self.serve()
+        self.assertEqual(self.downloader().fetch(f"{base}/clip.raw"), self.clip.tobytes())
+        with self.assertRaises(DownloadError) as raised:
+            self.downloader().fetch(f"{base}/missing.raw")
+        self.assertEqual(raised.exception.status, 400)
+
+    def test_content_length_over_the_cap_is_refused_up_front(self):
+        base = self.serve()
+        chunks = self.downloader(max_bytes=1000).iter_chunks(f"{base}/clip.raw")
+        # refused before a single chunk is handed out
+        with self.assertRaises(DownloadTooLarge) as raised:
+            next(chunks)
+        self.assertEqual(raised.exception.status, 413)
+
+    def test_size_cap_without_content_length(self):
+        base = self.serve()
+        received = []
+        with self.assertRaises(DownloadTooLarge):
+            for chunk in self.downloader(max_bytes=10_000).iter_chunks(f"{base}/no-length/clip.raw"):
+                received.append(chunk)
+        self.assertGreater(len(received), 0)
+        self.assertLessEqual(sum(map(len, received)), 10_000)
+
+    def test_5xx_is_retried(self):
+        # every second request fails, starting with the first
+        base = self.serve(fail_every=2, _count=1)
+        self.assertEqual(self.downloader(retries=2).fetch(f"{base}/clip.raw"), self.clip.tobytes())
+        self.assertEqual(self.handler._count, 3)
+
+    def test_gives_up_after_the_retries(self):
+        base = self.serve(fail_every=1)
+        with self.assertRaises(DownloadError):
+            self.downloader(retries=2).fetch(f"{base}/clip.raw")
+        self.assertEqual(self.handler._count, 3)
+
+    def test_streams_into_decode_audio_stream(self):
+        base = self.serve()
+        hung, result = decode_with_fake_decoder(self.downloader().iter_chunks(f"{base}/clip.raw"), stderr_bytes=0)
+        self.assertFalse(hung)
+        np.testing.assert_array_equal(result["audio"], self.clip)
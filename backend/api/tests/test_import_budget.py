@@ -0,0 +1,26 @@
+import io
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from api.management.commands.check_import_budget import import_chain, parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     torch._C
+import time:      3000 |       3120 |   torch
+import time:        50 |       3170 | api.views
+import time:        80 |         80 | api.urls
+"""
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_start_up_does_not_import_the_ml_stack(self):
+        # the budget is generous so a slow machine does not fail it; the heavy-module check is the point
+        out = io.StringIO()
+        call_command("check_import_budget", budget_ms=60_000, stdout=out)
+        self.assertIn("Import budget OK", out.getvalue())
+
+    def test_import_chain_from_importtime_output(self):
+        rows = parse_importtime(IMPORTTIME)
+        self.assertEqual(rows[:2], [("torch._C", 120, 2), ("torch", 3120, 1)])
+        self.assertEqual(import_chain(rows, "torch"), ["api.views", "torch"])
+        self.assertEqual(import_chain(rows, "torch._C"), ["api.views", "torch", "torch._C"])
+        self.assertEqual(import_chain(rows, "transformers"), [])
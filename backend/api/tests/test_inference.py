@@ -0,0 +1,91 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from .helpers import noise, tiny_wav2vec2
+
+import torch
+from transformers import Wav2Vec2FeatureExtractor
+from audio.inference_backends import InferenceBackend
+from audio.inference_scheduler import BatchScheduler
+from audio.phoneme_extraction import batch_logits, chunked_logits
+
+
+class BatchLogitsTests(unittest.TestCase):
+    def test_batched_matches_single_clip_without_attention_mask(self):
+        backend, processor = tiny_wav2vec2(return_attention_mask=False)
+        clips = [noise(1.0, 1), noise(0.6, 2), noise(1.0, 3), noise(0.3, 4)]
+        batched = batch_logits(clips, backend, processor)
+        for clip, logits in zip(clips, batched):
+            single = batch_logits([clip], backend, processor)[0]
+            self.assertEqual(logits.shape, single.shape)
+            torch.testing.assert_close(logits, single, atol=1e-5, rtol=1e-5)
+
+    def test_frame_counts_follow_each_clip(self):
+        backend, processor = tiny_wav2vec2(return_attention_mask=True)
+        clips = [noise(1.0, 1), noise(0.5, 2)]
+        batched = batch_logits(clips, backend, processor)
+        expected = backend.output_lengths(torch.tensor([len(c) for c in clips]))
+        self.assertEqual([len(l) for l in batched], expected.tolist())
+
+
+class BatchSchedulerTests(unittest.TestCase):
+    def test_short_result_list_fails_the_remaining_requests(self):
+        release = threading.Event()
+
+        def infer(items):
+            release.wait(5)
+            return items[:1]
+
+        scheduler = BatchScheduler(infer, max_batch_size=3, max_wait_ms=200)
+        futures = [scheduler.submit(i) for i in range(3)]
+        release.set()
+        self.assertEqual(futures[0].result(timeout=5), 0)
+        for future in futures[1:]:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        self.assertTrue(scheduler.stats()["recent_batches"][-1]["failed"])
+
+    def test_results_come_back_in_order(self):
+        scheduler = BatchScheduler(lambda items: [item * 2 for item in items], max_batch_size=4, max_wait_ms=50)
+        futures = [scheduler.submit(i) for i in range(6)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [0, 2, 4, 6, 8, 10])
+
+
+def receptive_field(config):
+    """Samples one frame of the conv feature encoder sees."""
+    field, jump = 1, 1
+    for kernel, stride in zip(config.conv_kernel, config.conv_stride):
+        field += (kernel - 1) * jump
+        jump *= stride
+    return field
+
+
+class _FrameMeanBackend(InferenceBackend):
+    """Each frame's logits depend only on that frame's own receptive field, so windowed
+    and single-pass logits must agree exactly, frame for frame."""
+    def logits(self, inputs):
+        values = inputs["input_values"]
+        frames = int(self.output_lengths(torch.tensor([values.shape[1]]))[0])
+        ratio, width = self.config.inputs_to_logits_ratio, receptive_field(self.config)
+        rows = [values[:, f * ratio:f * ratio + width].mean(dim=1) for f in range(frames)]
+        return torch.stack(rows, dim=1).unsqueeze(-1).repeat(1, 1, 3)
+
+
+class ChunkedLogitsTests(unittest.TestCase):
+    def test_windows_stitch_to_the_single_pass_frames(self):
+        backend, processor = tiny_wav2vec2()
+        processor = SimpleNamespace(feature_extractor=Wav2Vec2FeatureExtractor(do_normalize=False))
+        local = _FrameMeanBackend(backend.config)
+        for seconds in (5.0, 5.33, 7.9):
+            clip = noise(seconds, 5)
+            single = batch_logits([clip], local, processor)[0]
+            chunked = chunked_logits(clip, local, processor, chunk_length_s=2.0, stride_length_s=0.4)
+            self.assertEqual(chunked.shape, single.shape)
+            torch.testing.assert_close(chunked, single)
+
+    def test_real_model_keeps_every_frame(self):
+        backend, processor = tiny_wav2vec2()
+        clip = noise(12.3, 6)
+        single = batch_logits([clip], backend, processor)[0]
+        chunked = chunked_logits(clip, backend, processor, chunk_length_s=4.0, stride_length_s=1.0)
+        self.assertEqual(chunked.shape, single.shape)
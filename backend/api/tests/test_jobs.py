@@ -0,0 +1,107 @@
+from datetime import timedelta
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from api.jobs import DatabaseBroker, JobWorkerPool, LocalBroker, callback_allowed
+from api.models import AudioFile
+
+
+def queue_job(url="https://example.com/a.m4a", **fields):
+    return AudioFile.objects.create(source_url=url, status=AudioFile.QUEUED, **fields)
+
+
+class DatabaseBrokerTests(TestCase):
+    def setUp(self):
+        self.broker = DatabaseBroker(poll_interval_s=0.01)
+
+    def test_claims_oldest_queued_job_once(self):
+        first, second = queue_job(), queue_job()
+        AudioFile.objects.create(status=AudioFile.QUEUED)  # no URL: not a job
+        self.assertEqual(self.broker.depth(), 2)
+        self.assertEqual(self.broker.claim(timeout=0), first.id)
+        first.refresh_from_db()
+        self.assertEqual(first.status, AudioFile.RUNNING)
+        self.assertIsNotNone(first.started_at)
+        self.assertEqual(self.broker.claim(timeout=0), second.id)
+        self.assertIsNone(self.broker.claim(timeout=0))
+
+    def test_finished_and_failed_jobs(self):
+        def handler(url, target_word):
+            if url.endswith("bad.m4a"):
+                raise RuntimeError("decode failed")
+            return {"score": 100.0, "target_word": target_word}
+
+        pool = JobWorkerPool(self.broker, handler)
+        good, bad = queue_job(target_word="rabbit"), queue_job("https://example.com/bad.m4a")
+        for _ in range(2):
+            pool.run_job(self.broker.claim(timeout=0))
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.status, good.processed), (AudioFile.DONE, True))
+        self.assertEqual(good.result, {"score": 100.0, "target_word": "rabbit"})
+        self.assertEqual((bad.status, bad.error), (AudioFile.FAILED, "decode failed"))
+        self.assertIsNotNone(bad.finished_at)
+        self.assertEqual(pool.stats()["completed"], 1)
+        self.assertEqual(pool.stats()["failed"], 1)
+
+
+class RequeueTests(TestCase):
+    def test_stale_running_jobs_are_requeued(self):
+        pool = JobWorkerPool(DatabaseBroker(), handler=None, stale_after_s=60)
+        stale = queue_job()
+        AudioFile.objects.filter(id=stale.id).update(status=AudioFile.RUNNING,
+                                                    started_at=timezone.now() - timedelta(minutes=5))
+        fresh = queue_job()
+        AudioFile.objects.filter(id=fresh.id).update(status=AudioFile.RUNNING, started_at=timezone.now())
+        self.assertEqual(pool.requeue(), [stale.id])
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), (AudioFile.QUEUED, None))
+        self.assertEqual(fresh.status, AudioFile.RUNNING)
+
+    def test_local_broker_republishes_queued_jobs_on_start_up(self):
+        broker = LocalBroker()
+        pool = JobWorkerPool(broker, handler=None)
+        job = queue_job()
+        pool.requeue(all_queued=True)
+        self.assertEqual(broker.claim(timeout=0), job.id)
+        # a second copy of the id (published before the restart) is skipped once the job is running
+        broker.publish(job.id)
+        self.assertIsNone(broker.claim(timeout=0))
+
+
+class CallbackAllowedTests(SimpleTestCase):
+    def test_only_allow_listed_http_hosts(self):
+        hosts = ["hooks.example.com"]
+        self.assertTrue(callback_allowed("https://hooks.example.com/audio?x=1", hosts))
+        self.assertTrue(callback_allowed("http://hooks.example.com:8080/audio", hosts))
+        for url in ("http://169.254.169.254/latest/meta-data/", "http://localhost:8000/admin/",
+                    "https://hooks.example.com.evil.test/", "file:///etc/passwd", "ftp://hooks.example.com/",
+                    "not a url"):
+            self.assertFalse(callback_allowed(url, hosts), url)
+        self.assertFalse(callback_allowed("https://hooks.example.com/", []))
+
+
+@override_settings(AUDIO_JOBS={**settings.AUDIO_JOBS, "RUN_IN_WEB": False, "CALLBACK_HOSTS": ["hooks.example.com"]})
+class JobEndpointTests(TestCase):
+    def submit(self, **data):
+        return self.client.post(reverse("submit_audio_job"), {"audio_file": "https://example.com/a.m4a", **data},
+                                content_type="application/json")
+
+    def test_callback_url_must_be_allow_listed(self):
+        response = self.submit(callback_url="http://10.0.0.1:8500/v1/agent/")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AudioFile.objects.exists())
+        response = self.submit(callback_url="https://hooks.example.com/done")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(AudioFile.objects.get().callback_url, "https://hooks.example.com/done")
+
+    def test_status_is_looked_up_by_the_job_token(self):
+        submitted = self.submit(target_word="rabbit").json()
+        job = AudioFile.objects.get()
+        self.assertEqual(submitted["job_id"], str(job.token))
+        status = self.client.get(submitted["status_url"]).json()
+        self.assertEqual(status, {"job_id": str(job.token), "status": AudioFile.QUEUED})
+        # the sequential row id does not find it
+        self.assertEqual(self.client.get(f"/api/audio_jobs/{job.id}/").status_code, 404)
@@ -0,0 +1,42 @@
+import unittest
+from .helpers import tiny_wav2vec2
+
+from audio.model_registry import LoadedModel, ModelRegistry
+
+
+class TinyRegistry(ModelRegistry):
+    """Serves the tiny test model for every "torch" checkpoint."""
+    def _load(self, checkpoint, backend):
+        if backend == "torch":
+            return LoadedModel(checkpoint, *tiny_wav2vec2())
+        return super()._load(checkpoint, backend)
+
+
+class ModelRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.model_bytes = LoadedModel("a", *tiny_wav2vec2()).nbytes
+        # room for one full model at a time
+        self.registry = TinyRegistry(memory_budget_bytes=int(self.model_bytes * 1.5), default_backend="torch")
+
+    def test_truncated_model_is_evicted_with_its_full_model(self):
+        self.registry.get("a", "torch-truncated")
+        self.assertTrue(self.registry.is_warm("a", "torch"))
+        self.registry.get("b", "torch")
+        self.assertFalse(self.registry.is_warm("a", "torch"))
+        self.assertFalse(self.registry.is_warm("a", "torch-truncated"))
+        self.assertEqual(self.registry.resident_bytes(), self.model_bytes)
+
+    def test_using_truncated_model_keeps_its_full_model_recent(self):
+        self.registry.memory_budget_bytes = int(self.model_bytes * 2.5)
+        self.registry.get("a", "torch-truncated")
+        self.registry.get("b", "torch")
+        self.registry.get("a", "torch-truncated")
+        self.registry.get("c", "torch")
+        self.assertTrue(self.registry.is_warm("a", "torch-truncated"))
+        self.assertTrue(self.registry.is_warm("a", "torch"))
+        self.assertFalse(self.registry.is_warm("b", "torch"))
+
+    def test_explicit_eviction_drops_dependents(self):
+        self.registry.get("a", "torch-truncated")
+        self.registry.evict("a", "torch")
+        self.assertEqual(self.registry.status()["models"], [])
@@ -0,0 +1,71 @@
+import random
+import unittest
+from functools import lru_cache
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+from audio.phoneme_alignment import align_phonemes
+from audio.phoneme_similarity import PHONEME_SIMILARITY
+from audio.phonemes import phoneme_bank_split
+
+
+def substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    return float(PHONEME_SIMILARITY.get((a, b), PHONEME_SIMILARITY.get((b, a), 1)))
+
+
+def reference_distance(prediction, correct):
+    """Textbook recursive weighted edit distance over the symbol lists."""
+    @lru_cache(maxsize=None)
+    def d(i, j):
+        if i == 0:
+            return float(j)
+        if j == 0:
+            return float(i)
+        return min(d(i - 1, j - 1) + substitution_cost(prediction[i - 1], correct[j - 1]),
+                   d(i - 1, j) + 1, d(i, j - 1) + 1)
+    return d(len(prediction), len(correct))
+
+
+class WeightedAlignmentTests(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(13)
+        similar = [symbol for pair in PHONEME_SIMILARITY for symbol in pair]
+        symbols = sorted({s for phonemes in phoneme_bank_split.values() for s in phonemes} | set(similar))
+        words = list(phoneme_bank_split.values())
+        self.pairs = []
+        for _ in range(400):
+            correct = list(rng.choice(words))
+            prediction = [rng.choice(similar) if rng.random() < 0.3 else s for s in correct]
+            if rng.random() < 0.5:
+                prediction.insert(rng.randint(0, len(prediction)), rng.choice(symbols))
+            if prediction and rng.random() < 0.5:
+                del prediction[rng.randrange(len(prediction))]
+            self.pairs.append((prediction, correct))
+
+    def test_distance_matches_reference(self):
+        for prediction, correct in self.pairs:
+            alignment = align_phonemes(prediction, correct)
+            self.assertAlmostEqual(alignment.distance, reference_distance(tuple(prediction), tuple(correct)))
+
+    def test_alignment_is_consistent_with_its_distance(self):
+        for prediction, correct in self.pairs:
+            alignment = align_phonemes(prediction, correct)
+            self.assertEqual([p for p in alignment.aligned_prediction if p != "-"], prediction)
+            self.assertEqual([c for c in alignment.aligned_correct if c != "-"], correct)
+            cost = sum(1.0 if "-" in (p, c) else substitution_cost(p, c)
+                       for p, c in zip(alignment.aligned_prediction, alignment.aligned_correct))
+            self.assertAlmostEqual(cost, alignment.distance)
+            for p, c in alignment.substitutions:
+                self.assertNotEqual(p, c)
+
+    def test_similar_substitution_costs_less(self):
+        (a, b), weight = next(iter(PHONEME_SIMILARITY.items()))
+        self.assertEqual(align_phonemes([a], [b]).distance, weight)
+        self.assertEqual(align_phonemes([a], [b]).substitutions, [(a, b)])
+        self.assertEqual(align_phonemes(["ʃ"], ["m"]).distance, 1.0)
+
+    def test_unknown_symbols(self):
+        # symbols the inventory has never seen still compare equal to themselves and unequal to others
+        self.assertEqual(align_phonemes(["q̃"], ["q̃"]).distance, 0.0)
+        self.assertEqual(align_phonemes(["q̃"], ["m"]).distance, 1.0)
@@ -0,0 +1,69 @@
+import random
+import unittest
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+import Levenshtein
+from audio.phoneme_index import PhonemeIndex
+from audio.phoneme_inventory import COMPILED_BANK, INVENTORY
+from audio.phonemes import phoneme_bank_split
+
+
+def linear_top_k(bank_split, phonemes, k):
+    ranked = sorted((Levenshtein.distance(phonemes, entry), order, word)
+                    for order, (word, entry) in enumerate(bank_split.items()))
+    return [(word, distance) for distance, _, word in ranked[:k]]
+
+
+def random_predictions(count, seed):
+    """Bank words with random substitutions, insertions and deletions, plus unrelated sequences."""
+    rng = random.Random(seed)
+    symbols = sorted({symbol for phonemes in phoneme_bank_split.values() for symbol in phonemes}) + ["ʔ", "ɾ"]
+    words = list(phoneme_bank_split)
+    predictions = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            predictions.append([rng.choice(symbols) for _ in range(rng.randint(0, 9))])
+            continue
+        phonemes = list(phoneme_bank_split[rng.choice(words)])
+        for _ in range(rng.randint(0, 3)):
+            edit = rng.randrange(3)
+            position = rng.randint(0, len(phonemes))
+            if edit == 0 and position < len(phonemes):
+                phonemes[position] = rng.choice(symbols)
+            elif edit == 1:
+                phonemes.insert(position, rng.choice(symbols))
+            elif phonemes and position < len(phonemes):
+                del phonemes[position]
+        predictions.append(phonemes)
+    return predictions
+
+
+class PhonemeIndexTests(unittest.TestCase):
+    def test_nearest_matches_linear_scan(self):
+        index = PhonemeIndex(phoneme_bank_split)
+        for phonemes in random_predictions(500, seed=1):
+            self.assertEqual(index.nearest(phonemes), linear_top_k(phoneme_bank_split, phonemes, 1)[0])
+
+    def test_top_k_matches_linear_scan(self):
+        index = PhonemeIndex(phoneme_bank_split)
+        for k in (1, 3, 10):
+            for phonemes in random_predictions(200, seed=k):
+                self.assertEqual(index.top_k(phonemes, k), linear_top_k(phoneme_bank_split, phonemes, k))
+
+    def test_interned_index_matches_symbol_index(self):
+        by_symbol = PhonemeIndex(phoneme_bank_split)
+        by_id = PhonemeIndex.from_compiled(COMPILED_BANK)
+        for phonemes in random_predictions(300, seed=4):
+            self.assertEqual(by_id.top_k(INVENTORY.encode(phonemes).tolist(), 3), by_symbol.top_k(phonemes, 3))
+
+    def test_array_round_trip_keeps_results(self):
+        index = PhonemeIndex.from_compiled(COMPILED_BANK)
+        rebuilt = PhonemeIndex.from_arrays(COMPILED_BANK.words, COMPILED_BANK.entries, *index.to_arrays())
+        self.assertEqual(len(rebuilt), len(index))
+        for phonemes in random_predictions(300, seed=5):
+            ids = INVENTORY.encode(phonemes).tolist()
+            self.assertEqual(rebuilt.top_k(ids, 3), index.top_k(ids, 3))
+
+    def test_empty_index(self):
+        self.assertEqual(PhonemeIndex({}).nearest(["a"]), (None, float("inf")))
+        self.assertEqual(PhonemeIndex({}).top_k(["a"], 3), [])
@@ -0,0 +1,42 @@
+import unittest
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+import numpy as np
+from audio.phoneme_inventory import COMPILED_BANK, INVENTORY, UNKNOWN_ID, CompiledBank, PhonemeInventory
+from audio.phoneme_similarity import PHONEME_SIMILARITY
+from audio.phonemes import phoneme_bank_split
+
+
+class PhonemeInventoryTests(unittest.TestCase):
+    def test_encode_decode_round_trip(self):
+        inventory = PhonemeInventory(["ɹ", "æ", "b"])
+        ids = inventory.encode(["b", "æ", "ɹ", "b"])
+        self.assertEqual(ids.dtype, np.uint16)
+        self.assertEqual(inventory.decode(ids.tolist()), ["b", "æ", "ɹ", "b"])
+        self.assertEqual(inventory.encode(["ɹ", "x"]).tolist(), [inventory.ids["ɹ"], UNKNOWN_ID])
+
+    def test_cost_matrix_follows_the_similarity_table(self):
+        costs = INVENTORY.cost_matrix
+        np.testing.assert_array_equal(costs, costs.T)
+        self.assertEqual(costs[UNKNOWN_ID, UNKNOWN_ID], 1.0)
+        for (a, b), weight in PHONEME_SIMILARITY.items():
+            self.assertEqual(costs[INVENTORY.ids[a], INVENTORY.ids[b]], weight)
+        for symbol, id_ in INVENTORY.ids.items():
+            self.assertEqual(costs[id_, id_], 0.0)
+
+
+class CompiledBankTests(unittest.TestCase):
+    def test_entries_match_the_split_bank(self):
+        self.assertEqual(COMPILED_BANK.words, list(phoneme_bank_split))
+        for word, phonemes in phoneme_bank_split.items():
+            i = COMPILED_BANK.word_ids[word]
+            self.assertEqual(INVENTORY.decode(COMPILED_BANK.ids_for(word).tolist()), list(phonemes))
+            self.assertEqual(list(COMPILED_BANK.entries[i]), COMPILED_BANK.ids_for(word).tolist())
+
+    def test_padded_matrix(self):
+        bank = CompiledBank.from_split({"a": ["x", "y"], "b": ["y"], "c": []}, PhonemeInventory())
+        matrix, lengths = bank.padded()
+        self.assertEqual(lengths.tolist(), [2, 1, 0])
+        self.assertEqual(matrix.shape, (3, 2))
+        self.assertEqual(matrix[1, 1], UNKNOWN_ID)
+        self.assertEqual(bank.inventory.decode(matrix[0].tolist()), ["x", "y"])
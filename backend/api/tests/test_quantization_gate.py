@@ -0,0 +1,33 @@
+import unittest
+from . import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+from audio.quantization_gate import gate_reasons, phoneme_error_rate
+
+
+def recording(path, per=0.0, score_drift=0.0):
+    return {"path": path, "per": per, "score_drift": score_drift}
+
+
+class GateReasonsTests(unittest.TestCase):
+    def test_passes_within_limits(self):
+        files = [recording(f"{i}.wav", per=0.02, score_drift=2.0) for i in range(10)]
+        self.assertEqual(gate_reasons(files), [])
+
+    def test_one_broken_recording_fails_despite_good_means(self):
+        files = [recording(f"{i}.wav") for i in range(20)] + [recording("bad.wav", per=0.6, score_drift=40.0)]
+        # means: PER 0.029, drift 1.9, both under the mean limits
+        reasons = gate_reasons(files)
+        self.assertEqual(len(reasons), 2)
+        self.assertTrue(all(reason.startswith("bad.wav") for reason in reasons))
+
+    def test_mean_limits(self):
+        files = [recording(f"{i}.wav", per=0.1, score_drift=6.0) for i in range(5)]
+        self.assertEqual([reason.split()[0] for reason in gate_reasons(files)], ["mean", "mean"])
+
+    def test_no_recordings_fails(self):
+        self.assertEqual(gate_reasons([]), ["no recordings found"])
+
+    def test_phoneme_error_rate(self):
+        self.assertEqual(phoneme_error_rate("ɹ æ b ɪ t", "ɹ æ b ɪ t"), 0.0)
+        self.assertEqual(phoneme_error_rate("ɹ æ b ɪ t", "w æ b ɪ"), 0.4)
+        self.assertEqual(phoneme_error_rate("", "k"), 1.0)
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import json
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from api import realtime
+from api.admission import AdmissionController
+from audio import streaming
+from .test_streaming import s16le, utterance
+
+STREAMING = {"WINDOW_S": 4.0, "PARTIAL_EVERY_S": 0.1, "END_SILENCE_MS": 400, "MAX_UTTERANCE_S": 15.0,
+             "MAX_CONNECTIONS": 4}
+
+
+def run_session(messages):
+    """Drives recognize() with the given client messages; returns what the server sent."""
+    incoming = [{"type": "websocket.connect"}] + messages
+    sent = []
+
+    async def receive():
+        # let the partials running in threads make progress between frames
+        await asyncio.sleep(0.001)
+        return incoming.pop(0) if incoming else {"type": "websocket.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "websocket", "path": realtime.RECOGNIZE_PATH, "client": ("10.0.0.5", 5000), "headers": []}
+    asyncio.run(realtime.recognize(scope, receive, send))
+    return sent
+
+
+def utterance_messages(target_word="rabbit", frame_bytes=641):
+    data = s16le(utterance())
+    # odd-sized frames split samples between messages
+    frames = [{"type": "websocket.receive", "bytes": data[i:i + frame_bytes]} for i in range(0, len(data), frame_bytes)]
+    start = {"type": "start", "target_word": target_word, "sample_rate": 16000, "format": "s16le"}
+    return [{"type": "websocket.receive", "text": json.dumps(start)}] + frames
+
+
+def texts(sent):
+    return [json.loads(m["text"]) for m in sent if m["type"] == "websocket.send"]
+
+
+@override_settings(AUDIO_STREAMING=STREAMING)
+class RecognizeTests(SimpleTestCase):
+    def setUp(self):
+        self.inference = mock.Mock()
+        self.inference.score_and_feedback.return_value = {"score": 100.0, "feedback": []}
+        patches = [
+            mock.patch.object(realtime, "get_inference", lambda: self.inference),
+            mock.patch.object(streaming, "StreamingRecognizer",
+                              functools.partial(streaming.StreamingRecognizer, backend="stub")),
+            mock.patch("api.views.admission", AdmissionController(max_concurrent=2)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_final_result_after_endpoint(self):
+        messages = texts(run_session(utterance_messages()))
+        final = messages[-1]
+        self.assertEqual(final["type"], "final")
+        self.assertEqual(final["score"], 100.0)
+        self.assertTrue(all(m["type"] == "partial" for m in messages[:-1]))
+        self.assertEqual(self.inference.score_and_feedback.call_args.args[2], "rabbit")
+
+    def test_partials_skipped_when_scoring_is_at_capacity(self):
+        admission = AdmissionController(max_concurrent=1, max_queue=0)
+        # another request holds the only slot for the whole session
+        with mock.patch("api.views.admission", admission), admission.admit("ip:10.0.0.9"):
+            messages = texts(run_session(utterance_messages()))
+        self.assertNotIn("partial", [m["type"] for m in messages])
+        self.assertEqual(messages[-1]["error"], "Server is busy, please retry later")
+
+    def test_connections_over_the_cap_are_turned_away(self):
+        with override_settings(AUDIO_STREAMING={**STREAMING, "MAX_CONNECTIONS": 0}):
+            sent = run_session(utterance_messages())
+        self.assertEqual(sent[-1], {"type": "websocket.close", "code": 1013})
+        self.assertEqual(texts(sent), [{"type": "error", "error": "Server is busy, please retry later"}])
+        self.assertEqual(realtime._connections, 0)
+
+    def test_bad_sample_rate_is_refused(self):
+        for sample_rate in (8000, "16k", None, [16000], {"hz": 16000}):
+            start = {"type": "start", "target_word": "rabbit", "sample_rate": sample_rate}
+            sent = run_session([{"type": "websocket.receive", "text": json.dumps(start)}])
+            self.assertEqual(sent[-1], {"type": "websocket.close", "code": 1003}, sample_rate)
+            self.assertEqual(texts(sent), [{"type": "error", "error": "Audio must be 16 kHz mono PCM"}])
+        self.assertEqual(realtime._connections, 0)
+
+    def test_control_messages_that_are_not_objects(self):
+        messages = [{"type": "websocket.receive", "text": json.dumps([1, 2])}] + utterance_messages()
+        received = texts(run_session(messages))
+        self.assertEqual(received[0], {"type": "error", "error": "Expected a start message, PCM frames or end"})
+        self.assertEqual(received[-1]["type"], "final")
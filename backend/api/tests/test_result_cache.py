@@ -0,0 +1,63 @@
+import threading
+import unittest
+from unittest import mock
+from .helpers import noise
+
+from audio.result_cache import MemoryBackend, ResultCache, audio_cache_key
+
+
+class AudioCacheKeyTests(unittest.TestCase):
+    def test_key_depends_on_audio_checkpoint_and_backend(self):
+        clip = noise(0.5, 1)
+        key = audio_cache_key(clip, "ckpt", "torch")
+        self.assertEqual(key, audio_cache_key(clip.copy(), "ckpt", "torch"))
+        self.assertNotEqual(key, audio_cache_key(clip, "ckpt", "torch-int8"))
+        self.assertNotEqual(key, audio_cache_key(clip, "ckpt", "onnx"))
+        self.assertNotEqual(key, audio_cache_key(clip, "other", "torch"))
+        self.assertNotEqual(key, audio_cache_key(noise(0.5, 2), "ckpt", "torch"))
+
+
+class ResultCacheTests(unittest.TestCase):
+    def test_url_alias_resolves_to_the_content_entry(self):
+        cache = ResultCache(MemoryBackend(), store_logits=True)
+        key = audio_cache_key(noise(0.2, 3), "ckpt", "torch")
+        cache.set(key, "ɹ æ b ɪ t", logits=[[0.0]])
+        cache.alias_url("https://example.com/a.m4a", key)
+        self.assertEqual(cache.get_for_url("https://example.com/a.m4a"), {"prediction": "ɹ æ b ɪ t", "logits": [[0.0]]})
+        self.assertIsNone(cache.get_for_url("https://example.com/b.m4a"))
+
+    def test_target_word_entries_keep_logits(self):
+        cache = ResultCache(MemoryBackend(), store_logits=False)
+        key = audio_cache_key(noise(0.2, 4), "ckpt", "torch")
+        cache.set(key, "ɹ æ b ɪ t", logits=[[0.0]])
+        self.assertEqual(cache.get(key), {"prediction": "ɹ æ b ɪ t"})
+        # a retry with a target word must not reuse an entry it cannot score from
+        self.assertIsNone(cache.get(key, need_logits=True))
+        cache.set(key, "ɹ æ b ɪ t", logits=[[0.0]], keep_logits=True)
+        self.assertEqual(cache.get(key, need_logits=True)["logits"], [[0.0]])
+        cache.alias_url("https://example.com/a.m4a", key)
+        self.assertIsNotNone(cache.get_for_url("https://example.com/a.m4a", need_logits=True))
+
+    def test_url_alias_expires(self):
+        cache = ResultCache(MemoryBackend(), url_ttl=60)
+        key = audio_cache_key(noise(0.2, 5), "ckpt", "torch")
+        cache.set(key, "k æ t")
+        with mock.patch("audio.result_cache.time.time", return_value=1000.0):
+            cache.alias_url("https://example.com/a.m4a", key)
+        with mock.patch("audio.result_cache.time.time", return_value=1059.0):
+            self.assertEqual(cache.get_for_url("https://example.com/a.m4a"), {"prediction": "k æ t"})
+        # the object at the URL may have been replaced since; the content entry itself stays
+        with mock.patch("audio.result_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get_for_url("https://example.com/a.m4a"))
+        self.assertIsNotNone(cache.get(key))
+
+    def test_counters_are_thread_safe(self):
+        cache = ResultCache(MemoryBackend())
+        cache.set("present", "k æ t")
+        threads = [threading.Thread(target=lambda: [cache.get(k) for k in ("present", "absent") * 2000])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.stats(), {"hits": 16000, "misses": 16000, "hit_rate": 0.5})
@@ -0,0 +1,66 @@
+import unittest
+from .helpers import noise
+
+import numpy as np
+from audio.streaming import StreamingRecognizer
+
+
+def s16le(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def utterance():
+    """Quiet lead-in, half a second of "speech", then a quiet tail."""
+    return np.concatenate([noise(0.5, 1, scale=0.001), noise(0.5, 2, scale=0.3), noise(1.0, 3, scale=0.001)])
+
+
+class StreamingRecognizerTests(unittest.TestCase):
+    def test_frames_split_mid_sample(self):
+        for sample_format, to_bytes in (("s16le", s16le), ("f32le", lambda a: a.astype("<f4").tobytes())):
+            clip = noise(0.3, 4)
+            data = to_bytes(clip)
+            recognizer = StreamingRecognizer(backend="stub", sample_format=sample_format)
+            for i in range(0, len(data), 333):
+                recognizer.feed(data[i:i + 333])
+            expected = np.frombuffer(s16le(clip), "<i2") / 32768.0 if sample_format == "s16le" else clip
+            np.testing.assert_allclose(recognizer.audio(), expected.astype(np.float32))
+            self.assertAlmostEqual(recognizer.duration_s, 0.3)
+
+    def test_endpoint_after_trailing_silence(self):
+        recognizer = StreamingRecognizer(backend="stub", end_silence_ms=400)
+        data, frame = s16le(utterance()), 640  # 20 ms
+        ended_at = None
+        for i in range(0, len(data), frame):
+            if recognizer.feed(data[i:i + frame]):
+                ended_at = recognizer.duration_s
+                break
+        self.assertTrue(recognizer.speech_started)
+        # speech stops at 1.0 s; the endpoint follows about end_silence_ms later
+        self.assertIsNotNone(ended_at)
+        self.assertGreaterEqual(ended_at, 1.4)
+        self.assertLess(ended_at, 1.6)
+
+    def test_no_endpoint_without_speech(self):
+        recognizer = StreamingRecognizer(backend="stub")
+        self.assertFalse(recognizer.feed(s16le(noise(1.0, 5, scale=0.001))))
+        self.assertFalse(recognizer.speech_started)
+        self.assertFalse(recognizer.partial_due())
+
+    def test_max_utterance_ends_stream(self):
+        recognizer = StreamingRecognizer(backend="stub", max_utterance_s=1.0)
+        self.assertFalse(recognizer.feed(s16le(noise(0.6, 6))))
+        self.assertTrue(recognizer.feed(s16le(noise(0.6, 7))))
+
+    def test_partials_and_final_result(self):
+        recognizer = StreamingRecognizer(backend="stub", partial_every_s=0.3)
+        recognizer.feed(s16le(utterance()[:16000]))
+        self.assertTrue(recognizer.partial_due())
+        self.assertIsInstance(recognizer.partial(), str)
+        self.assertFalse(recognizer.partial_due())
+        recognizer.feed(s16le(noise(0.3, 8, scale=0.3)))
+        self.assertTrue(recognizer.partial_due())
+        recognizer.skip_partial()
+        self.assertFalse(recognizer.partial_due())
+        prediction, logits = recognizer.finish()
+        self.assertIsInstance(prediction, str)
+        self.assertEqual(logits.ndim, 2)
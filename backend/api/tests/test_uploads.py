@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+from django.core.files.uploadhandler import StopUpload
+from api.uploads import StreamingDecodeUploadHandler, UploadSpool, UploadTooLarge
+
+
+def joined(chunks):
+    """Stands in for decode_audio_stream: consumes the chunks like the decoder does."""
+    return b"".join(chunks)
+
+
+class UploadSpoolTests(unittest.TestCase):
+    def test_spool_round_trip_and_cap(self):
+        spool = UploadSpool(max_bytes=10)
+        spool.write(b"12345")
+        spool.write(b"678")
+        uploaded = spool.uploaded_file("a.m4a", "audio/mp4")
+        self.assertEqual((uploaded.name, uploaded.size, uploaded.read()), ("a.m4a", 8, b"12345678"))
+        with self.assertRaises(UploadTooLarge):
+            spool.write(b"901")
+
+
+@mock.patch("api.uploads.decode_audio_stream", joined)
+class StreamingDecodeUploadHandlerTests(unittest.TestCase):
+    def start(self, handler):
+        handler.new_file("audio", "a.m4a", "audio/mp4", None)
+
+    def test_decodes_chunks_as_they_arrive(self):
+        handler = StreamingDecodeUploadHandler(max_bytes=1024)
+        self.start(handler)
+        for i in range(3):
+            self.assertIsNone(handler.receive_data_chunk(bytes([i]) * 10, i * 10))
+        uploaded = handler.file_complete(30)
+        handler.abort()
+        self.assertEqual(handler.result(timeout=5), b"\0" * 10 + b"\1" * 10 + b"\2" * 10)
+        self.assertIs(handler.file, uploaded)
+        self.assertEqual(uploaded.read(), handler.result())
+
+    def test_abort_stops_decoder_when_parser_fails(self):
+        handler = StreamingDecodeUploadHandler(max_bytes=1024)
+        self.start(handler)
+        handler.receive_data_chunk(b"x" * 10, 0)
+        # e.g. the multipart parser raised before file_complete
+        handler.abort()
+        with self.assertRaises(ConnectionError):
+            handler.result(timeout=5)
+        self.assertFalse(handler._thread.is_alive())
+
+    def test_decoder_gives_up_when_chunks_stop(self):
+        handler = StreamingDecodeUploadHandler(max_bytes=1024)
+        handler.idle_timeout_s = 0.05
+        self.start(handler)
+        with self.assertRaises(ConnectionError):
+            handler.result(timeout=5)
+
+    def test_too_large_upload_is_reported(self):
+        handler = StreamingDecodeUploadHandler(max_bytes=15)
+        self.start(handler)
+        handler.receive_data_chunk(b"x" * 10, 0)
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b"x" * 10, 10)
+        with self.assertRaises(UploadTooLarge):
+            handler.result(timeout=5)
+
+    def test_other_fields_pass_through(self):
+        handler = StreamingDecodeUploadHandler()
+        handler.new_file("photo", "p.png", "image/png", None)
+        self.assertEqual(handler.receive_data_chunk(b"png", 0), b"png")
+        with self.assertRaises(ValueError):
+            handler.result()
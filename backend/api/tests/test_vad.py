@@ -0,0 +1,47 @@
+import unittest
+from .helpers import noise
+
+import numpy as np
+from audio.vad import PAD_MS, trim_silence
+
+SR = 16000
+FRAME = SR * 20 // 1000
+PAD = SR * PAD_MS // 1000
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+class TrimSilenceTests(unittest.TestCase):
+    def assertTrimmed(self, clip, leading, trailing):
+        trimmed, got_leading, got_trailing = trim_silence(clip, SR)
+        self.assertEqual((got_leading, got_trailing), (leading, trailing))
+        self.assertEqual(len(trimmed), len(clip) - leading - trailing)
+        # a view into the input, not a copy
+        self.assertTrue(len(trimmed) == 0 or np.shares_memory(trimmed, clip))
+        np.testing.assert_array_equal(trimmed, clip[leading:len(clip) - trailing])
+
+    def test_leading_and_trailing_silence_keep_padding(self):
+        clip = np.concatenate([silence(0.5), noise(0.5, 1), silence(0.5)])
+        speech_start, speech_end = int(0.5 * SR), int(1.0 * SR)
+        self.assertTrimmed(clip, speech_start - PAD, len(clip) - speech_end - PAD)
+
+    def test_padding_stops_at_the_clip_edges(self):
+        clip = np.concatenate([silence(0.04), noise(0.5, 2), silence(0.06)])
+        self.assertTrimmed(clip, 0, 0)
+        clip = np.concatenate([noise(0.5, 3), silence(0.5)])
+        self.assertTrimmed(clip, 0, len(clip) - int(0.5 * SR) - PAD)
+
+    def test_all_silence_is_returned_whole(self):
+        self.assertTrimmed(silence(1.0), 0, 0)
+        self.assertTrimmed(noise(1.0, 4, scale=1e-4), 0, 0)
+
+    def test_no_silence_is_returned_whole(self):
+        self.assertTrimmed(noise(1.0, 5), 0, 0)
+
+    def test_clip_shorter_than_a_frame(self):
+        for clip in (np.zeros(0, dtype=np.float32), noise(0.005, 6), noise(FRAME * 1.5 / SR, 7)):
+            trimmed, leading, trailing = trim_silence(clip, SR)
+            self.assertIs(trimmed, clip)
+            self.assertEqual((leading, trailing), (0, 0))
@@ -0,0 +1,17 @@
+from django.test import TestCase
+from api.models import WordBankEntry
+from api.word_bank import import_words
+
+
+class ImportWordsTests(TestCase):
+    def test_duplicates_after_normalizing_are_written_once(self):
+        written = import_words({"Carrot": "k æ ɹ ə t", "carrot ": "k ˈæ ɹ ə t", "rope": "ɹ  oʊ p"})
+        self.assertEqual(written, 2)
+        # the last spelling wins, as with a dict
+        self.assertEqual(dict(WordBankEntry.objects.values_list("word", "ipa")),
+                         {"carrot": "k ˈæ ɹ ə t", "rope": "ɹ oʊ p"})
+
+    def test_reimport_updates_existing_rows(self):
+        import_words({"rope": "ɹ oʊ p"})
+        import_words({"ROPE": "ɹ ˈoʊ p"})
+        self.assertEqual(list(WordBankEntry.objects.values_list("word", "ipa")), [("rope", "ɹ ˈoʊ p")])
@@ -0,0 +1,173 @@
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import close_old_connections
+from .models import AudioFile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from audio.audio_ingest import decode_audio_stream
+
+logger = logging.getLogger(__name__)
+
+# uploads are kept in memory up to this size while they are being decoded, then spill to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadSpool:
+    """Keeps a copy of the upload for archiving while it is decoded."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Recording is larger than {self.max_bytes} bytes")
+        self.file.write(chunk)
+
+    def uploaded_file(self, name, content_type=None):
+        self.file.seek(0)
+        return UploadedFile(self.file, name=name, content_type=content_type, size=self.size)
+
+
+class StreamingDecodeUploadHandler(FileUploadHandler):
+    """Multipart upload handler that decodes the `audio` field while it is still arriving.
+
+    Each chunk Django's multipart parser hands over is queued to a thread running
+    decode_audio_stream (and spooled for archiving), so ffmpeg works through the
+    recording as the client sends it. result() waits for the decoded array.
+
+    Whoever drives the parser must call abort() once it returns or raises: the
+    decoder only stops waiting for chunks on file_complete, an interruption or abort.
+    """
+    chunk_size = 64 * 1024
+    # the decoder gives up if no chunk arrives for this long
+    idle_timeout_s = 60.0
+
+    def __init__(self, request=None, field_name="audio", max_bytes=25 * 1024 * 1024):
+        super().__init__(request)
+        self.target_field = field_name
+        self.max_bytes = max_bytes
+        self.active = False
+        self.spool = None
+        self.file = None
+        self._queue = queue.Queue(maxsize=64)
+        self._done = threading.Event()
+        self._audio = None
+        self._error = None
+        self._thread = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.target_field or self.active:
+            return
+        self.active = True
+        self.spool = UploadSpool(self.max_bytes)
+        self._thread = threading.Thread(target=self._decode, name="upload-decode", daemon=True)
+        self._thread.start()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active or self.field_name != self.target_field:
+            return raw_data
+        try:
+            self.spool.write(raw_data)
+        except UploadTooLarge as e:
+            self._put(e)
+            raise StopUpload(connection_reset=True)
+        self._put(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active or self.field_name != self.target_field:
+            return None
+        self._put(None)
+        self.file = self.spool.uploaded_file(self.file_name, self.content_type)
+        return self.file
+
+    def upload_interrupted(self):
+        if self.active:
+            self._put(ConnectionError("Upload interrupted"))
+
+    def abort(self):
+        """Ends the decode if the file never completed (a no-op once it has)."""
+        if self.active and self.file is None:
+            self._put(ConnectionError("Upload ended before the recording was complete"))
+
+    def result(self, timeout=None):
+        """The decoded recording; raises whatever stopped the upload or the decode."""
+        if self._thread is None:
+            raise ValueError(f"No '{self.target_field}' file in the upload")
+        self._thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._audio
+
+    def _put(self, item):
+        # once the decoder has stopped (e.g. ffmpeg rejected the data) nothing drains the queue
+        while not self._done.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _chunks(self):
+        while True:
+            try:
+                chunk = self._queue.get(timeout=self.idle_timeout_s)
+            except queue.Empty:
+                raise ConnectionError(f"No upload data for {self.idle_timeout_s:.0f} s")
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def _decode(self):
+        try:
+            self._audio = decode_audio_stream(self._chunks())
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+
+def iter_body(request, spool, chunk_size=64 * 1024):
+    """Reads a raw (e.g. chunked) request body piece by piece, spooling it for archiving."""
+    while True:
+        chunk = request.read(chunk_size)
+        if not chunk:
+            return
+        spool.write(chunk)
+        yield chunk
+
+
+# archiving runs after the response, one upload at a time
+_archiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-archive")
+
+
+def archive_recording(uploaded_file, user, result):
+    """Saves an uploaded recording and its result as an AudioFile in the background."""
+    def save():
+        try:
+            audio = AudioFile(user=user, result=result, processed=True, status=AudioFile.DONE)
+            audio.file.save(uploaded_file.name or "recording", uploaded_file, save=False)
+            audio.save()
+        except Exception as e:
+            logger.error(f"Archiving uploaded recording failed: {e}")
+        finally:
+            uploaded_file.close()
+            close_old_connections()
+    return _archiver.submit(save)
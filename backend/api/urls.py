@@ -5,6 +5,7 @@ from .views import CustomTokenObtainPairView, PatientCreateView, PatientDetailVi
 
 urlpatterns = [
     # path('upload/', AudioFileUploadView.as_view(), name='audio-file-upload'),
+    path('upload_audio/', views.upload_audio, name='upload_audio'),  # recording in the request body instead of a storage URL
     path('patients/create/', PatientCreateView.as_view(), name='patient-create'),  # for creating a patient
     path('patients/', PatientListView.as_view(), name='patient-list'),  # for viewing the patient list (GET)
     path('patients/<int:pk>/', PatientDetailView.as_view(), name='patient-detail'),  # for retrieving individual patient info
@@ -16,4 +17,8 @@ urlpatterns = [
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('submit_audio/', views.submit_audio, name='submit_audio'),
+    path('audio_jobs/', views.submit_audio_job, name='submit_audio_job'),
+    path('audio_jobs/<uuid:job_id>/', views.audio_job_status, name='audio_job_status'),
+    path('model_status/', views.model_status, name='model_status'),
+    path('inference_stats/', views.inference_stats, name='inference_stats'),
 ]
@@ -1,11 +1,18 @@
 import sys
 import os
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .serializers import AudioFileSerializer, PatientSerializer, ScoreSerializer, UserRegistrationSerializer, UserLoginSerializer, CustomTokenObtainPairSerializer
 from .models import AudioFile, Patient, Score
+from .jobs import JobWorkerPool, build_broker, callback_allowed, job_payload
+from .admission import AdmissionController, Overloaded, client_address
+from .inference import SubmissionError, get_inference, inference_loaded
+from .uploads import StreamingDecodeUploadHandler, UploadSpool, UploadTooLarge, archive_recording, iter_body
 from rest_framework import generics
 from rest_framework.generics import ListAPIView
 from django.contrib.auth import authenticate
@@ -18,16 +25,17 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.http import JsonResponse
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.core.files import File
+from django.conf import settings
 import requests
-import tempfile
 import logging
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from audio.phoneme_extraction import extract_phonemes, convert_mov_to_wav  # Import the phoneme extraction function
-from audio.phonemes import phoneme_bank_split
-from audio.audio_scoring import get_score  # Import the scoring function
-from audio.audio_feedback import generate_feedback_for_target
+# the model pipeline (download, inference, scoring, feedback) is in api.inference_service and is
+# only imported by get_inference() on the first audio request; nothing here may import torch
+from audio.audio_ingest import AudioDecodeError, decode_audio_stream
+from audio.bank_store import bank_store
+from audio.process_memory import mapped_file_usage, memory_usage
 
 
 
@@ -94,6 +102,28 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 logger = logging.getLogger(__name__)
+
+# bounds concurrent scoring in this process; beyond the wait queue, requests get a fast 429
+admission = AdmissionController(
+    max_concurrent=settings.AUDIO_ADMISSION['MAX_CONCURRENT'],
+    max_queue=settings.AUDIO_ADMISSION['MAX_QUEUE'],
+    max_queue_per_user=settings.AUDIO_ADMISSION['MAX_QUEUE_PER_USER'],
+    queue_timeout_s=settings.AUDIO_ADMISSION['QUEUE_TIMEOUT_S'],
+)
+
+def client_key(request):
+    """Who a request counts against for fairness: the user if logged in, otherwise the client address."""
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return "ip:" + client_address(request.META.get('REMOTE_ADDR'), request.META.get('HTTP_X_FORWARDED_FOR'),
+                                  settings.AUDIO_ADMISSION['TRUSTED_PROXIES'])
+
+def too_busy(retry_after, reason):
+    response = Response({'error': 'Server is busy, please retry later', 'reason': reason},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
+
 # uploading audio
 @api_view(['POST'])
 @authentication_classes([])  # Disable authentication for now
@@ -104,60 +134,150 @@ def submit_audio(request):
     """
     # Expecting the download URL from the frontend
     uri = request.data.get('audio_file')
+    # the word the exercise asked for; without it the closest bank word is assumed
+    target_word = request.data.get('target_word')
     if not uri:
         logger.error("No audio URL provided")
         return Response({'error': 'No audio URL provided'}, status=400)
 
     try:
-        # Step 1: Download the .mov file from the Firebase URL
-        logger.debug(f"Downloading audio from URL: {uri}")
-        response = requests.get(uri)
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch audio from URL: {uri}")
-            return Response({'error': 'Failed to fetch audio from URL'}, status=400)
-
-        # Step 2: Create temporary files for .mov and .wav
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mov') as tmp_mov_file:
-            tmp_mov_file.write(response.content)
-            tmp_mov_path = tmp_mov_file.name
-
-        logger.debug(f"Temporary .mov file saved at: {tmp_mov_path}")
+        with admission.admit(client_key(request)):
+            return Response(get_inference().process_submission(uri, target_word))
+    except Overloaded as e:
+        logger.warning(f"Rejected submission ({e.reason}), retry after {e.retry_after}s")
+        return too_busy(e.retry_after, e.reason)
+    except SubmissionError as e:
+        return Response({'error': str(e)}, status=e.status)
+    except Exception as e:
+        logger.error(f"Error during audio submission: {e}")
+        return Response({'error': f'Error: {str(e)}'}, status=500)
 
-        tmp_wav_path = tempfile.mktemp(suffix='.wav')
+# recording sent in the request body instead of by URL: decoding starts while it is still arriving
+@csrf_exempt
+@require_POST
+def upload_audio(request):
+    """
+    Scores a recording uploaded directly, either as the `audio` field of a multipart form
+    (with an optional `target_word` field) or as a raw, possibly chunked, request body
+    (target_word in the query string). Set archive=1 to keep the recording as an AudioFile,
+    saved in the background after the response.
+    """
+    max_bytes = settings.AUDIO_UPLOAD['MAX_BYTES']
+    spool, archived = None, False
+    try:
         try:
-            logger.debug(f"Converting .mov to .wav")
-            tmp_wav_path = convert_mov_to_wav(tmp_mov_path)
-        except Exception as e:
-            logger.error(f"Error during .mov to .wav conversion: {e}")
-            return Response({'error': f'Error during .mov to .wav conversion: {str(e)}'}, status=500)
+            if request.content_type == 'multipart/form-data':
+                handler = StreamingDecodeUploadHandler(request, field_name='audio', max_bytes=max_bytes)
+                # must be in place before the body is parsed
+                request.upload_handlers = [handler] + list(request.upload_handlers)
+                try:
+                    target_word = request.POST.get('target_word')
+                    archive = request.POST.get('archive', request.GET.get('archive')) == '1'
+                finally:
+                    # however the parser stopped, the decoder must not keep waiting for chunks
+                    handler.abort()
+                audio_array = handler.result()
+                uploaded = handler.file
+                if archive and uploaded is not None:
+                    # the archiver closes it after the response; out of request.FILES, so
+                    # request.close() cannot close it while it is being saved
+                    request.FILES.pop('audio', None)
+            else:
+                target_word = request.GET.get('target_word')
+                archive = request.GET.get('archive') == '1'
+                spool = UploadSpool(max_bytes)
+                audio_array = decode_audio_stream(iter_body(request, spool))
+                uploaded = spool.uploaded_file('recording', request.content_type)
 
-        # Step 3: Process the .wav file (phoneme extraction, scoring, feedback)
-        try:
-            logger.debug("Processing the .wav file")
-            with open(tmp_wav_path, 'rb') as wav_file:
-                phoneme_results = extract_phonemes(wav_file)
-                logger.debug("Phoneme extraction successful")
-                score, extra_phonemes, missing_phonemes = get_score(phoneme_results)
-                feedback = []
-                for extra, target in zip(extra_phonemes, missing_phonemes):
-                    generate_feedback_for_target(extra, target, feedback)
-                logger.debug(f"Feedback generated: {feedback}")
+            # admitted only once the recording is in: a slow uploader must not hold a scoring slot
+            with admission.admit(client_key(request)):
+                service = get_inference()
+                phoneme_results, logits, _ = service.extract_from_audio(audio_array, target_word)
+                body = service.score_and_feedback(phoneme_results, logits, target_word)
+        except Overloaded as e:
+            response = JsonResponse({'error': 'Server is busy, please retry later', 'reason': e.reason}, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        except UploadTooLarge as e:
+            return JsonResponse({'error': str(e)}, status=413)
+        except AudioDecodeError as e:
+            logger.error(f"Error during audio decoding: {e}")
+            return JsonResponse({'error': f'Error during audio decoding: {str(e)}'}, status=500)
+        except SubmissionError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
         except Exception as e:
-            logger.error(f"Error during audio processing: {e}")
-            return Response({'error': f'Error during audio processing: {str(e)}'}, status=500)
-        finally:
-            # Cleanup temp files safely
-            if os.path.exists(tmp_mov_path):
-                os.remove(tmp_mov_path)
-            if os.path.exists(tmp_wav_path):
-                os.remove(tmp_wav_path)
-
-        # Step 4: Return feedback and score
-        return Response({'score': score, 'feedback': feedback})
+            logger.error(f"Error during audio upload: {e}")
+            return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
 
-    except Exception as e:
-        logger.error(f"Error during audio submission: {e}")
-        return Response({'error': f'Error: {str(e)}'}, status=500)
+        if archive and uploaded is not None:
+            user = request.user if request.user.is_authenticated else None
+            archive_recording(uploaded, user, body)
+            archived = True
+        return JsonResponse(body)
+    finally:
+        # the raw body's spool is not in request.FILES, so nothing else closes it unless it was archived
+        if spool is not None and not archived:
+            spool.file.close()
+
+def run_submission(uri, target_word=None):
+    return get_inference().process_submission(uri, target_word)
+
+# background scoring jobs: the web request only queues the URL and returns a job id
+job_pool = JobWorkerPool(build_broker(settings.AUDIO_JOBS), run_submission, workers=settings.AUDIO_JOBS['WORKERS'],
+                         stale_after_s=settings.AUDIO_JOBS['STALE_AFTER_S'])
+
+# queue a recording for scoring without holding the HTTP worker
+@api_view(['POST'])
+@authentication_classes([])  # Disable authentication for now
+@permission_classes([])  # Disable permissions for now
+def submit_audio_job(request):
+    uri = request.data.get('audio_file')
+    if not uri:
+        logger.error("No audio URL provided")
+        return Response({'error': 'No audio URL provided'}, status=400)
+    callback_url = request.data.get('callback_url')
+    if callback_url and not callback_allowed(callback_url, settings.AUDIO_JOBS['CALLBACK_HOSTS']):
+        return Response({'error': 'callback_url host is not allowed'}, status=400)
+    if job_pool.broker.depth() >= settings.AUDIO_JOBS['MAX_QUEUE']:
+        return too_busy(settings.AUDIO_JOBS['RETRY_AFTER_S'], 'job_queue_full')
+    if settings.AUDIO_JOBS['RUN_IN_WEB']:
+        job_pool.start()
+    user = request.user if request.user.is_authenticated else None
+    job = job_pool.submit(uri, request.data.get('target_word'), callback_url, user)
+    return Response({
+        'job_id': str(job.token),
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('audio_job_status', args=[job.token])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+# poll a queued job; the result is included once it is done. job_id is the job's random token,
+# so only whoever submitted the job (and got the token back) can read its result
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def audio_job_status(request, job_id):
+    job = get_object_or_404(AudioFile, token=job_id)
+    return Response(job_payload(job))
+
+# warm/cold state of the acoustic models loaded in this worker, and how much of its memory is shared
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def model_status(request):
+    # reporting must not be what loads the model
+    models = get_inference().model_status() if inference_loaded() else {'inference_loaded': False, 'models': []}
+    memory = memory_usage()
+    if memory is not None:
+        memory['model_mapping'] = mapped_file_usage()
+    return Response({**models, 'word_bank': bank_store.status(), 'memory': memory})
+
+# occupancy of the micro-batches sent through the acoustic model
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def inference_stats(request):
+    pipeline = get_inference().stats() if inference_loaded() else {'inference_loaded': False}
+    return Response({**pipeline, 'jobs': job_pool.stats(), 'admission': admission.stats()})
 
 # patient viewing own final scores
 class FinalScoreView(APIView):
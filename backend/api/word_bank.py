@@ -0,0 +1,34 @@
+import logging
+import os
+import sys
+from django.db import transaction
+from django.db.models import Max
+from .models import WordBankEntry, WordBankVersion
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from audio.bank_store import bank_store
+
+logger = logging.getLogger(__name__)
+
+
+def import_words(words, batch_size=1000):
+    """Bulk upserts {word: ipa} into the word bank table; returns how many rows were written."""
+    # "Carrot" and "carrot " are the same row; Postgres rejects an upsert batch that touches a row twice
+    normalized = {word.strip().lower(): " ".join(ipa.split()) for word, ipa in words.items()}
+    entries = [WordBankEntry(word=word, ipa=ipa) for word, ipa in normalized.items()]
+    WordBankEntry.objects.bulk_create(entries, batch_size=batch_size, update_conflicts=True,
+                                      unique_fields=["word"], update_fields=["ipa", "updated_at"])
+    return len(entries)
+
+
+def publish_word_bank():
+    """Compiles the current table into the next snapshot version and points every worker at it."""
+    words = dict(WordBankEntry.objects.order_by("id").values_list("word", "ipa"))
+    with transaction.atomic():
+        latest = WordBankVersion.objects.select_for_update().aggregate(Max("version"))["version__max"] or 0
+        version = latest + 1
+        snapshot = bank_store.publish(words, version)
+        WordBankVersion.objects.create(version=version, word_count=len(words), snapshot=snapshot)
+    logger.info("Published word bank v%d (%d words)", version, len(words))
+    return version
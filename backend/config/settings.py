@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 AUTH_USER_MODEL = 'api.User'
@@ -162,3 +163,102 @@ LOGGING = {
         'level': 'DEBUG',
     },
 }
+
+# Audio model registry
+# Load these checkpoints when a worker boots instead of on the first request (gunicorn.conf.py turns
+# this on and loads them once in the master, so forked workers share the weights)
+AUDIO_WARM_UP_ON_BOOT = os.environ.get("AUDIO_WARM_UP_ON_BOOT", "0") == "1"
+AUDIO_MODEL_CHECKPOINTS = ["bookbot/wav2vec2-ljspeech-gruut"]
+
+# Micro-batching of concurrent submit_audio requests
+AUDIO_BATCH_MAX_SIZE = int(os.environ.get("AUDIO_BATCH_MAX_SIZE", "8"))
+AUDIO_BATCH_MAX_WAIT_MS = float(os.environ.get("AUDIO_BATCH_MAX_WAIT_MS", "10"))
+
+# Cache of phoneme predictions keyed by a hash of the decoded audio and the checkpoint.
+# BACKEND is "memory" (per-worker LRU), "disk" (set PATH; shared by workers) or "django" (uses CACHES[ALIAS]).
+# Logits are always kept for submissions with a target word; STORE_LOGITS keeps them for the rest too
+AUDIO_RESULT_CACHE = {
+    "BACKEND": os.environ.get("AUDIO_RESULT_CACHE_BACKEND", "memory"),
+    "MAX_ENTRIES": 1024,
+    "TTL": 24 * 60 * 60,
+    "PATH": BASE_DIR / "media" / "result_cache",
+    "MAX_BYTES": 512 * 1024 * 1024,
+    "ALIAS": "default",
+    "STORE_LOGITS": False,
+    # how long a recording URL keeps pointing at its cached result (the file behind it may be replaced)
+    "URL_TTL": int(os.environ.get("AUDIO_RESULT_CACHE_URL_TTL", "300")),
+}
+
+# Compiled word bank snapshots, published with `manage.py import_word_bank`; workers memory-map
+# the current one and check for a newer version every AUDIO_WORD_BANK_CHECK_S seconds
+AUDIO_WORD_BANK_DIR = os.environ.get("AUDIO_WORD_BANK_DIR", str(BASE_DIR / "media" / "word_bank"))
+AUDIO_WORD_BANK_CHECK_S = float(os.environ.get("AUDIO_WORD_BANK_CHECK_S", "2"))
+
+# Two-tier inference for clips submitted with a target word: a cheap first-pass model
+# ("torch-truncated", "torch-int8", "onnx", ...) answers when its confidence in the target
+# reaches THRESHOLD, otherwise the full model runs. Tune with /inference_stats/ (cascade).
+AUDIO_CASCADE = {
+    "ENABLED": os.environ.get("AUDIO_CASCADE", "0") == "1",
+    "FIRST_PASS_BACKEND": os.environ.get("AUDIO_CASCADE_FIRST_PASS", "torch-truncated"),
+    "THRESHOLD": float(os.environ.get("AUDIO_CASCADE_THRESHOLD", "0.8")),
+}
+
+# Background scoring jobs (POST /api/audio_jobs/). BROKER is "local" (in-process queue, jobs run
+# in the web process) or "database" (queued AudioFile rows, also served by `manage.py run_audio_workers`)
+AUDIO_JOBS = {
+    "BROKER": os.environ.get("AUDIO_JOBS_BROKER", "local"),
+    "WORKERS": int(os.environ.get("AUDIO_JOBS_WORKERS", "2")),
+    "POLL_INTERVAL_S": 0.5,
+    # start worker threads inside web processes; turn off when dedicated worker processes serve a database broker
+    "RUN_IN_WEB": os.environ.get("AUDIO_JOBS_RUN_IN_WEB", "1") == "1",
+    # new jobs get a 429 once this many are waiting
+    "MAX_QUEUE": int(os.environ.get("AUDIO_JOBS_MAX_QUEUE", "500")),
+    "RETRY_AFTER_S": 30,
+    # a job still running this long after it started is assumed lost with its worker and requeued
+    "STALE_AFTER_S": float(os.environ.get("AUDIO_JOBS_STALE_AFTER_S", "600")),
+    # comma-separated hosts a callback_url may point at; results are POSTed from inside the network,
+    # so any other callback_url is refused (none are allowed by default)
+    "CALLBACK_HOSTS": [host.strip() for host in os.environ.get("AUDIO_JOBS_CALLBACK_HOSTS", "").split(",") if host.strip()],
+}
+
+# Admission control for /api/submit_audio/, per web process (so it bounds work with threaded
+# workers): MAX_CONCURRENT requests score at once, up to MAX_QUEUE wait (MAX_QUEUE_PER_USER
+# per user, served round-robin), and the rest get 429 with Retry-After
+AUDIO_ADMISSION = {
+    "MAX_CONCURRENT": int(os.environ.get("AUDIO_ADMISSION_MAX_CONCURRENT", "4")),
+    "MAX_QUEUE": int(os.environ.get("AUDIO_ADMISSION_MAX_QUEUE", "16")),
+    "MAX_QUEUE_PER_USER": int(os.environ.get("AUDIO_ADMISSION_MAX_QUEUE_PER_USER", "2")),
+    "QUEUE_TIMEOUT_S": float(os.environ.get("AUDIO_ADMISSION_QUEUE_TIMEOUT_S", "10")),
+    # anonymous clients are told apart by REMOTE_ADDR; set to the number of reverse proxies in front
+    # of the app to use the address they record in X-Forwarded-For instead
+    "TRUSTED_PROXIES": int(os.environ.get("AUDIO_ADMISSION_TRUSTED_PROXIES", "0")),
+}
+
+# Fetching recordings by URL: one keep-alive pool per worker, bodies streamed into the decoder and
+# capped at MAX_BYTES; connection errors and 502/503/504 are retried RETRIES times with backoff
+AUDIO_DOWNLOAD = {
+    "MAX_BYTES": int(os.environ.get("AUDIO_DOWNLOAD_MAX_MB", "25")) * 1024 * 1024,
+    "CONNECT_TIMEOUT_S": float(os.environ.get("AUDIO_DOWNLOAD_CONNECT_TIMEOUT_S", "3")),
+    "READ_TIMEOUT_S": float(os.environ.get("AUDIO_DOWNLOAD_READ_TIMEOUT_S", "15")),
+    "RETRIES": int(os.environ.get("AUDIO_DOWNLOAD_RETRIES", "2")),
+    "BACKOFF_S": 0.2,
+    "POOL_SIZE": 16,
+}
+
+# Direct uploads to /api/upload_audio/ are decoded while they arrive and capped at MAX_BYTES
+AUDIO_UPLOAD = {
+    "MAX_BYTES": int(os.environ.get("AUDIO_UPLOAD_MAX_MB", "25")) * 1024 * 1024,
+}
+
+# Live recognition over the /ws/recognize/ WebSocket (served by config.asgi): 16 kHz mono PCM frames,
+# a partial hypothesis over the last WINDOW_S every PARTIAL_EVERY_S of new audio, and the final
+# score once END_SILENCE_MS of silence follows speech (or MAX_UTTERANCE_S is reached)
+AUDIO_STREAMING = {
+    "WINDOW_S": float(os.environ.get("AUDIO_STREAMING_WINDOW_S", "4")),
+    "PARTIAL_EVERY_S": float(os.environ.get("AUDIO_STREAMING_PARTIAL_EVERY_S", "0.3")),
+    "END_SILENCE_MS": int(os.environ.get("AUDIO_STREAMING_END_SILENCE_MS", "400")),
+    "MAX_UTTERANCE_S": 15.0,
+    # open connections per process, beyond which new ones are closed with 1013; partial
+    # hypotheses only run while admission (AUDIO_ADMISSION) has a free slot
+    "MAX_CONNECTIONS": int(os.environ.get("AUDIO_STREAMING_MAX_CONNECTIONS", "32")),
+}
@@ -0,0 +1,34 @@
+"""
+gunicorn settings for the backend. Run from backend/:
+
+    gunicorn -c gunicorn.conf.py
+
+With AUDIO_PRELOAD_MODEL=1 (the default) the master imports the app and loads the acoustic
+model(s) before forking, so all workers share the weight pages copy-on-write instead of each
+holding a copy. For the WebSocket endpoint, serve the ASGI app with uvicorn's worker class:
+
+    GUNICORN_APP=config.asgi:application GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py
+
+`python -m audio.process_memory --children-of <master pid>` shows how much of the workers' memory is shared.
+"""
+
+import gc
+import os
+
+wsgi_app = os.environ.get("GUNICORN_APP", "config.wsgi:application")
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+
+# import the app (and so warm the model registry, see api.apps) in the master, before forking
+preload_app = os.environ.get("AUDIO_PRELOAD_MODEL", "1") == "1"
+if preload_app:
+    os.environ.setdefault("AUDIO_WARM_UP_ON_BOOT", "1")
+
+
+def pre_fork(server, worker):
+    # move everything allocated so far out of the collector's reach: collections would otherwise
+    # write to those objects' headers in the workers and copy the pages they share with the master
+    gc.freeze()